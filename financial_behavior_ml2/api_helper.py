@@ -1,7 +1,6 @@
 import os
 import sys
 import json
-import requests
 import pandas as pd
 import logging
 
@@ -21,48 +20,33 @@ class ApiHelper:
             sys.path.append(parent_dir)
             
             # Try importing from financial_behaviour_ml (note British spelling)
-            from financial_behaviour_ml.src.api import generate_user_profile
-            self.generate_user_profile = generate_user_profile
+            from financial_behaviour_ml.src.api import create_user_profile
+            self.create_user_profile = create_user_profile
             self.api_imported = True
-            logger.info("Successfully imported generate_user_profile from financial_behaviour_ml")
+            logger.info("Successfully imported create_user_profile from financial_behaviour_ml")
         except ImportError as e:
             logger.warning(f"Could not import from financial_behaviour_ml.src.api: {e}")
-            self.generate_user_profile = None
+            self.create_user_profile = None
     
     def get_generated_profile(self):
         """Get a generated user profile from API"""
         try:
-            if self.api_imported and self.generate_user_profile:
-                # Use imported function directly
+            if self.api_imported and self.create_user_profile:
+                # Take a profile from the API's pre-fetched profile pool
                 user_id = "chatbot_user"
-                response = self.generate_user_profile(user_id)
-                
-                # Handle different response types
-                if isinstance(response, tuple) and len(response) == 2:
-                    # Function returned (jsonify(data), status_code)
-                    profile_data = response[0].json
-                elif hasattr(response, 'json'):
-                    # Response is a Flask response object
-                    profile_data = response.json
-                else:
-                    # Response is already a dictionary
-                    profile_data = response
-                
-                if 'profile' in profile_data:
-                    profile = profile_data['profile']
-                else:
-                    profile = profile_data
+                profile = self.create_user_profile(user_id)
                 
                 logger.info("Successfully generated user profile using API function")
                 return profile
             else:
-                # Fallback to direct API call using requests
+                # Fallback to direct API call through the shared pooled client
                 logger.info("Attempting to call API endpoint directly")
                 
                 # Try to get API configuration from config file
                 try:
                     from financial_behaviour_ml.config import MOCKAROO_API_KEY, MOCKAROO_ENDPOINT
-                    response = requests.get(f"{MOCKAROO_ENDPOINT}?count=1&key={MOCKAROO_API_KEY}")
+                    from financial_behaviour_ml.src.http_client import get_shared_client
+                    response = get_shared_client().get(f"{MOCKAROO_ENDPOINT}?count=1", headers={'X-API-Key': MOCKAROO_API_KEY})
                     
                     if response.status_code == 200:
                         profile = response.json()[0]
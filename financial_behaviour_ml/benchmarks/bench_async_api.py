@@ -0,0 +1,222 @@
+"""Compare the Flask and ASGI APIs under concurrent load with a slow profile service.
+
+A local stub stands in for Mockaroo and sleeps before answering. While
+new users sign up (each login waits on the stub), a pool of existing
+users keeps polling /dashboard_stats. The Flask app runs on a fixed-size
+thread pool, like a gunicorn worker with --threads; the ASGI app runs on
+hypercorn in a single process.
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_async_api.py --dashboard-clients 20 --signups 100 --delay 1.0
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STUB_PROFILE = {
+    "Income": 50000, "Age": 30, "Dependents": 1, "Occupation": "Professional",
+    "City_Tier": "Tier_1", "Rent": 12000, "Loan_Repayment": 0, "Insurance": 1000,
+    "Groceries": 5000, "Transport": 2000, "Eating_Out": 2500, "Entertainment": 1500,
+    "Utilities": 2000, "Healthcare": 1000, "Education": 0, "Miscellaneous": 1000,
+    "Desired_Savings_Percentage": 15
+}
+
+
+def serve_profile_stub(port, delay):
+    """Serve Mockaroo-shaped profiles, answering each request after `delay` seconds"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps([STUB_PROFILE]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def _prepare_child(stub_url):
+    import logging
+    os.environ['MOCKAROO_ENDPOINT'] = stub_url
+    os.environ['TRANSACTION_LOG_DIR'] = tempfile.mkdtemp()
+    sys.path.insert(0, ROOT)
+    logging.disable(logging.CRITICAL)
+
+
+def serve_flask(port, stub_url, threads):
+    _prepare_child(stub_url)
+    from werkzeug.serving import BaseWSGIServer
+    from src.api import app
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """WSGI server with a fixed number of worker threads"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer('127.0.0.1', port, app)
+    server.request_queue_size = 1024
+    server.serve_forever()
+
+
+def serve_asgi(port, stub_url):
+    _prepare_child(stub_url)
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from src.asgi_api import app
+
+    config = Config()
+    config.bind = [f'127.0.0.1:{port}']
+    config.accesslog = None
+    config.errorlog = None
+    config.backlog = 1024
+    asyncio.run(serve(app, config))
+
+
+async def run_load(base_url, dashboard_clients, signups, requests_per_client):
+    limits = httpx.Limits(max_connections=dashboard_clients + signups)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def login(username):
+            start = time.perf_counter()
+            response = await client.post('/auth/login', json={'username': username, 'password': 'pw'})
+            response.raise_for_status()
+            return response.json()['token'], time.perf_counter() - start
+
+        # Existing users log in before the measured phase
+        tokens = [token for token, _ in await asyncio.gather(
+            *(login(f'existing_{i}') for i in range(dashboard_clients)))]
+
+        dashboard_latencies = []
+
+        async def poll_dashboard(token):
+            headers = {'Authorization': f'Bearer {token}'}
+            for _ in range(requests_per_client):
+                start = time.perf_counter()
+                response = await client.get('/dashboard_stats', headers=headers)
+                response.raise_for_status()
+                dashboard_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(login(f'new_{i}') for i in range(signups)),
+            *(poll_dashboard(token) for token in tokens)
+        )
+        elapsed = time.perf_counter() - start
+
+    signup_latencies = [latency for _, latency in results[:signups]]
+    return elapsed, dashboard_latencies, signup_latencies
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(name, elapsed, dashboard_latencies, signup_latencies):
+    print(f"\n{name}")
+    print(f"  wall time:            {elapsed:.2f}s")
+    print(f"  dashboard requests:   {len(dashboard_latencies)} ({len(dashboard_latencies) / elapsed:.1f} req/s)")
+    print(f"  dashboard p50 / p99:  {percentile(dashboard_latencies, 50) * 1000:.1f} / "
+          f"{percentile(dashboard_latencies, 99) * 1000:.1f} ms")
+    if signup_latencies:
+        print(f"  signup mean latency:  {statistics.mean(signup_latencies) * 1000:.1f} ms")
+
+
+def start_process(target, *args):
+    """Run a server in a child process and wait until it accepts connections"""
+    port = free_port()
+    process = multiprocessing.get_context('fork').Process(target=target, args=(port,) + args, daemon=True)
+    process.start()
+    wait_for_port(port)
+    return process, port
+
+
+def stop_process(process):
+    process.terminate()
+    process.join()
+
+
+def benchmark(target, args, stub_url, load_args):
+    process, port = start_process(target, stub_url, *args)
+    try:
+        return asyncio.run(run_load(f'http://127.0.0.1:{port}', *load_args))
+    finally:
+        stop_process(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dashboard-clients', type=int, default=20)
+    parser.add_argument('--signups', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=20, help='dashboard requests per client')
+    parser.add_argument('--delay', type=float, default=1.0, help='profile service delay in seconds')
+    parser.add_argument('--flask-threads', type=int, default=16)
+    args = parser.parse_args()
+
+    load_args = (args.dashboard_clients, args.signups, args.requests)
+    stub, stub_port = start_process(serve_profile_stub, args.delay)
+    stub_url = f'http://127.0.0.1:{stub_port}/profiles.json'
+
+    print(f"{args.dashboard_clients} dashboard clients x {args.requests} requests, "
+          f"{args.signups} concurrent sign-ups, profile service delay {args.delay}s")
+
+    report(f"Flask ({args.flask_threads} threads)",
+           *benchmark(serve_flask, (args.flask_threads,), stub_url, load_args))
+    report("ASGI (hypercorn, 1 process)",
+           *benchmark(serve_asgi, (), stub_url, load_args))
+
+    stop_process(stub)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Compare per-transaction and vectorized spending analysis over many users.
+
+Generates a month of transactions for every user and scores them with
+ExpenseCategorizer.analyze_spending (one call per user, one Python
+iteration per transaction) and with analyze_spending_by_user (one NumPy
+pass over all rows).
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_categorizer.py --users 10000 --transactions 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import NEEDS, WANTS
+from src.expense_categorizer import ExpenseCategorizer
+
+
+def generate(users, per_user, seed):
+    rng = np.random.default_rng(seed)
+    categories = np.array(NEEDS + WANTS + ['gifts', 'travel'])
+    rows = users * per_user
+    return pd.DataFrame({
+        'user_id': np.repeat([f'user_{i}' for i in range(users)], per_user),
+        'category': categories[rng.integers(0, len(categories), rows)],
+        'amount': rng.uniform(20, 5000, rows).round(2)
+    }), pd.Series(rng.uniform(5000, 80000, users).round(2), index=[f'user_{i}' for i in range(users)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--transactions', type=int, default=60, help='transactions per user per month')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df, income = generate(args.users, args.transactions, args.seed)
+    print(f"{len(df)} transactions for {args.users} users")
+
+    # The per-transaction API takes lists of dicts, so group them up front (not timed)
+    per_user = {user_id: group[['category', 'amount']].to_dict('records') for user_id, group in df.groupby('user_id')}
+
+    start = time.perf_counter()
+    loop_totals = {
+        user_id: ExpenseCategorizer.analyze_spending({'disposable_income': income[user_id]}, txs)
+        for user_id, txs in per_user.items()
+    }
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = ExpenseCategorizer.analyze_spending_by_user(df, income)
+    batch_elapsed = time.perf_counter() - start
+
+    # Both paths must agree before their timings mean anything
+    for user_id, analysis in loop_totals.items():
+        assert abs(analysis['needs_total'] - summary.loc[user_id, 'needs_total']) < 1e-6 * max(1, analysis['needs_total'])
+        assert abs(analysis['wants_total'] - summary.loc[user_id, 'wants_total']) < 1e-6 * max(1, analysis['wants_total'])
+
+    print(f"  analyze_spending per user:  {loop_elapsed:.2f}s")
+    print(f"  analyze_spending_by_user:   {batch_elapsed:.2f}s ({loop_elapsed / batch_elapsed:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""Load-test the Flask API with synthetic users and a realistic request mix.
+
+Creates N users through /auth/login (profiles come from the local
+synthetic generator, never Mockaroo), gives each a short transaction
+history, then replays a weighted mix of submit_transaction,
+dashboard_stats, get_alerts and get_transactions from a pool of client
+threads. Reports throughput, per-route latency percentiles, errors and
+memory growth per user.
+
+Targets:
+  testclient  in-process Flask test client (default, fully offline)
+  server      a threaded werkzeug server started in a child process
+  --url URL   an already running server (e.g. gunicorn -c gunicorn.conf.py);
+              its profile service is whatever that server is configured with
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_load.py --users 200 --requests 5000 --concurrency 8
+    python benchmarks/bench_load.py --target server --mix submit=1,dashboard=1
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = 'submit=30,dashboard=35,alerts=20,transactions=15'
+CATEGORIES = ['groceries', 'transport', 'eating_out', 'entertainment', 'utilities', 'healthcare',
+              'education', 'miscellaneous']
+
+
+def prepare_environment():
+    """Keep the API offline and its transaction log out of the working tree"""
+    import logging
+    os.environ.setdefault('TRANSACTION_LOG_DIR', tempfile.mkdtemp())
+    os.environ['MOCKAROO_ENDPOINT'] = 'http://127.0.0.1:9/profiles.json'
+    sys.path.insert(0, ROOT)
+    logging.disable(logging.CRITICAL)
+
+
+def load_api():
+    """Import the API with its profile service answered by the synthetic generator"""
+    prepare_environment()
+    from src import api
+    from src.profile_pool import generate_synthetic_profile
+    api.profile_pool.fetch_batch = lambda count: [generate_synthetic_profile() for _ in range(count)]
+    return api
+
+
+def rss_bytes(pid):
+    """Resident set size of a process (Linux only; None elsewhere)"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class TestClientTarget:
+    """Requests through the Flask test client, one client per thread"""
+
+    def __init__(self):
+        self.app = load_api().app
+        self.pid = os.getpid()
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, params=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, json=body, query_string=params)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """Requests over HTTP, one keep-alive session per thread"""
+
+    def __init__(self, base_url, pid=None, process=None):
+        import requests
+        self.requests = requests
+        self.base_url = base_url
+        self.pid = pid
+        self.process = process
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, params=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        response = session.request(method, self.base_url + path, headers=headers, json=body, params=params,
+                                   timeout=60)
+        return response.status_code, response.content
+
+    def close(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+
+def serve(port):
+    from werkzeug.serving import make_server
+    api = load_api()
+    server = make_server('127.0.0.1', port, api.app, threaded=True)
+    server.serve_forever()
+
+
+def start_server():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    process = multiprocessing.get_context('fork').Process(target=serve, args=(port,), daemon=True)
+    process.start()
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        raise RuntimeError(f"Server on port {port} did not start")
+
+    return HttpTarget(f'http://127.0.0.1:{port}', pid=process.pid, process=process)
+
+
+def random_transaction(rng):
+    return {'category': rng.choice(CATEGORIES), 'amount': round(rng.uniform(20, 2000), 2)}
+
+
+class LoadTest:
+    def __init__(self, target, users, history, mix, seed):
+        self.target = target
+        self.users = users
+        self.history = history
+        self.mix = mix
+        self.seed = seed
+        self.tokens = []
+        self.latencies = {name: [] for name in mix}
+        self.errors = {name: 0 for name in mix}
+        self._lock = threading.Lock()
+
+    def create_users(self, concurrency):
+        def create(i):
+            rng = random.Random(self.seed + i)
+            status, body = self.target.request('POST', '/auth/login',
+                                               body={'username': f'load_user_{self.seed}_{i}', 'password': 'pw'})
+            if status != 200:
+                raise RuntimeError(f"Login failed with {status}: {body[:200]!r}")
+            headers = {'Authorization': f"Bearer {json.loads(body)['token']}"}
+
+            if self.history:
+                txs = [random_transaction(rng) for _ in range(self.history)]
+                self.target.request('POST', '/submit_transaction', headers=headers, body=txs)
+            return headers
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            self.tokens = list(pool.map(create, range(self.users)))
+
+    def run_operation(self, name, headers, rng):
+        if name == 'submit':
+            return self.target.request('POST', '/submit_transaction', headers=headers, body=random_transaction(rng))
+        if name == 'dashboard':
+            return self.target.request('GET', '/dashboard_stats', headers=headers)
+        if name == 'alerts':
+            return self.target.request('GET', '/get_alerts', headers=headers)
+        if name == 'transactions':
+            return self.target.request('GET', '/get_transactions', headers=headers, params={'limit': 50})
+        raise ValueError(f"Unknown operation: {name}")
+
+    def replay(self, total_requests, concurrency):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        def worker(index):
+            rng = random.Random(self.seed * 1000 + index)
+            count = total_requests // concurrency + (1 if index < total_requests % concurrency else 0)
+            for _ in range(count):
+                name = rng.choices(names, weights)[0]
+                headers = rng.choice(self.tokens)
+                start = time.perf_counter()
+                try:
+                    status, _ = self.run_operation(name, headers, rng)
+                    failed = status >= 400 and status != 403  # 403 is an opted-out user, not a failure
+                except Exception:
+                    failed = True
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.latencies[name].append(elapsed)
+                    self.errors[name] += failed
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        return time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else None
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['testclient', 'server'], default='testclient')
+    parser.add_argument('--url', help='benchmark an already running server instead')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--history', type=int, default=20, help='transactions submitted per user before the run')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='weighted operations, e.g. ' + DEFAULT_MIX)
+    parser.add_argument('--seed', type=int, default=int(time.time()))
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    if args.url:
+        target = HttpTarget(args.url.rstrip('/'))
+    elif args.target == 'server':
+        target = start_server()
+    else:
+        target = TestClientTarget()
+
+    test = LoadTest(target, args.users, args.history, parse_mix(args.mix), args.seed)
+    try:
+        rss_start = rss_bytes(target.pid) if target.pid else None
+        setup_start = time.perf_counter()
+        test.create_users(args.concurrency)
+        setup_elapsed = time.perf_counter() - setup_start
+        rss_users = rss_bytes(target.pid) if target.pid else None
+
+        elapsed = test.replay(args.requests, args.concurrency)
+        rss_end = rss_bytes(target.pid) if target.pid else None
+    finally:
+        target.close()
+
+    report = {
+        'target': args.url or args.target,
+        'users': args.users,
+        'concurrency': args.concurrency,
+        'user_setup_seconds': round(setup_elapsed, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 1),
+        'routes': {},
+        'memory': None
+    }
+    for name, latencies in test.latencies.items():
+        report['routes'][name] = {
+            'requests': len(latencies),
+            'errors': test.errors[name],
+            **{f'p{pct}_ms': round(percentile(latencies, pct) * 1000, 2) if latencies else None
+               for pct in (50, 95, 99)}
+        }
+    if rss_start is not None and rss_end is not None:
+        report['memory'] = {
+            'rss_start_mb': round(rss_start / 2 ** 20, 1),
+            'rss_end_mb': round(rss_end / 2 ** 20, 1),
+            'per_user_after_setup_kb': round((rss_users - rss_start) / args.users / 1024, 1),
+            'per_user_after_run_kb': round((rss_end - rss_start) / args.users / 1024, 1)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{report['target']}: {args.users} users, {args.requests} requests, concurrency {args.concurrency}")
+    print(f"  user setup:   {setup_elapsed:.2f}s")
+    print(f"  throughput:   {report['throughput_rps']} req/s over {elapsed:.2f}s")
+    print(f"  {'route':<14}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, stats in report['routes'].items():
+        print(f"  {name:<14}{stats['requests']:>9}{stats['errors']:>8}"
+              f"{stats['p50_ms'] or 0:>9.2f}{stats['p95_ms'] or 0:>9.2f}{stats['p99_ms'] or 0:>9.2f}")
+    if report['memory']:
+        memory = report['memory']
+        print(f"  memory:       {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB RSS, "
+              f"{memory['per_user_after_setup_kb']} KB/user after setup, "
+              f"{memory['per_user_after_run_kb']} KB/user after the run")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Measure the CPU saved per request by parsing timestamps once at ingest.
+
+Builds one user with N transactions spread over the last year and times,
+in CPU seconds per request, the time-based work a request does:
+
+  window     rebuilding the rolling 7-day spending window
+  filter     scanning the history for a date range
+
+once the old way (datetime.fromisoformat on every transaction, every
+request) and once on the integer epoch_us/day fields added at ingest.
+It then reports CPU per request for /dashboard_stats (with its caches
+dropped) and a date-filtered /get_transactions page through the Flask
+test client.
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_timestamps.py --transactions 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.spending_window import SpendingWindow
+from src.timestamps import normalize_transaction, to_epoch_us
+
+CATEGORIES = ['groceries', 'transport', 'eating_out', 'entertainment', 'utilities']
+
+
+def generate(count, seed):
+    rng = random.Random(seed)
+    now = datetime.now()
+    txs = [{
+        'transaction_id': f'tx{i}',
+        'timestamp': (now - timedelta(seconds=rng.uniform(0, 365 * 86400))).isoformat(),
+        'category': rng.choice(CATEGORIES),
+        'amount': round(rng.uniform(5, 500), 2)
+    } for i in range(count)]
+    txs.sort(key=lambda tx: tx['timestamp'])
+    return txs
+
+
+def cpu_per_call(fn, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat
+
+
+def window_parsed(txs):
+    window = SpendingWindow(days=7)
+    start = window.start()
+    window.add_all([tx for tx in txs if datetime.fromisoformat(tx['timestamp']) >= start])
+    return window.total()
+
+
+def window_integer(txs):
+    window = SpendingWindow(days=7)
+    start = to_epoch_us(window.start())
+    window.add_all([tx for tx in txs if tx['epoch_us'] >= start])
+    return window.total()
+
+
+def filter_parsed(txs, start, end):
+    return [tx for tx in txs if start <= datetime.fromisoformat(tx['timestamp']) <= end]
+
+
+def filter_integer(txs, start, end):
+    lo, hi = to_epoch_us(start), to_epoch_us(end)
+    return [tx for tx in txs if lo <= tx['epoch_us'] <= hi]
+
+
+def bench_api(txs, repeat):
+    import logging
+    os.environ.setdefault('TRANSACTION_LOG_DIR', tempfile.mkdtemp())
+    os.environ['MOCKAROO_ENDPOINT'] = 'http://127.0.0.1:9/profiles.json'
+    logging.disable(logging.CRITICAL)
+    from src import api
+    from src.profile_pool import generate_synthetic_profile
+    api.profile_pool.fetch_batch = lambda count: [generate_synthetic_profile() for _ in range(count)]
+
+    client = api.app.test_client()
+    token = client.post('/auth/login', json={'username': 'bench_timestamps', 'password': 'pw'}).json['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    api.storage.add_transactions('bench_timestamps', [dict(tx) for tx in txs])
+
+    def dashboard():
+        api.spending_windows.clear()
+        api.weekly_snapshots.clear()
+        api.response_cache.clear()
+        client.get('/dashboard_stats', headers=headers)
+
+    start_date = (datetime.now() - timedelta(days=90)).isoformat()
+    end_date = (datetime.now() - timedelta(days=30)).isoformat()
+
+    def page():
+        client.get('/get_transactions', headers=headers,
+                   query_string={'start_date': start_date, 'end_date': end_date, 'limit': 100})
+
+    return cpu_per_call(dashboard, repeat), cpu_per_call(page, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    txs = generate(args.transactions, args.seed)
+    start = time.process_time()
+    normalized = [normalize_transaction(dict(tx)) for tx in txs]
+    ingest = (time.process_time() - start) / len(txs)
+    print(f"{len(txs)} transactions; normalizing at ingest costs {ingest * 1e6:.2f}us each, once")
+
+    filter_start, filter_end = datetime.now() - timedelta(days=90), datetime.now() - timedelta(days=30)
+    # txs are the same transactions as stored before this change: ISO strings only
+    assert window_parsed(txs) == window_integer(normalized)
+    assert len(filter_parsed(txs, filter_start, filter_end)) == len(filter_integer(normalized, filter_start, filter_end))
+
+    print(f"  {'CPU ms/request':<16}{'parse':>10}{'integer':>10}{'saved':>8}")
+    for name, parsed, integer in [
+        ('window', lambda: window_parsed(txs), lambda: window_integer(normalized)),
+        ('filter', lambda: filter_parsed(txs, filter_start, filter_end),
+         lambda: filter_integer(normalized, filter_start, filter_end))
+    ]:
+        before, after = cpu_per_call(parsed, args.repeat), cpu_per_call(integer, args.repeat)
+        print(f"  {name:<16}{before * 1000:>10.2f}{after * 1000:>10.2f}{1 - after / before:>8.0%}")
+
+    dashboard, page = bench_api(txs, args.repeat)
+    print(f"  /dashboard_stats, caches dropped:   {dashboard * 1000:.2f} ms CPU/request")
+    print(f"  /get_transactions, 60-day range:    {page * 1000:.2f} ms CPU/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Measure per-request authentication overhead with and without the token cache.
+
+Times authenticate() on its own, then a full authenticated request through
+the Flask test client, with the verified-token cache disabled (every call
+runs jwt.decode) and enabled (hot tokens skip verification).
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_token_cache.py --iterations 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the benchmark offline and out of the working tree
+os.environ.setdefault('TRANSACTION_LOG_DIR', tempfile.mkdtemp())
+os.environ.setdefault('MOCKAROO_ENDPOINT', 'http://127.0.0.1:9/profiles.json')
+
+from src import api
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run(label, iterations, header, client):
+    auth_us = time_per_call(lambda: api.authenticate(header), iterations)
+    request_us = time_per_call(lambda: client.get('/get_profile', headers={'Authorization': header}),
+                               max(1, iterations // 10))
+    print(f"{label:<10} authenticate {auth_us:8.2f} us/call   GET /get_profile {request_us:8.1f} us/request")
+    return auth_us, request_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    client = api.app.test_client()
+    response = client.post('/auth/login', json={'username': 'bench_user', 'password': 'secret'})
+    header = f"Bearer {response.json['token']}"
+
+    original_size = api.token_cache.maxsize
+    api.token_cache.maxsize = 0
+    api.token_cache.clear()
+    uncached = run('uncached', args.iterations, header, client)
+
+    api.token_cache.maxsize = original_size
+    cached = run('cached', args.iterations, header, client)
+
+    print(f"auth overhead saved: {uncached[0] - cached[0]:.2f} us/request "
+          f"({uncached[0] / cached[0]:.1f}x faster authenticate)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compare the memory held by per-user transaction history as dicts and as columns.
+
+Builds N transactions shaped like API submits (UUID ids, ISO timestamps,
+a handful of categories, normalized at ingest) for a number of users and
+measures, with tracemalloc, what keeping them costs as the sorted lists
+of dicts the store used to hold and as the current TransactionStore
+columns. Also times decoding pages back to the JSON shape.
+
+Usage (from financial_behaviour_ml/):
+    python benchmarks/bench_transaction_memory.py --transactions 1000000 --users 1000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.timestamps import normalize_transaction
+from src.transaction_store import TransactionStore, _sort_key
+
+CATEGORIES = ['groceries', 'transport', 'eating_out', 'entertainment', 'utilities', 'healthcare',
+              'education', 'miscellaneous']
+
+
+def generate(count, users, seed):
+    """Yield (user_id, transaction) pairs in time order"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=365)
+    step = 365 * 86400 / count
+    for i in range(count):
+        tx = {
+            'category': rng.choice(CATEGORIES),
+            'amount': round(rng.uniform(5, 500), 2),
+            'timestamp': (start + timedelta(seconds=i * step + rng.random())).isoformat(),
+            'transaction_id': str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        }
+        yield f'user_{i % users}', normalize_transaction(tx)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    def build_dicts():
+        keys, items = {}, {}
+        for user_id, tx in generate(args.transactions, args.users, args.seed):
+            keys.setdefault(user_id, []).append(_sort_key(tx))
+            items.setdefault(user_id, []).append(tx)
+        return keys, items
+
+    def build_columns():
+        store = TransactionStore()
+        for user_id, tx in generate(args.transactions, args.users, args.seed):
+            store.add(user_id, [tx])
+        for user_id in range(args.users):
+            store.count(f'user_{user_id}')
+            store.page(f'user_{user_id}', limit=1)  # Merge every append buffer
+        return store
+
+    dicts, dict_bytes, dict_elapsed = measure(build_dicts)
+    del dicts
+    store, column_bytes, column_elapsed = measure(build_columns)
+
+    print(f"{args.transactions} transactions across {args.users} users")
+    print(f"  dicts:    {dict_bytes / 2 ** 20:8.1f} MB  ({dict_bytes / args.transactions:.0f} B/transaction)")
+    print(f"  columns:  {column_bytes / 2 ** 20:8.1f} MB  ({column_bytes / args.transactions:.0f} B/transaction, "
+          f"{dict_bytes / column_bytes:.1f}x smaller)")
+    print(f"  build:    dicts {dict_elapsed:.2f}s, columns {column_elapsed:.2f}s")
+
+    start = time.perf_counter()
+    for user_id in range(args.users):
+        store.page(f'user_{user_id}', limit=100)
+    elapsed = time.perf_counter() - start
+    print(f"  decoding a 100-row page: {elapsed / args.users * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,68 @@ import os
 
 # Security
 JWT_SECRET = os.environ.get('JWT_SECRET', 'dev_secret_key_change_in_production')
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))  # Verified tokens kept in memory (0 disables)
+
+# Per-worker caches of derived user data, least recently used dropped first
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))  # Users' spending windows and weekly snapshots
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 40000))  # Serialized GET bodies, one per route and user
 
 # Mockaroo API settings
 MOCKAROO_API_KEY = os.environ.get('MOCKAROO_API_KEY', 'a1055fe0')
-MOCKAROO_ENDPOINT = 'https://my.api.mockaroo.com/expenditures_and_savings.json'
+MOCKAROO_ENDPOINT = os.environ.get('MOCKAROO_ENDPOINT', 'https://my.api.mockaroo.com/expenditures_and_savings.json')
+
+# Profile pool settings
+PROFILE_POOL_BATCH_SIZE = 50  # Profiles fetched from Mockaroo per request (count=N)
+PROFILE_POOL_LOW_WATER = 10  # Refill in the background below this many profiles
+PROFILE_POOL_RETRY_INTERVAL = 30  # Seconds to use synthetic profiles after a failed fetch
+
+# Outbound HTTP client settings
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05))  # Seconds
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))  # Seconds
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.environ.get('HTTP_MAX_CONNECTIONS_PER_HOST', 10))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))  # Retries after the first attempt
+HTTP_RETRY_BACKOFF = 0.25  # Base delay in seconds, doubled per retry with full jitter
+
+# Storage settings ('memory' or 'sqlite')
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'memory')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', os.path.join('data', 'financial.db'))
+
+# Transaction log settings
+TRANSACTION_LOG_DIR = os.environ.get('TRANSACTION_LOG_DIR', os.path.join('data', 'processed', 'transaction_log'))
+TRANSACTION_LOG_COMPACT_INTERVAL = 300  # seconds between compaction runs
+
+# Bulk ingestion settings
+BULK_CHUNK_SIZE = 5000  # NDJSON rows validated and applied per chunk
+BULK_MAX_REPORTED_REJECTS = 100  # Rejected rows listed individually in the response
+BULK_BODY_TIMEOUT = int(os.environ.get('BULK_BODY_TIMEOUT', 3600))  # Seconds the ASGI app waits for a bulk body
+
+# Write-behind queue for submitted transactions
+WRITE_BEHIND_MAX_PENDING = 10000  # Queued transactions before submits start to wait
+WRITE_BEHIND_WORKERS = 2  # Threads applying queued writes
+WRITE_BEHIND_SUBMIT_TIMEOUT = 5  # Seconds a submit waits on a full queue before a 503
+
+# Server-Sent Events alert streams
+SSE_KEEPALIVE_INTERVAL = float(os.environ.get('SSE_KEEPALIVE_INTERVAL', 15))  # Seconds between keep-alive comments
+# Under the Flask app every open stream holds a worker thread, so each process
+# holds at most this many (gunicorn.conf.py adds as many threads); the ASGI
+# app has no such limit
+SSE_MAX_SYNC_STREAMS = int(os.environ.get('SSE_MAX_SYNC_STREAMS', 4))
+
+# Spending rollups (/spending_rollups)
+ROLLUPS_DEFAULT_BUCKETS = 30  # Buckets returned when no start_date is given
+ROLLUPS_MAX_BUCKETS = 400  # Widest range a client may request, in buckets
+
+# Savings model inference (models trained by financial_behavior_ml2)
+ML2_DIR = os.environ.get('ML2_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                 'financial_behavior_ml2'))
+SAVINGS_MODEL_DIR = os.environ.get('SAVINGS_MODEL_DIR', os.path.join(ML2_DIR, 'models'))
+SAVINGS_MAX_BATCH = 500  # Most profiles one /predict_savings request may score
+RESCORE_INTERVAL = float(os.environ.get('RESCORE_INTERVAL', 5))  # Seconds between background re-scoring runs
+RESCORE_MAX_BATCH = 500  # Profiles scored per predict call during re-scoring
+
+# Transaction history pagination
+TRANSACTIONS_PAGE_SIZE = 100  # Default page size for /get_transactions
+TRANSACTIONS_MAX_PAGE_SIZE = 1000  # Largest page a client may request
 
 # Spending thresholds for alerts (₹)
 SPENDING_THRESHOLDS = {
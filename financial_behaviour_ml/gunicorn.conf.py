@@ -0,0 +1,23 @@
+"""Gunicorn settings for running the Flask API on every core of one host.
+
+Run with (from financial_behaviour_ml/):  gunicorn -c gunicorn.conf.py src.api:app
+"""
+import multiprocessing
+import os
+
+# Workers only see each other's users and transactions through SQLite
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+
+from config import SSE_MAX_SYNC_STREAMS
+
+bind = os.environ.get('BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# /stream_alerts holds a thread per open stream (up to SSE_MAX_SYNC_STREAMS per
+# worker), so those threads come on top of the ones serving ordinary requests.
+# Deployments with many streaming clients should serve them from the ASGI app
+# (hypercorn src.asgi_api:app), where an idle stream holds no thread.
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) + SSE_MAX_SYNC_STREAMS
+
+# Import the app once in the master and fork workers from it; src.api
+# reopens connections, locks and background threads in each worker
+preload_app = True
@@ -1,24 +1,73 @@
-from flask import Flask, request, jsonify, session
-import pandas as pd
+from flask import Flask, Response, request, jsonify, session, g, stream_with_context
 import json
+import base64
 import os
 from datetime import datetime, timedelta
 import jwt
 import hashlib
 from functools import wraps
-import requests
 import sys
 import logging
+import time
+import math
 import uuid
+import atexit
+import threading
 
 # Add parent directory to path to import from sibling modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import (
     JWT_SECRET, 
+    TOKEN_CACHE_SIZE,
+    USER_CACHE_SIZE,
+    RESPONSE_CACHE_SIZE,
     MOCKAROO_API_KEY, 
     MOCKAROO_ENDPOINT,
-    SPENDING_THRESHOLDS
+    SPENDING_THRESHOLDS,
+    CATEGORY_MAP,
+    BULK_CHUNK_SIZE,
+    BULK_MAX_REPORTED_REJECTS,
+    WRITE_BEHIND_MAX_PENDING,
+    WRITE_BEHIND_WORKERS,
+    WRITE_BEHIND_SUBMIT_TIMEOUT,
+    SSE_KEEPALIVE_INTERVAL,
+    SSE_MAX_SYNC_STREAMS,
+    ROLLUPS_DEFAULT_BUCKETS,
+    ROLLUPS_MAX_BUCKETS,
+    ML2_DIR,
+    SAVINGS_MODEL_DIR,
+    SAVINGS_MAX_BATCH,
+    RESCORE_INTERVAL,
+    RESCORE_MAX_BATCH,
+    TRANSACTIONS_PAGE_SIZE,
+    TRANSACTIONS_MAX_PAGE_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF,
+    PROFILE_POOL_BATCH_SIZE,
+    PROFILE_POOL_LOW_WATER,
+    PROFILE_POOL_RETRY_INTERVAL,
+    STORAGE_BACKEND,
+    SQLITE_PATH,
+    TRANSACTION_LOG_DIR,
+    TRANSACTION_LOG_COMPACT_INTERVAL
 )
+from src.storage import create_storage
+from src.transaction_log import TransactionLog
+from src.spending_window import SpendingWindow
+from src.lru_cache import LRUCache
+from src.profile_pool import ProfilePool
+from src.http_client import configure_shared_client
+from src.token_cache import TokenCache
+from src.metrics import Registry, SIZE_BUCKETS
+from src.write_behind import WriteBehind, QueueFull
+from src.timestamps import normalize_transaction, ensure_normalized
+from src.savings_model import SavingsModel
+from src.rescorer import Rescorer
+from src.rollups import GRANULARITIES, bucket_of, bucket_start
+from src.event_hub import EventHub, Subscription, format_event
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev_secret_key_change_in_production')
@@ -30,29 +79,136 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# In-memory storage (replace with database in production)
-users = {}
-user_profiles = {}
-transactions = {}
-user_preferences = {}
+# Instrumentation, rendered in Prometheus text format on /metrics. Recording
+# is a few increments per request; all aggregation happens at scrape time
+metrics = Registry()
+request_count = metrics.counter('api_requests_total', 'Requests served', ('route', 'method', 'status'))
+request_errors = metrics.counter('api_request_errors_total', 'Requests answered with a 5xx status', ('route',))
+request_latency = metrics.histogram('api_request_duration_seconds', 'Time to produce a response', ('route',))
+request_size = metrics.histogram('api_request_size_bytes', 'Request body size', ('route',), buckets=SIZE_BUCKETS)
+response_size = metrics.histogram('api_response_size_bytes', 'Response body size (unstreamed responses)',
+                                  ('route',), buckets=SIZE_BUCKETS)
+jwt_verify_latency = metrics.histogram('jwt_verify_duration_seconds', 'Time spent in jwt.decode', ('result',))
+token_cache_lookups = metrics.counter('token_cache_lookups_total', 'Verified-token cache lookups', ('result',))
+profile_service_latency = metrics.histogram('profile_service_request_duration_seconds',
+                                            'Mockaroo batch fetches, including retries', ('outcome',))
+duplicate_transactions = metrics.counter('duplicate_transactions_total',
+                                         'Replayed transactions skipped by transaction_id', ('route',))
+savings_inference_latency = metrics.histogram('savings_model_inference_duration_seconds',
+                                              'Time to score one batch of profiles with the savings models',
+                                              ('batch',))
+savings_profiles_scored = metrics.counter('savings_model_profiles_scored_total',
+                                          'Profiles scored by the savings models', ('batch',))
+
+# Function to record one served request
+def observe_request(route, method, status, seconds, request_bytes, response_bytes):
+    request_count.inc(route, method, str(status))
+    request_latency.observe(seconds, route)
+    if status >= 500:
+        request_errors.inc(route)
+    if request_bytes:
+        request_size.observe(request_bytes, route)
+    if response_bytes is not None:
+        response_size.observe(response_bytes, route)
+
+# Users, profiles, transactions and preferences (see STORAGE_BACKEND in config)
+storage = create_storage(STORAGE_BACKEND, SQLITE_PATH)
+
+# Append-only on-disk log of every transaction, replayed on startup for
+# backends that do not persist on their own
+transaction_log = TransactionLog(TRANSACTION_LOG_DIR, compact_interval=TRANSACTION_LOG_COMPACT_INTERVAL)
+
+def recover_transactions():
+    """Load transaction history from the on-disk log"""
+    recovered = 0
+    for user_id, user_txs in transaction_log.replay():
+        try:
+            storage.add_transactions(user_id, user_txs)
+            recovered += len(user_txs)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error recovering transactions for {user_id}: {e}")
+    
+    if recovered:
+        logger.info(f"Recovered {recovered} transaction(s) from {TRANSACTION_LOG_DIR}")
+
+if not storage.durable:
+    recover_transactions()
+transaction_log.start_compaction()
+
+# Rolling 7-day spending per user: user_id -> (data version, window). Updated
+# on this worker's writes and rebuilt when another worker has written since
+spending_windows = LRUCache(maxsize=USER_CACHE_SIZE)
+
+# Memoized weekly snapshots: user_id -> (data version, day, snapshot)
+weekly_snapshots = LRUCache(maxsize=USER_CACHE_SIZE)
+
+# Serialized GET bodies: (route, user_id) -> (etag, JSON text, status)
+response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE)
+
+# Data versions in a durable store are shared by every worker and survive
+# restarts; otherwise they restart from zero, so ETags get a per-process prefix
+ETAG_PREFIX = 'v' if storage.durable else uuid.uuid4().hex[:8]
+
+# Verified tokens, keyed by the exact token string and dropped at their exp
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE)
+
+# Per-category savings regressors from financial_behavior_ml2, loaded once per process
+savings_model = SavingsModel.load(SAVINGS_MODEL_DIR, ML2_DIR)
+
+# Open /stream_alerts connections, and what was last pushed to each user's
+# streams: user_id -> (data version, alert categories, dashboard stats),
+# kept only while the user has a stream open
+alert_hub = EventHub()
+alert_states = {}
+alert_states_lock = threading.Lock()
+
+# Each open stream occupies one of this process's request threads
+sync_streams = threading.BoundedSemaphore(SSE_MAX_SYNC_STREAMS)
+
+# Function to verify an Authorization header, shared by the Flask and ASGI apps
+def authenticate(token):
+    """Return (user_id, None) for a valid token, or (None, (error body, status))"""
+    if not token:
+        return None, ({'message': 'Token is missing'}, 401)
+        
+    if token.startswith('Bearer '):
+        token = token[7:]  # Remove 'Bearer ' prefix
+    
+    # Hot clients skip signature verification until their token expires
+    current_user = token_cache.get(token)
+    if current_user is not None:
+        token_cache_lookups.inc('hit')
+        return current_user, None
+    token_cache_lookups.inc('miss')
+    
+    start = time.perf_counter()
+    try:
+        data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        current_user = data['user_id']
+    except:
+        jwt_verify_latency.observe(time.perf_counter() - start, 'invalid')
+        return None, ({'message': 'Token is invalid'}, 401)
+    jwt_verify_latency.observe(time.perf_counter() - start, 'valid')
+    
+    token_cache.put(token, current_user, data.get('exp'))
+    return current_user, None
+
+# Function to issue a JWT for a user
+def issue_token(username):
+    return jwt.encode(
+        {'user_id': username, 'exp': datetime.utcnow().timestamp() + 3600},
+        JWT_SECRET,
+        algorithm="HS256"
+    )
 
 # Authentication decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        current_user, error = authenticate(request.headers.get('Authorization'))
         
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-            
-        if token.startswith('Bearer '):
-            token = token[7:]  # Remove 'Bearer ' prefix
-            
-        try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            current_user = data['user_id']
-        except:
-            return jsonify({'message': 'Token is invalid'}), 401
+        if error:
+            return jsonify(error[0]), error[1]
             
         return f(current_user, *args, **kwargs)
         
@@ -64,195 +220,501 @@ def hash_password(password):
 
 # Function to get recent transactions (last 7 days)
 def get_recent_transactions(user_id):
-    if user_id not in transactions:
-        return []
-    
+    write_behind.wait_for_user(user_id)
     one_week_ago = datetime.now() - timedelta(days=7)
-    return [
-        tx for tx in transactions[user_id] 
-        if datetime.fromisoformat(tx['timestamp']) >= one_week_ago
-    ]
+    return storage.get_transactions(user_id, start=one_week_ago)
+
+# Function to get a user's rolling 7-day spending window
+def get_spending_window(user_id):
+    cached = spending_windows.get(user_id)
+    if cached is not None and cached[0] == storage.get_data_version(user_id):
+        return cached[1]
+    
+    # Build under the user's lock so no write lands between reading the version and the transactions
+    with storage.user_lock(user_id):
+        version = storage.get_data_version(user_id)
+        window = SpendingWindow(days=7)
+        window.add_all(storage.get_transactions(user_id, start=window.start()))
+    
+    spending_windows[user_id] = (version, window)
+    return window
+
+# Function to mark a user's derived data (snapshots, etc.) as stale after a write
+def bump_data_version(user_id, new_transactions=()):
+    """Bump the shared data version, folding new transactions into this worker's window.
+
+    Callers hold storage.user_lock(user_id). A window that saw every earlier
+    version just absorbs the new rows; one that missed another worker's
+    write is dropped and rebuilt on the next read.
+    """
+    version = storage.bump_data_version(user_id)
+    
+    cached = spending_windows.get(user_id)
+    if cached is not None:
+        if cached[0] == version - 1:
+            cached[1].add_all(new_transactions)
+            spending_windows[user_id] = (version, cached[1])
+        else:
+            spending_windows.pop(user_id, None)
+    
+    return version
+
+# Function to build the ETag for a user's current data version
+def make_etag(user_id, daily=False):
+    """ETag for the user's data version; daily ETags also change at midnight as the window rolls"""
+    tag = f"{ETAG_PREFIX}-{storage.get_data_version(user_id)}"
+    if daily:
+        tag += f"-{datetime.now().date().isoformat()}"
+    return f'"{tag}"'
+
+# Function to check an If-None-Match header against an ETag
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+# Function to answer a conditional GET from the user's data version
+def conditional_result(route, user_id, compute, if_none_match, daily=False):
+    """Return (JSON text or None, status, headers) for a versioned GET route.
+
+    A matching If-None-Match gives (None, 304, headers) without computing
+    anything; otherwise the body serialized for the current version is
+    reused, or computed with compute(user_id) and cached.
+    """
+    # Let the user's own queued writes land first, so they read what they wrote
+    write_behind.wait_for_user(user_id)
+    etag = make_etag(user_id, daily)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache', 'Vary': 'Authorization'}
+    
+    if etag_matches(if_none_match, etag):
+        return None, 304, headers
+    
+    cached = response_cache.get((route, user_id))
+    if cached is not None and cached[0] == etag:
+        return cached[1], cached[2], headers
+    
+    body, status = compute(user_id)
+    text = json.dumps(body, default=str)
+    response_cache[(route, user_id)] = (etag, text, status)
+    return text, status, headers
+
+# Function to get the weekly summary shared by /get_alerts and /dashboard_stats
+def get_weekly_snapshot(user_id):
+    """Compute (or reuse) recent spend, alerts and savings progress for a user"""
+    write_behind.wait_for_user(user_id)
+    return compute_weekly_snapshot(user_id)
+
+# Function to get the weekly summary without waiting for queued writes (used by the writers themselves)
+def compute_weekly_snapshot(user_id):
+    version = storage.get_data_version(user_id)
+    today = datetime.now().date()
+    
+    cached = weekly_snapshots.get(user_id)
+    if cached is not None and cached[0] == version and cached[1] == today:
+        return cached[2]
+    
+    profile = storage.get_profile(user_id)
+    if profile is None:
+        return None
+    
+    # Spending by category in the last week
+    category_totals = get_spending_window(user_id).category_totals()
+    total_spent_this_week = sum(category_totals.values())
+    
+    # Generate alerts based on thresholds
+    alerts = check_spending_thresholds(category_totals)
+    
+    # Check if user is on track for their savings goal
+    if 'Desired_Savings' in profile and 'Income' in profile:
+        weekly_savings_goal = profile['Desired_Savings'] / 4  # Assuming monthly savings goal
+        weekly_income = profile['Income'] / 4  # Assuming monthly income
+        
+        actual_saved = weekly_income - total_spent_this_week
+        
+        if actual_saved < weekly_savings_goal:
+            shortfall = weekly_savings_goal - actual_saved
+            alerts.append({
+                "category": "savings",
+                "shortfall": shortfall,
+                "goal": weekly_savings_goal,
+                "message": f"You're ₹{shortfall:.2f} short of your weekly savings goal of ₹{weekly_savings_goal:.2f}."
+            })
+    
+    # Calculate savings progress
+    weekly_income = profile.get('Income', 0) / 4  # Assuming monthly income
+    weekly_savings_goal = profile.get('Desired_Savings', 0) / 4  # Assuming monthly savings goal
+    actual_saved = weekly_income - total_spent_this_week
+    savings_progress = (actual_saved / weekly_savings_goal * 100) if weekly_savings_goal > 0 else 0
+    
+    # Truncate to 100% if exceeded
+    savings_progress = min(savings_progress, 100)
+    
+    snapshot = {
+        "opted_out": storage.get_preferences(user_id).get('opted_out', False),
+        "recent_spending": total_spent_this_week,
+        "category_breakdown": category_totals,
+        "alerts": alerts,
+        "savings_goal": weekly_savings_goal,
+        "actual_saved": actual_saved,
+        "savings_progress": savings_progress,
+        "disposable_income": profile.get('Disposable_Income', 0)
+    }
+    
+    weekly_snapshots[user_id] = (version, today, snapshot)
+    return snapshot
+
+# Function to check weekly category spending against SPENDING_THRESHOLDS
+def check_spending_thresholds(category_totals):
+    spending_by_category = {}
+    for category, spent in category_totals.items():
+        category = category.lower()
+        spending_by_category[category] = spending_by_category.get(category, 0) + spent
+    
+    alerts = []
+    for category, threshold in SPENDING_THRESHOLDS.items():
+        spent = spending_by_category.get(category, 0)
+        if spent > threshold:
+            alerts.append({
+                "category": category,
+                "amount_spent": spent,
+                "threshold": threshold,
+                "message": f"You've spent ₹{spent:.2f} on {category} this week, which exceeds your ₹{threshold} threshold!"
+            })
+    return alerts
 
 # Function to update user profile based on a transaction
 def update_user_profile(user_id, transaction):
-    if user_id not in user_profiles:
+    update_user_profile_batch(user_id, [transaction])
+
+# Function to update user profile based on a batch of transactions
+def update_user_profile_batch(user_id, new_transactions):
+    profile = storage.get_profile(user_id)
+    if profile is None:
         return
     
-    profile = user_profiles[user_id]
-    category = transaction.get('category', 'Miscellaneous')
-    amount = float(transaction.get('amount', 0))
-    
-    # Map transaction category to profile field
-    category_map = {
-        'groceries': 'Groceries',
-        'transport': 'Transport',
-        'eating_out': 'Eating_Out',
-        'entertainment': 'Entertainment',
-        'utilities': 'Utilities',
-        'healthcare': 'Healthcare',
-        'education': 'Education',
-        'miscellaneous': 'Miscellaneous'
-    }
-    
-    profile_category = category_map.get(category.lower(), 'Miscellaneous')
+    # Sum the batch per profile category so the profile is touched once
+    category_deltas = {}
+    total = 0
+    for tx in new_transactions:
+        category = tx.get('category', 'Miscellaneous')
+        amount = float(tx.get('amount', 0))
+        
+        # Map transaction category to profile field
+        profile_category = CATEGORY_MAP.get(category.lower(), 'Miscellaneous')
+        category_deltas[profile_category] = category_deltas.get(profile_category, 0) + amount
+        total += amount
     
-    # Update the spending in that category
-    if profile_category in profile:
-        profile[profile_category] += amount
+    # Update the spending in each category
+    for profile_category, amount in category_deltas.items():
+        if profile_category in profile:
+            profile[profile_category] += amount
     
     # Update disposable income
     if 'Disposable_Income' in profile:
-        profile['Disposable_Income'] -= amount
+        profile['Disposable_Income'] -= total
     
     # Recalculate potential savings based on new spending patterns
-    update_potential_savings(user_id)
+    update_potential_savings(profile)
+    
+    storage.save_profile(user_id, profile)
+    rescorer.mark(user_id)
 
-# Function to calculate potential savings for each category
-def update_potential_savings(user_id):
-    if user_id not in user_profiles:
-        return
+# Function to check the fields the profile update relies on, raising ValueError if one is unusable
+def validate_transaction(tx):
+    if not isinstance(tx, dict):
+        raise ValueError("Transaction must be a JSON object")
+    if 'amount' not in tx:
+        raise ValueError("Missing amount")
+    # nan and inf parse as floats but would poison every total they are added to
+    if not math.isfinite(float(tx['amount'])):
+        raise ValueError("Amount must be a finite number")
+    if not isinstance(tx.get('category', ''), str):
+        raise ValueError("Category must be a string")
+
+# Function to fill in defaults and validate one submitted or bulk-ingested transaction
+def prepare_transaction(tx):
+    validate_transaction(tx)
     
-    profile = user_profiles[user_id]
+    # Add timestamp and transaction ID if not provided
+    if 'timestamp' not in tx:
+        tx['timestamp'] = datetime.now().isoformat()
+    if 'transaction_id' not in tx:
+        tx['transaction_id'] = str(uuid.uuid4())
     
-    # Simple logic: potential savings is 10% of current spending in each category
-    for category in ['Groceries', 'Transport', 'Eating_Out', 'Entertainment', 
-                    'Utilities', 'Healthcare', 'Education', 'Miscellaneous']:
-        if category in profile:
-            savings_field = f'Potential_Savings_{category}'
-            profile[savings_field] = round(profile[category] * 0.1, 2)
+    return normalize_transaction(tx)
+
+# Function to store validated transactions and update everything derived from them
+def apply_transactions(user_id, transactions):
+    """Store new transactions and return those skipped as replays"""
+    with storage.user_lock(user_id):
+        # Re-checked under the lock: a replay may have been queued before the original landed
+        transactions, duplicates = split_duplicates(user_id, transactions)
+        if not transactions:
+            return duplicates
+        
+        # Check the whole batch before storing any of it, so a bad row can't leave it half-applied
+        for tx in transactions:
+            validate_transaction(tx)
+        ensure_normalized(transactions)
+        
+        storage.add_transactions(user_id, transactions)
+        update_user_profile_batch(user_id, transactions)
+        bump_data_version(user_id, transactions)
+        
+        try:
+            transaction_log.append(user_id, transactions)
+        except Exception as e:
+            logger.error(f"Error saving transactions: {e}")
+    
+    publish_alert_changes(user_id)
+    return duplicates
+
+# Function to separate replayed transactions (by transaction_id) from new ones
+def split_duplicates(user_id, transactions, queued=()):
+    """(new, duplicates): a transaction whose id is already stored, already queued
+    in `queued`, or repeated earlier in the same batch is a duplicate"""
+    seen = {str(tx.get('transaction_id')) for tx in queued}
+    ids = [str(tx['transaction_id']) for tx in transactions]
+    seen.update(storage.existing_transaction_ids(user_id, ids))
+    
+    new, duplicates = [], []
+    for tx, tx_id in zip(transactions, ids):
+        if tx_id in seen:
+            duplicates.append(tx)
+        else:
+            seen.add(tx_id)
+            new.append(tx)
+    return new, duplicates
+
+# Submitted transactions are applied by background threads, coalesced per user
+write_behind = WriteBehind(apply_transactions, max_pending=WRITE_BEHIND_MAX_PENDING, workers=WRITE_BEHIND_WORKERS)
+
+# Function to calculate potential savings for each category
+def update_potential_savings(profile):
+    # With the savings models loaded, the rescorer fills these in off the request path
+    if not savings_model.ready:
+        # Fallback: potential savings is 10% of current spending in each category
+        for category in ['Groceries', 'Transport', 'Eating_Out', 'Entertainment', 
+                        'Utilities', 'Healthcare', 'Education', 'Miscellaneous']:
+            if category in profile:
+                savings_field = f'Potential_Savings_{category}'
+                profile[savings_field] = round(profile[category] * 0.1, 2)
     
     # Update desired savings based on income
     if 'Income' in profile and 'Desired_Savings_Percentage' in profile:
         profile['Desired_Savings'] = round(profile['Income'] * (profile['Desired_Savings_Percentage'] / 100), 2)
 
-# Routes
-@app.route('/auth/login', methods=['POST'])
-def login():
-    data = request.json
+# Function to write model-predicted potential savings into a batch of users' profiles
+def rescore_users(user_ids):
+    """Score the users' current profiles together and save the results (run by the rescorer)"""
+    if not savings_model.ready:
+        return
+    
+    profiles = {}
+    for user_id in user_ids:
+        profile = storage.get_profile(user_id)
+        if profile is not None:
+            profiles[user_id] = profile
+    if not profiles:
+        return
     
+    try:
+        scores = dict(zip(profiles, score_profiles(list(profiles.values()))))
+    except ValueError:
+        # A malformed profile fails the whole batch; score the rest one by one
+        scores = {}
+        for user_id, profile in profiles.items():
+            try:
+                scores[user_id] = score_profiles([profile])[0]
+            except ValueError as e:
+                logger.warning(f"Not re-scoring {user_id}: {e}")
+    
+    for user_id, score in scores.items():
+        with storage.user_lock(user_id):
+            # Apply to the latest profile; a change since it was scored marked the user again
+            profile = storage.get_profile(user_id)
+            if profile is None:
+                continue
+            for category, savings in score['predicted_savings'].items():
+                profile[f'Potential_Savings_{category.title()}'] = savings
+            storage.save_profile(user_id, profile)
+            bump_data_version(user_id)
+
+# Users whose profiles changed are re-scored in batches, at most once per interval each
+rescorer = Rescorer(rescore_users, interval=RESCORE_INTERVAL, max_batch=RESCORE_MAX_BATCH)
+
+# On exit, apply every queued write, then score the users those writes marked
+# (atexit runs handlers in reverse order of registration)
+atexit.register(rescorer.close)
+atexit.register(write_behind.close)
+
+class ProfileServiceError(Exception):
+    """Raised when the profile service returns an error response"""
+
+# Pooled keep-alive client for outbound calls (shared with financial_behavior_ml2)
+http_client = configure_shared_client(
+    timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+    max_connections_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+    retries=HTTP_RETRIES,
+    backoff=HTTP_RETRY_BACKOFF
+)
+
+# The key goes in a header rather than the query string, so it never shows
+# up in URLs quoted by exception messages and retry warnings
+MOCKAROO_HEADERS = {'X-API-Key': MOCKAROO_API_KEY}
+
+# Function to fetch a batch of raw profile records from Mockaroo
+def fetch_profile_batch(count):
+    start = time.perf_counter()
+    try:
+        response = http_client.get(f"{MOCKAROO_ENDPOINT}?count={count}", headers=MOCKAROO_HEADERS)
+    except Exception:
+        profile_service_latency.observe(time.perf_counter() - start, 'error')
+        raise
+    
+    outcome = 'ok' if response.status_code == 200 else 'error'
+    profile_service_latency.observe(time.perf_counter() - start, outcome)
+    
+    if response.status_code != 200:
+        raise ProfileServiceError(f"Mockaroo API returned status code {response.status_code}")
+    
+    return response.json()
+
+# Pre-fetched Mockaroo profiles, with a synthetic fallback when Mockaroo is down
+profile_pool = ProfilePool(
+    fetch_profile_batch,
+    batch_size=PROFILE_POOL_BATCH_SIZE,
+    low_water=PROFILE_POOL_LOW_WATER,
+    retry_interval=PROFILE_POOL_RETRY_INTERVAL
+)
+profile_pool.refill_async()
+
+# Function to rebuild per-process resources in a forked worker (e.g. gunicorn --preload)
+def reinit_after_fork():
+    global alert_states_lock, sync_streams
+    storage.reset_after_fork()
+    http_client.reset_after_fork()
+    token_cache.reset_after_fork()
+    transaction_log.reset_after_fork()
+    transaction_log.start_compaction()
+    profile_pool.reset_after_fork()
+    profile_pool.refill_async()
+    write_behind.reset_after_fork()
+    rescorer.reset_after_fork()
+    alert_hub.reset_after_fork()
+    spending_windows.reset_after_fork()
+    spending_windows.clear()  # A window's lock may have been held at the fork; they're rebuilt on demand
+    weekly_snapshots.reset_after_fork()
+    response_cache.reset_after_fork()
+    alert_states.clear()
+    alert_states_lock = threading.Lock()
+    sync_streams = threading.BoundedSemaphore(SSE_MAX_SYNC_STREAMS)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reinit_after_fork)
+
+# Function to take one raw profile record from the pool
+def fetch_profile_data():
+    return profile_pool.take()
+
+# Function to add derived fields to a raw Mockaroo profile record
+def build_profile(profile_data):
+    # Calculate derived fields
+    income = float(profile_data.get('Income', 0))
+    expenses = sum([
+        float(profile_data.get('Rent', 0)),
+        float(profile_data.get('Loan_Repayment', 0)),
+        float(profile_data.get('Insurance', 0)),
+        float(profile_data.get('Groceries', 0)),
+        float(profile_data.get('Transport', 0)),
+        float(profile_data.get('Eating_Out', 0)),
+        float(profile_data.get('Entertainment', 0)),
+        float(profile_data.get('Utilities', 0)),
+        float(profile_data.get('Healthcare', 0)),
+        float(profile_data.get('Education', 0)),
+        float(profile_data.get('Miscellaneous', 0))
+    ])
+    
+    savings_percentage = float(profile_data.get('Desired_Savings_Percentage', 10))
+    desired_savings = round(income * (savings_percentage / 100), 2)
+    disposable_income = round(income - expenses, 2)
+    
+    # Add calculated fields
+    profile_data['Desired_Savings'] = desired_savings
+    profile_data['Disposable_Income'] = disposable_income
+    
+    # Calculate potential savings for each category (30% of current spending)
+    for category in ['Groceries', 'Transport', 'Eating_Out', 'Entertainment', 
+                    'Utilities', 'Healthcare', 'Education', 'Miscellaneous']:
+        savings_field = f'Potential_Savings_{category}'
+        profile_data[savings_field] = round(float(profile_data.get(category, 0)) * 0.3, 2)
+    
+    return profile_data
+
+# Function to store a newly generated profile
+def store_generated_profile(user_id, profile_data):
+    profile = build_profile(profile_data)
+    with storage.user_lock(user_id):
+        storage.save_profile(user_id, profile)
+        bump_data_version(user_id)
+    rescorer.mark(user_id)
+    return profile
+
+# Function to generate and store a profile for a user (blocks on the network call)
+def create_user_profile(user_id):
+    return store_generated_profile(user_id, fetch_profile_data())
+
+# Function to find or create the user logging in
+def find_or_create_user(data):
+    """Return (username, user, is_new, error) for a login request body"""
     if not data or 'username' not in data or 'password' not in data:
-        return jsonify({"error": "Missing username or password"}), 400
+        return None, None, False, ({"error": "Missing username or password"}, 400)
         
     username = data['username']
-    password = data['password']
     
-    # Mock authentication (replace with database in production)
-    if username not in users:
+    # Lock the username so concurrent first logins (possibly on different
+    # workers) agree on which one creates the user
+    with storage.user_lock(username):
+        # Mock authentication (replace with database in production)
+        user = storage.get_user(username)
+        if user is not None:
+            return username, user, False, None
+        
         # For demo, create user if not exists
-        users[username] = {
-            'password': hash_password(password),
-            'user_id': str(len(users) + 1)
+        user = {
+            'password': hash_password(data['password']),
+            'user_id': str(storage.count_users() + 1)
         }
-        
-        # Generate initial profile for new user
-        try:
-            generate_user_profile(username)
-        except Exception as e:
-            logger.error(f"Error generating user profile: {e}")
-    
-    stored_password = users[username]['password']
-    
-    if hash_password(password) == stored_password:
-        # Generate JWT token
-        token = jwt.encode(
-            {'user_id': username, 'exp': datetime.utcnow().timestamp() + 3600},
-            JWT_SECRET,
-            algorithm="HS256"
-        )
-        
-        return jsonify({
-            'token': token,
+        storage.add_user(username, user)
+    return username, user, True, None
+
+# Function to check a password and issue a token
+def complete_login(username, user, password):
+    if hash_password(password) == user['password']:
+        return {
+            'token': issue_token(username),
             'user_id': username,
-            'profile': user_profiles.get(username, {})
-        })
+            'profile': storage.get_profile(username) or {}
+        }, 200
     
-    return jsonify({"error": "Invalid credentials"}), 401
+    return {"error": "Invalid credentials"}, 401
 
-@app.route('/generate_profile', methods=['GET'])
-@token_required
-def generate_user_profile(current_user):
-    """Generate a financial profile for the user using Mockaroo"""
-    try:
-        # Define the fields we need from Mockaroo
-        fields = [
-            "Income", "Age", "Dependents", "Occupation", "City_Tier", 
-            "Rent", "Loan_Repayment", "Insurance", "Groceries", 
-            "Transport", "Eating_Out", "Entertainment", "Utilities", 
-            "Healthcare", "Education", "Miscellaneous", 
-            "Desired_Savings_Percentage"
-        ]
-        
-        # Make request to Mockaroo for a single record
-        headers = {'X-API-Key': MOCKAROO_API_KEY}
-        response = requests.get(f"{MOCKAROO_ENDPOINT}?count=1&key={MOCKAROO_API_KEY}")
-        
-        if response.status_code == 200:
-            profile_data = response.json()[0]
-            
-            # Calculate derived fields
-            income = float(profile_data.get('Income', 0))
-            expenses = sum([
-                float(profile_data.get('Rent', 0)),
-                float(profile_data.get('Loan_Repayment', 0)),
-                float(profile_data.get('Insurance', 0)),
-                float(profile_data.get('Groceries', 0)),
-                float(profile_data.get('Transport', 0)),
-                float(profile_data.get('Eating_Out', 0)),
-                float(profile_data.get('Entertainment', 0)),
-                float(profile_data.get('Utilities', 0)),
-                float(profile_data.get('Healthcare', 0)),
-                float(profile_data.get('Education', 0)),
-                float(profile_data.get('Miscellaneous', 0))
-            ])
-            
-            savings_percentage = float(profile_data.get('Desired_Savings_Percentage', 10))
-            desired_savings = round(income * (savings_percentage / 100), 2)
-            disposable_income = round(income - expenses, 2)
-            
-            # Add calculated fields
-            profile_data['Desired_Savings'] = desired_savings
-            profile_data['Disposable_Income'] = disposable_income
-            
-            # Calculate potential savings for each category (10% of current spending)
-            for category in ['Groceries', 'Transport', 'Eating_Out', 'Entertainment', 
-                            'Utilities', 'Healthcare', 'Education', 'Miscellaneous']:
-                savings_field = f'Potential_Savings_{category}'
-                profile_data[savings_field] = round(float(profile_data.get(category, 0)) * 0.3, 2)
-            
-            # Store the profile
-            user_profiles[current_user] = profile_data
-            
-            # Initialize transactions list for the user
-            if current_user not in transactions:
-                transactions[current_user] = []
-            
-            return jsonify({
-                "message": "User profile generated successfully",
-                "profile": profile_data
-            })
-        else:
-            return jsonify({"error": f"Mockaroo API returned status code {response.status_code}"}), 400
-            
-    except Exception as e:
-        logger.error(f"Error generating user profile: {e}")
-        return jsonify({"error": str(e)}), 500
+# The functions below hold the logic behind each route. They take plain
+# inputs and return (body, status) so the Flask app here and the ASGI app
+# in asgi_api.py can share them.
 
-@app.route('/get_profile', methods=['GET'])
-@token_required
-def get_profile(current_user):
-    """Get the user's financial profile"""
-    if current_user not in user_profiles:
-        return jsonify({"error": "Profile not found"}), 404
+def profile_result(user_id):
+    write_behind.wait_for_user(user_id)
+    profile = storage.get_profile(user_id)
+    if profile is None:
+        return {"error": "Profile not found"}, 404
         
-    return jsonify(user_profiles[current_user])
+    return profile, 200
 
-@app.route('/submit_transaction', methods=['POST'])
-@token_required
-def submit_transaction(current_user):
-    data = request.json
-    
+def submit_transaction_result(user_id, data):
     if not data:
-        return jsonify({"error": "No transaction data provided"}), 400
+        return {"error": "No transaction data provided"}, 400
         
     # Process single transaction or batch
     if isinstance(data, list):
@@ -260,140 +722,221 @@ def submit_transaction(current_user):
     else:
         new_transactions = [data]
     
+    # Validate everything now: the batch is stored after the response is sent,
+    # and a bad row must still reject the whole batch
     result_transactions = []
+    for index, tx in enumerate(new_transactions):
+        try:
+            result_transactions.append(prepare_transaction(tx))
+        except (TypeError, ValueError) as e:
+            return {"error": f"Invalid transaction at index {index}: {e}"}, 400
     
-    # Initialize user transaction list if not exists
-    if current_user not in transactions:
-        transactions[current_user] = []
-    
-    for tx in new_transactions:
-        # Add timestamp and transaction ID if not provided
-        if 'timestamp' not in tx:
-            tx['timestamp'] = datetime.now().isoformat()
-        if 'transaction_id' not in tx:
-            tx['transaction_id'] = str(uuid.uuid4())
-            
-        # Update the user profile based on this transaction
-        update_user_profile(current_user, tx)
-            
-        # Add to list of processed transactions
-        result_transactions.append(tx)
-            
-    # Add transactions to user history
-    transactions[current_user].extend(result_transactions)
+    # Client retries replay transaction_ids; skip ids already stored or queued
+    accepted, duplicates = split_duplicates(user_id, result_transactions, write_behind.queued(user_id))
+    if duplicates:
+        duplicate_transactions.inc('/submit_transaction', amount=len(duplicates))
     
-    # Save transactions to processed data folder
-    try:
-        df = pd.DataFrame(transactions[current_user])
-        os.makedirs('data/processed', exist_ok=True)
-        df.to_csv(f'data/processed/user_{current_user}_transactions.csv', index=False)
-    except Exception as e:
-        logger.error(f"Error saving transactions: {e}")
+    # Storage, the profile update and the transaction log happen on the write-behind threads
+    if accepted:
+        try:
+            write_behind.submit(user_id, accepted, timeout=WRITE_BEHIND_SUBMIT_TIMEOUT)
+        except QueueFull:
+            return {"error": "Too many pending writes, please retry"}, 503
     
-    return jsonify({
-        "message": f"{len(result_transactions)} transaction(s) added successfully",
-        "transactions": result_transactions,
-        "updated_profile": user_profiles.get(current_user, {})
-    })
+    return {
+        "message": f"{len(accepted)} transaction(s) accepted",
+        "transactions": accepted,
+        "duplicates": [tx['transaction_id'] for tx in duplicates]
+    }, 202 if accepted else 200
 
-@app.route('/get_transactions', methods=['GET'])
-@token_required
-def get_transactions(current_user):
-    """Get all transactions for the user"""
-    if current_user not in transactions:
-        return jsonify([])
-    
-    # Optional: filter by date range
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+class BulkIngest:
+    """Validates NDJSON lines as they arrive and applies them in chunks"""
     
-    user_txs = transactions[current_user]
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.start_time = time.perf_counter()
+        self.line_no = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.rejected_rows = []
+        self.duplicates = 0
+        self.duplicate_rows = []
+        self.chunk = []
+        self.chunk_lines = []
     
-    if start_date:
-        start = datetime.fromisoformat(start_date)
-        user_txs = [tx for tx in user_txs if datetime.fromisoformat(tx['timestamp']) >= start]
+    def feed(self, line):
+        self.line_no += 1
+        line = line.strip()
+        if not line:
+            return
+        
+        try:
+            self.chunk.append(prepare_transaction(json.loads(line)))
+            self.chunk_lines.append(self.line_no)
+        except (TypeError, ValueError) as e:
+            self.rejected += 1
+            if len(self.rejected_rows) < BULK_MAX_REPORTED_REJECTS:
+                self.rejected_rows.append({"line": self.line_no, "error": str(e)})
+            return
+        
+        if len(self.chunk) >= BULK_CHUNK_SIZE:
+            self._flush()
     
-    if end_date:
-        end = datetime.fromisoformat(end_date)
-        user_txs = [tx for tx in user_txs if datetime.fromisoformat(tx['timestamp']) <= end]
+    def _flush(self):
+        duplicates = {id(tx) for tx in apply_transactions(self.user_id, self.chunk)}
+        self.accepted += len(self.chunk) - len(duplicates)
+        self.duplicates += len(duplicates)
+        
+        if duplicates:
+            duplicate_transactions.inc('/bulk_transactions', amount=len(duplicates))
+            for tx, line_no in zip(self.chunk, self.chunk_lines):
+                if id(tx) in duplicates and len(self.duplicate_rows) < BULK_MAX_REPORTED_REJECTS:
+                    self.duplicate_rows.append({"line": line_no, "transaction_id": tx['transaction_id']})
+        self.chunk = []
+        self.chunk_lines = []
     
-    return jsonify(user_txs)
+    def finish(self):
+        if self.chunk:
+            self._flush()
+        
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "message": f"{self.accepted} transaction(s) added successfully",
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rejected_rows": self.rejected_rows,
+            "duplicates": self.duplicates,
+            "duplicate_rows": self.duplicate_rows,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.accepted / elapsed, 1) if elapsed > 0 else None
+        }, 200
 
-@app.route('/get_recent_transactions', methods=['GET'])
-@token_required
-def get_user_recent_transactions(current_user):
-    """Get transactions from the last 7 days"""
-    recent_txs = get_recent_transactions(current_user)
-    return jsonify(recent_txs)
+# Function to encode the (timestamp, transaction_id) of a page's last row as an opaque cursor
+def encode_cursor(tx):
+    key = json.dumps([str(tx['timestamp']), str(tx.get('transaction_id', ''))])
+    return base64.urlsafe_b64encode(key.encode()).decode()
 
-@app.route('/get_alerts', methods=['GET'])
-@token_required
-def get_alerts(current_user):
-    """Get spending alerts based on recent transactions"""
-    if current_user not in user_profiles:
-        return jsonify([])
+# Function to decode a cursor back to (timestamp, transaction_id), raising ValueError if invalid
+def decode_cursor(cursor):
+    try:
+        timestamp, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    return timestamp, transaction_id
+
+def transactions_result(user_id, args):
+    """One page of transactions, oldest first, as {'transactions', 'next_cursor'}"""
+    try:
+        # Optional: filter by date range
+        start_date = args.get('start_date')
+        end_date = args.get('end_date')
         
-    # Check if user has opted out
-    if current_user in user_preferences and user_preferences[current_user].get('opted_out', False):
-        return jsonify({"message": "User has opted out of tracking"}), 403
-    
-    profile = user_profiles[current_user]
-    recent_txs = get_recent_transactions(current_user)
-    
-    # Calculate spending by category in the last week
-    spending_by_category = {}
-    for tx in recent_txs:
-        category = tx.get('category', 'other').lower()
-        amount = float(tx.get('amount', 0))
+        start = datetime.fromisoformat(start_date) if start_date else None
+        end = datetime.fromisoformat(end_date) if end_date else None
         
-        if category not in spending_by_category:
-            spending_by_category[category] = 0
-        spending_by_category[category] += amount
+        limit = int(args.get('limit', TRANSACTIONS_PAGE_SIZE))
+        if not 1 <= limit <= TRANSACTIONS_MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {TRANSACTIONS_MAX_PAGE_SIZE}")
+        
+        after = decode_cursor(args['cursor']) if args.get('cursor') else None
+    except ValueError as e:
+        return {"error": str(e)}, 400
     
-    alerts = []
+    # Fetch one extra row to learn whether another page follows
+    write_behind.wait_for_user(user_id)
+    page = storage.page_transactions(user_id, start, end, after, limit + 1)
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
     
-    # Generate alerts based on thresholds
-    for category, spent in spending_by_category.items():
-        if category in SPENDING_THRESHOLDS and spent > SPENDING_THRESHOLDS[category]:
-            alerts.append({
-                "category": category,
-                "amount_spent": spent,
-                "threshold": SPENDING_THRESHOLDS[category],
-                "message": f"You've spent ₹{spent:.2f} on {category} this week, which exceeds your ₹{SPENDING_THRESHOLDS[category]} threshold!"
-            })
+    # Optional field projection, e.g. fields=amount,category,timestamp
+    fields = [field for field in args.get('fields', '').split(',') if field]
+    if fields:
+        page = [{field: tx[field] for field in fields if field in tx} for tx in page]
     
-    # Check if user is on track for their savings goal
-    if 'Desired_Savings' in profile and 'Income' in profile:
-        weekly_savings_goal = profile['Desired_Savings'] / 4  # Assuming monthly savings goal
+    return {"transactions": page, "next_cursor": next_cursor}, 200
+
+def rollups_result(user_id, args):
+    """Spending per category in day, week or month buckets between start_date and end_date"""
+    try:
+        granularity = args.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        step = 7 if granularity == 'week' else 1
         
-        total_spent_this_week = sum(spending_by_category.values())
-        weekly_income = profile['Income'] / 4  # Assuming monthly income
+        end_date = args.get('end_date')
+        end = datetime.fromisoformat(end_date).date() if end_date else datetime.now().date()
+        end_bucket = bucket_of(end.toordinal(), granularity)
         
-        actual_saved = weekly_income - total_spent_this_week
+        start_date = args.get('start_date')
+        if start_date:
+            start_bucket = bucket_of(datetime.fromisoformat(start_date).date().toordinal(), granularity)
+        else:
+            start_bucket = end_bucket - (ROLLUPS_DEFAULT_BUCKETS - 1) * step
         
-        if actual_saved < weekly_savings_goal:
-            shortfall = weekly_savings_goal - actual_saved
-            alerts.append({
-                "category": "savings",
-                "shortfall": shortfall,
-                "goal": weekly_savings_goal,
-                "message": f"You're ₹{shortfall:.2f} short of your weekly savings goal of ₹{weekly_savings_goal:.2f}."
-            })
+        if start_bucket > end_bucket:
+            raise ValueError("start_date must not be after end_date")
+        if (end_bucket - start_bucket) // step + 1 > ROLLUPS_MAX_BUCKETS:
+            raise ValueError(f"range must span at most {ROLLUPS_MAX_BUCKETS} {granularity} buckets")
+        first_day = bucket_start(start_bucket, granularity)
+    except (ValueError, OverflowError) as e:
+        return {"error": str(e)}, 400
+    
+    categories = {category for category in args.get('categories', '').split(',') if category}
+    
+    write_behind.wait_for_user(user_id)
+    buckets = {}
+    for bucket, category, amount, count in storage.get_rollups(user_id, granularity, start_bucket, end_bucket):
+        if categories and category not in categories:
+            continue
+        entry = buckets.get(bucket)
+        if entry is None:
+            entry = buckets[bucket] = {"start": bucket_start(bucket, granularity).isoformat(),
+                                       "total": 0.0, "count": 0, "categories": {}}
+        entry["categories"][category] = round(amount, 2)
+        entry["total"] += amount
+        entry["count"] += count
     
-    return jsonify(alerts)
+    for entry in buckets.values():
+        entry["total"] = round(entry["total"], 2)
+    
+    return {
+        "granularity": granularity,
+        "start_date": first_day.isoformat(),
+        "end_date": end.isoformat(),
+        "buckets": list(buckets.values())
+    }, 200
 
-@app.route('/get_suggestions', methods=['GET'])
-@token_required
-def get_suggestions(current_user):
-    """Get personalized savings suggestions"""
-    if current_user not in user_profiles:
-        return jsonify([])
+def iter_transactions_json(body, chunk_size=100):
+    """Serialize a transactions_result body as JSON text in chunks, for streamed responses"""
+    transactions = body['transactions']
+    yield '{"transactions": ['
+    for i in range(0, len(transactions), chunk_size):
+        chunk = ', '.join(json.dumps(tx, default=str) for tx in transactions[i:i + chunk_size])
+        yield chunk if i == 0 else ', ' + chunk
+    yield f'], "next_cursor": {json.dumps(body["next_cursor"])}}}'
+
+def alerts_result(user_id):
+    snapshot = get_weekly_snapshot(user_id)
+    if snapshot is None:
+        return [], 200
         
     # Check if user has opted out
-    if current_user in user_preferences and user_preferences[current_user].get('opted_out', False):
-        return jsonify({"message": "User has opted out of tracking"}), 403
+    if snapshot['opted_out']:
+        return {"message": "User has opted out of tracking"}, 403
+    
+    return snapshot['alerts'], 200
+
+def suggestions_result(user_id):
+    write_behind.wait_for_user(user_id)
+    profile = storage.get_profile(user_id)
+    if profile is None:
+        return [], 200
+        
+    # Check if user has opted out
+    if storage.get_preferences(user_id).get('opted_out', False):
+        return {"message": "User has opted out of tracking"}, 403
     
-    profile = user_profiles[current_user]
     suggestions = []
     
     # Generate suggestions based on potential savings
@@ -424,101 +967,376 @@ def get_suggestions(current_user):
             "message": f"SAVINGS CHALLENGE: Cut your {top_category} spending by 15% this week to earn 50 bonus points!"
         })
     
-    return jsonify(top_suggestions)
+    return top_suggestions, 200
 
-@app.route('/opt_out', methods=['POST'])
-@token_required
-def opt_out(current_user):
-    data = request.json
+# Function to score profiles with the savings models, recording inference latency
+def score_profiles(profiles):
+    """Predicted savings per category for each profile; raises ValueError for a malformed profile"""
+    batch = 'single' if len(profiles) == 1 else 'batch'
+    start = time.perf_counter()
+    predictions = savings_model.predict(profiles)
+    savings_inference_latency.observe(time.perf_counter() - start, batch)
+    savings_profiles_scored.inc(batch, amount=len(profiles))
+    return [{
+        "predicted_savings": prediction,
+        "total_potential_savings": round(sum(prediction.values()), 2)
+    } for prediction in predictions]
+
+def predict_savings_result(user_id, data):
+    """Model-predicted savings for one profile, a list of profiles, or (with no body) the user's own"""
+    if not savings_model.ready:
+        return {"error": "Savings model unavailable"}, 503
+    
+    if not data:
+        write_behind.wait_for_user(user_id)
+        data = storage.get_profile(user_id)
+        if data is None:
+            return {"error": "Profile not found"}, 404
+    
+    single = isinstance(data, dict)
+    profiles = [data] if single else data
+    if not isinstance(profiles, list) or not all(isinstance(profile, dict) for profile in profiles):
+        return {"error": "Expected a profile object or a list of profiles"}, 400
+    if len(profiles) > SAVINGS_MAX_BATCH:
+        return {"error": f"At most {SAVINGS_MAX_BATCH} profiles per request"}, 400
+    
+    try:
+        scores = score_profiles(profiles)
+    except ValueError as e:
+        return {"error": str(e)}, 400
     
+    return (scores[0] if single else {"predictions": scores}), 200
+
+def opt_out_result(user_id, data):
     if data is None:
-        return jsonify({"error": "No data provided"}), 400
+        return {"error": "No data provided"}, 400
         
     opted_out = data.get('opted_out', True)
     
-    if current_user not in user_preferences:
-        user_preferences[current_user] = {}
-        
-    user_preferences[current_user]['opted_out'] = opted_out
+    with storage.user_lock(user_id):
+        storage.set_preference(user_id, 'opted_out', opted_out)
+        bump_data_version(user_id)
     
+    publish_alert_changes(user_id)
     message = "Opted out of financial tracking" if opted_out else "Opted in to financial tracking"
-    return jsonify({"message": message})
+    return {"message": message}, 200
 
-@app.route('/manual_transaction', methods=['POST'])
-@token_required
-def manual_transaction(current_user):
-    """For opted-out users to manually enter transactions"""
-    data = request.json
-    
+def manual_transaction_result(user_id, data):
     if not data:
-        return jsonify({"error": "No transaction data provided"}), 400
+        return {"error": "No transaction data provided"}, 400
     
-    # Add timestamp and transaction ID if not provided
-    if 'timestamp' not in data:
-        data['timestamp'] = datetime.now().isoformat()
-    if 'transaction_id' not in data:
-        data['transaction_id'] = str(uuid.uuid4())
+    try:
+        prepare_transaction(data)
+    except (TypeError, ValueError) as e:
+        return {"error": f"Invalid transaction: {e}"}, 400
         
-    # Initialize user transaction list if not exists
-    if current_user not in transactions:
-        transactions[current_user] = []
+    with storage.user_lock(user_id):
+        # A replayed transaction_id is acknowledged without being applied again
+        _, duplicates = split_duplicates(user_id, [data], write_behind.queued(user_id))
+        if duplicates:
+            duplicate_transactions.inc('/manual_transaction')
+            return {
+                "message": "Duplicate transaction ignored",
+                "transaction": data,
+                "duplicates": [data['transaction_id']],
+                "updated_profile": storage.get_profile(user_id) or {}
+            }, 200
         
-    # Add the manual transaction
-    transactions[current_user].append(data)
-    
-    # If user has opted back in, update their profile
-    if current_user not in user_preferences or not user_preferences[current_user].get('opted_out', False):
-        update_user_profile(current_user, data)
+        # Add the manual transaction
+        storage.add_transactions(user_id, [data])
+        
+        try:
+            transaction_log.append(user_id, [data])
+        except Exception as e:
+            logger.error(f"Error saving transactions: {e}")
+        
+        # If user has opted back in, update their profile
+        if not storage.get_preferences(user_id).get('opted_out', False):
+            update_user_profile(user_id, data)
+        bump_data_version(user_id, [data])
     
-    return jsonify({
+    publish_alert_changes(user_id)
+    return {
         "message": "Manual transaction added successfully", 
         "transaction": data,
-        "updated_profile": user_profiles.get(current_user, {})
+        "updated_profile": storage.get_profile(user_id) or {}
+    }, 200
+
+def dashboard_stats_result(user_id):
+    snapshot = get_weekly_snapshot(user_id)
+    if snapshot is None:
+        return {"error": "Profile not found"}, 404
+    
+    return dashboard_fields(snapshot), 200
+
+# Function to pick the /dashboard_stats fields out of a weekly snapshot
+def dashboard_fields(snapshot):
+    return {
+        "recent_spending": snapshot['recent_spending'],
+        "category_breakdown": snapshot['category_breakdown'],
+        "savings_goal": snapshot['savings_goal'],
+        "actual_saved": snapshot['actual_saved'],
+        "savings_progress": snapshot['savings_progress'],
+        # Opted-out users don't receive alerts
+        "alert_count": 0 if snapshot['opted_out'] else len(snapshot['alerts']),
+        "disposable_income": snapshot['disposable_income']
+    }
+
+# Function to push alert changes to the user's open /stream_alerts connections
+def publish_alert_changes(user_id):
+    """Push an 'alerts' event if a spending threshold or the savings-goal check flipped.
+
+    Does nothing for users without an open stream. The event lists alerts
+    that are new since the last push, categories that stopped alerting,
+    and the dashboard fields that changed.
+    """
+    if not alert_hub.has_subscribers(user_id):
+        return
+    
+    version = storage.get_data_version(user_id)
+    snapshot = compute_weekly_snapshot(user_id)
+    if snapshot is None:
+        return
+    alerts = [] if snapshot['opted_out'] else snapshot['alerts']
+    categories = frozenset(alert['category'] for alert in alerts)
+    stats = dashboard_fields(snapshot)
+    
+    with alert_states_lock:
+        if not alert_hub.has_subscribers(user_id):
+            return  # The last stream closed while the snapshot was computed
+        previous = alert_states.get(user_id)
+        if previous is not None and previous[0] >= version:
+            return  # A concurrent writer already pushed this version or a later one
+        alert_states[user_id] = (version, categories, stats)
+    
+    if previous is None or previous[1] == categories:
+        return
+    
+    alert_hub.publish(user_id, {
+        "version": version,
+        "alerts": [alert for alert in alerts if alert['category'] not in previous[1]],
+        "resolved": sorted(previous[1] - categories),
+        "dashboard": {field: value for field, value in stats.items() if previous[2].get(field) != value}
     })
 
-@app.route('/dashboard_stats', methods=['GET'])
-@token_required
-def dashboard_stats(current_user):
-    """Get summary statistics for the user dashboard"""
-    if current_user not in user_profiles:
-        return jsonify({"error": "Profile not found"}), 404
+# Function to open a user's alert stream and build the event that starts it
+def open_alert_stream(user_id, subscription):
+    """Subscribe, then return the opening 'snapshot' event with every current alert"""
+    alert_hub.subscribe(subscription)
     
-    profile = user_profiles[current_user]
-    recent_txs = get_recent_transactions(current_user)
+    # Track state from now on, so the next threshold crossing is pushed
+    version = storage.get_data_version(user_id)
+    snapshot = get_weekly_snapshot(user_id) or {}
+    alerts = [] if snapshot.get('opted_out') else snapshot.get('alerts', [])
+    stats = dashboard_fields(snapshot) if snapshot else {}
+    with alert_states_lock:
+        if user_id not in alert_states or alert_states[user_id][0] < version:
+            alert_states[user_id] = (version, frozenset(alert['category'] for alert in alerts), stats)
     
-    # Calculate recent spending
-    total_recent_spending = sum(float(tx.get('amount', 0)) for tx in recent_txs)
+    return format_event('snapshot', {"version": version, "alerts": alerts, "dashboard": stats}, version)
+
+# Function to close one of a user's alert streams
+def close_alert_stream(subscription):
+    """Unsubscribe, dropping the user's alert state once their last stream is gone"""
+    alert_hub.unsubscribe(subscription)
+    with alert_states_lock:
+        if not alert_hub.has_subscribers(subscription.user_id):
+            alert_states.pop(subscription.user_id, None)
+
+# Function to pick up writes made by other worker processes while a stream was idle
+def check_alert_stream(user_id):
+    state = alert_states.get(user_id)
+    if state is None or storage.get_data_version(user_id) != state[0]:
+        publish_alert_changes(user_id)
+
+# Function to serve a versioned GET route with ETag / If-None-Match support
+def conditional_response(route, user_id, compute, daily=False):
+    body, status, headers = conditional_result(route, user_id, compute, request.headers.get('If-None-Match'), daily)
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+# Request instrumentation
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None and request.path != '/metrics':
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        response_bytes = None if response.is_streamed else response.content_length
+        observe_request(route, request.method, response.status_code, time.perf_counter() - start,
+                        request.content_length, response_bytes)
+    return response
+
+# Routes
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(metrics.render(), content_type=metrics.content_type)
+
+@app.route('/auth/login', methods=['POST'])
+def login():
+    data = request.json
     
-    # Calculate category breakdown
-    category_spending = {}
-    for tx in recent_txs:
-        category = tx.get('category', 'other')
-        amount = float(tx.get('amount', 0))
+    username, user, is_new, error = find_or_create_user(data)
+    if error:
+        return jsonify(error[0]), error[1]
+    
+    if is_new:
+        # Generate initial profile for new user
+        try:
+            create_user_profile(username)
+        except Exception as e:
+            logger.error(f"Error generating user profile: {e}")
+    
+    body, status = complete_login(username, user, data['password'])
+    return jsonify(body), status
+
+@app.route('/generate_profile', methods=['GET'])
+@token_required
+def generate_user_profile(current_user):
+    """Generate a financial profile for the user using Mockaroo"""
+    try:
+        profile_data = create_user_profile(current_user)
         
-        if category not in category_spending:
-            category_spending[category] = 0
-        category_spending[category] += amount
+        return jsonify({
+            "message": "User profile generated successfully",
+            "profile": profile_data
+        })
+    except ProfileServiceError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error generating user profile: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/get_profile', methods=['GET'])
+@token_required
+def get_profile(current_user):
+    """Get the user's financial profile"""
+    return conditional_response('get_profile', current_user, profile_result)
+
+@app.route('/submit_transaction', methods=['POST'])
+@token_required
+def submit_transaction(current_user):
+    body, status = submit_transaction_result(current_user, request.json)
+    return jsonify(body), status
+
+@app.route('/bulk_transactions', methods=['POST'])
+@token_required
+def bulk_transactions(current_user):
+    """Stream newline-delimited JSON transactions into the user's history"""
+    ingest = BulkIngest(current_user)
     
-    # Calculate savings progress
-    weekly_income = profile.get('Income', 0) / 4  # Assuming monthly income
-    weekly_savings_goal = profile.get('Desired_Savings', 0) / 4  # Assuming monthly savings goal
-    actual_saved = weekly_income - total_recent_spending
-    savings_progress = (actual_saved / weekly_savings_goal * 100) if weekly_savings_goal > 0 else 0
+    # Read the body line by line so memory use is bounded by the chunk size
+    for line in request.stream:
+        ingest.feed(line)
     
-    # Truncate to 100% if exceeded
-    savings_progress = min(savings_progress, 100)
+    body, status = ingest.finish()
+    return jsonify(body), status
+
+@app.route('/get_transactions', methods=['GET'])
+@token_required
+def get_transactions(current_user):
+    """Get one page of the user's transactions, streamed as chunked JSON"""
+    body, status = transactions_result(current_user, request.args)
+    if status != 200:
+        return jsonify(body), status
     
-    stats = {
-        "recent_spending": total_recent_spending,
-        "category_breakdown": category_spending,
-        "savings_goal": weekly_savings_goal,
-        "actual_saved": actual_saved,
-        "savings_progress": savings_progress,
-        "alert_count": len(get_alerts(current_user).json),
-        "disposable_income": profile.get('Disposable_Income', 0)
-    }
+    return Response(iter_transactions_json(body), mimetype='application/json')
+
+@app.route('/spending_rollups', methods=['GET'])
+@token_required
+def spending_rollups(current_user):
+    """Get spending per category by day, week or month, oldest bucket first (empty buckets omitted)"""
+    body, status = rollups_result(current_user, request.args)
+    return jsonify(body), status
+
+@app.route('/get_recent_transactions', methods=['GET'])
+@token_required
+def get_user_recent_transactions(current_user):
+    """Get transactions from the last 7 days"""
+    recent_txs = get_recent_transactions(current_user)
+    return jsonify(recent_txs)
+
+@app.route('/get_alerts', methods=['GET'])
+@token_required
+def get_alerts(current_user):
+    """Get spending alerts based on recent transactions"""
+    return conditional_response('get_alerts', current_user, alerts_result, daily=True)
+
+@app.route('/get_suggestions', methods=['GET'])
+@token_required
+def get_suggestions(current_user):
+    """Get personalized savings suggestions"""
+    return conditional_response('get_suggestions', current_user, suggestions_result)
+
+@app.route('/stream_alerts', methods=['GET'])
+@token_required
+def stream_alerts(current_user):
+    """Push alert changes as Server-Sent Events instead of polling /get_alerts.
+
+    Each open stream holds one of the worker's threads for as long as the
+    client stays connected, so a process serves at most SSE_MAX_SYNC_STREAMS
+    of them and answers 503 beyond that. The ASGI app (asgi_api.py) keeps
+    idle streams as suspended coroutines and has no such limit.
+    """
+    if not sync_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many open alert streams on this server; "
+                                 "use the ASGI app for streaming"}), 503, {'Retry-After': '30'}
+    
+    try:
+        subscription = Subscription(current_user)
+        opening = open_alert_stream(current_user, subscription)
+    except Exception:
+        sync_streams.release()
+        raise
     
-    return jsonify(stats)
+    def events():
+        try:
+            yield opening
+            while True:
+                event = subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                if event is None:
+                    # Idle: catch up on other workers' writes and keep proxies from timing out
+                    check_alert_stream(current_user)
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_event('alerts', event, event['version'])
+        finally:
+            close_alert_stream(subscription)
+    
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs even if the client leaves before the first event is sent
+    response.call_on_close(sync_streams.release)
+    return response
+
+@app.route('/predict_savings', methods=['POST'])
+@token_required
+def predict_savings(current_user):
+    """Predict potential savings per category with the trained savings models"""
+    body, status = predict_savings_result(current_user, request.get_json(silent=True))
+    return jsonify(body), status
+
+@app.route('/opt_out', methods=['POST'])
+@token_required
+def opt_out(current_user):
+    body, status = opt_out_result(current_user, request.json)
+    return jsonify(body), status
+
+@app.route('/manual_transaction', methods=['POST'])
+@token_required
+def manual_transaction(current_user):
+    """For opted-out users to manually enter transactions"""
+    body, status = manual_transaction_result(current_user, request.json)
+    return jsonify(body), status
+
+@app.route('/dashboard_stats', methods=['GET'])
+@token_required
+def dashboard_stats(current_user):
+    """Get summary statistics for the user dashboard"""
+    return conditional_response('dashboard_stats', current_user, dashboard_stats_result, daily=True)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,328 @@
+"""ASGI variant of the financial API.
+
+Serves the same routes and JWT behaviour as api.py, but with async
+handlers and a non-blocking HTTP client for the profile service, so one
+process can keep serving dashboard requests while Mockaroo is slow.
+The route logic and all state are shared with api.py. That logic blocks
+(storage writes under the per-user locks, SQLite, model inference), so
+handlers run it on worker threads with run_sync instead of on the loop.
+
+Run with:  hypercorn src.asgi_api:app
+"""
+import asyncio
+import os
+import sys
+import logging
+import time
+from functools import wraps
+
+import httpx
+from quart import Quart, Response, request, jsonify, g
+from quart.utils import run_sync
+from quart.wrappers import Request
+
+# Add parent directory to path to import from sibling modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    MOCKAROO_ENDPOINT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    SSE_KEEPALIVE_INTERVAL,
+    BULK_BODY_TIMEOUT
+)
+from src import api
+from src.event_hub import AsyncSubscription, format_event
+
+# Routes that read their body as a stream, so Quart's body limits don't apply
+STREAMED_BODY_ROUTES = {'/bulk_transactions'}
+
+class StreamedBodyRequest(Request):
+    """Request without Quart's 16 MB MAX_CONTENT_LENGTH on streamed routes.
+
+    Quart fixes the body limits when the request is built, before routing,
+    so they are chosen here by path. Flask has no size limit for these
+    routes either.
+    """
+
+    def __init__(self, method, scheme, path, *args, **kwargs):
+        if path in STREAMED_BODY_ROUTES:
+            kwargs['max_content_length'] = None
+            kwargs['body_timeout'] = BULK_BODY_TIMEOUT
+        super().__init__(method, scheme, path, *args, **kwargs)
+
+app = Quart(__name__)
+app.request_class = StreamedBodyRequest
+app.secret_key = api.app.secret_key
+
+logger = logging.getLogger(__name__)
+
+# Async client for the profile service, created once the event loop is running
+http_client = None
+# Held while a batch is fetched, so logins on an empty pool share one request
+profile_fetch_lock = None
+
+@app.before_serving
+async def open_http_client():
+    global http_client, profile_fetch_lock
+    profile_fetch_lock = asyncio.Lock()
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS_PER_HOST)
+    )
+
+@app.after_serving
+async def close_http_client():
+    await http_client.aclose()
+
+# Authentication decorator
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        current_user, error = api.authenticate(request.headers.get('Authorization'))
+
+        if error:
+            return jsonify(error[0]), error[1]
+
+        return await f(current_user, *args, **kwargs)
+
+    return decorated
+
+# Function to serve a versioned GET route with ETag / If-None-Match support
+async def conditional_response(route, user_id, compute, daily=False):
+    # conditional_result waits for the user's queued writes, so it runs off the loop
+    body, status, headers = await run_sync(api.conditional_result)(route, user_id, compute,
+                                                                   request.headers.get('If-None-Match'), daily)
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+# Function to fetch a batch of raw profile records without blocking the loop
+async def fetch_profile_batch(count):
+    start = time.perf_counter()
+    try:
+        response = await http_client.get(f"{MOCKAROO_ENDPOINT}?count={count}", headers=api.MOCKAROO_HEADERS)
+    except httpx.HTTPError:
+        elapsed = time.perf_counter() - start
+        api.http_client.record(httpx.URL(MOCKAROO_ENDPOINT).netloc.decode(), elapsed, error=True)
+        api.profile_service_latency.observe(elapsed, 'error')
+        raise
+    elapsed = time.perf_counter() - start
+    api.http_client.record(response.url.netloc.decode(), elapsed, error=response.status_code >= 500)
+    api.profile_service_latency.observe(elapsed, 'ok' if response.status_code == 200 else 'error')
+
+    if response.status_code != 200:
+        raise api.ProfileServiceError(f"Mockaroo API returned status code {response.status_code}")
+
+    return response.json()
+
+# Function to get one raw profile record without blocking the loop
+async def fetch_profile_data():
+    # Use the shared pool when it's warm; it refills itself in the background
+    profile = api.profile_pool.take(block=False)
+    if profile is not None:
+        return profile
+
+    # Empty pool: one login fetches a whole batch, the ones queued behind it take from it
+    async with profile_fetch_lock:
+        profile = api.profile_pool.take(block=False)
+        if profile is not None:
+            return profile
+        # Don't wait on a service that just failed, as the Flask path doesn't
+        if api.profile_pool.recently_failed():
+            return api.profile_pool.synthetic()
+
+        try:
+            profiles = await fetch_profile_batch(api.profile_pool.batch_size)
+            api.profile_pool.add(profiles[1:])
+            return profiles[0]
+        except Exception as e:
+            logger.warning(f"Profile service unavailable, using a synthetic profile: {e}")
+            api.profile_pool.record_failure()
+            return api.profile_pool.synthetic()
+
+# Function to generate and store a profile for a user
+async def create_user_profile(user_id):
+    profile_data = await fetch_profile_data()
+    return await run_sync(api.store_generated_profile)(user_id, profile_data)
+
+# Request instrumentation (recorded into the same metrics as the Flask app)
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None and request.path != '/metrics':
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        api.observe_request(route, request.method, response.status_code, time.perf_counter() - start,
+                            request.content_length, response.content_length)
+    return response
+
+# Routes
+@app.route('/metrics', methods=['GET'])
+async def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(api.metrics.render(), content_type=api.metrics.content_type)
+
+@app.route('/auth/login', methods=['POST'])
+async def login():
+    data = await request.get_json()
+
+    username, user, is_new, error = await run_sync(api.find_or_create_user)(data)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    if is_new:
+        # Generate initial profile for new user
+        try:
+            await create_user_profile(username)
+        except Exception as e:
+            logger.error(f"Error generating user profile: {e}")
+
+    body, status = await run_sync(api.complete_login)(username, user, data['password'])
+    return jsonify(body), status
+
+@app.route('/generate_profile', methods=['GET'])
+@token_required
+async def generate_user_profile(current_user):
+    """Generate a financial profile for the user using Mockaroo"""
+    try:
+        profile_data = await create_user_profile(current_user)
+
+        return jsonify({
+            "message": "User profile generated successfully",
+            "profile": profile_data
+        })
+    except api.ProfileServiceError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error generating user profile: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/get_profile', methods=['GET'])
+@token_required
+async def get_profile(current_user):
+    """Get the user's financial profile"""
+    return await conditional_response('get_profile', current_user, api.profile_result)
+
+@app.route('/submit_transaction', methods=['POST'])
+@token_required
+async def submit_transaction(current_user):
+    data = await request.get_json()
+    body, status = await run_sync(api.submit_transaction_result)(current_user, data)
+    return jsonify(body), status
+
+@app.route('/bulk_transactions', methods=['POST'])
+@token_required
+async def bulk_transactions(current_user):
+    """Stream newline-delimited JSON transactions into the user's history"""
+    ingest = api.BulkIngest(current_user)
+
+    def feed(lines):
+        for line in lines:
+            ingest.feed(line)
+
+    # Split the body into lines as chunks arrive so memory stays bounded; each
+    # chunk's lines are applied off the loop
+    pending = b''
+    async for data in request.body:
+        pending += data
+        *lines, pending = pending.split(b'\n')
+        if lines:
+            await run_sync(feed)(lines)
+    await run_sync(feed)([pending])
+
+    body, status = await run_sync(ingest.finish)()
+    return jsonify(body), status
+
+@app.route('/get_transactions', methods=['GET'])
+@token_required
+async def get_transactions(current_user):
+    """Get one page of the user's transactions, streamed as chunked JSON"""
+    body, status = await run_sync(api.transactions_result)(current_user, request.args)
+    if status != 200:
+        return jsonify(body), status
+
+    return Response(api.iter_transactions_json(body), mimetype='application/json')
+
+@app.route('/spending_rollups', methods=['GET'])
+@token_required
+async def spending_rollups(current_user):
+    """Get spending per category by day, week or month, oldest bucket first (empty buckets omitted)"""
+    body, status = await run_sync(api.rollups_result)(current_user, request.args)
+    return jsonify(body), status
+
+@app.route('/get_recent_transactions', methods=['GET'])
+@token_required
+async def get_user_recent_transactions(current_user):
+    """Get transactions from the last 7 days"""
+    return jsonify(await run_sync(api.get_recent_transactions)(current_user))
+
+@app.route('/get_alerts', methods=['GET'])
+@token_required
+async def get_alerts(current_user):
+    """Get spending alerts based on recent transactions"""
+    return await conditional_response('get_alerts', current_user, api.alerts_result, daily=True)
+
+@app.route('/get_suggestions', methods=['GET'])
+@token_required
+async def get_suggestions(current_user):
+    """Get personalized savings suggestions"""
+    return await conditional_response('get_suggestions', current_user, api.suggestions_result)
+
+@app.route('/stream_alerts', methods=['GET'])
+@token_required
+async def stream_alerts(current_user):
+    """Push alert changes as Server-Sent Events; an idle stream is a suspended coroutine"""
+    subscription = AsyncSubscription(current_user)
+    opening = await run_sync(api.open_alert_stream)(current_user, subscription)
+
+    async def events():
+        try:
+            yield opening.encode()
+            while True:
+                event = await subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                if event is None:
+                    await run_sync(api.check_alert_stream)(current_user)
+                    yield b': keep-alive\n\n'
+                    continue
+                yield format_event('alerts', event, event['version']).encode()
+        finally:
+            api.close_alert_stream(subscription)
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # The stream stays open until the client leaves
+    return response
+
+@app.route('/predict_savings', methods=['POST'])
+@token_required
+async def predict_savings(current_user):
+    """Predict potential savings per category with the trained savings models"""
+    data = await request.get_json(silent=True)
+    body, status = await run_sync(api.predict_savings_result)(current_user, data)
+    return jsonify(body), status
+
+@app.route('/opt_out', methods=['POST'])
+@token_required
+async def opt_out(current_user):
+    data = await request.get_json()
+    body, status = await run_sync(api.opt_out_result)(current_user, data)
+    return jsonify(body), status
+
+@app.route('/manual_transaction', methods=['POST'])
+@token_required
+async def manual_transaction(current_user):
+    """For opted-out users to manually enter transactions"""
+    data = await request.get_json()
+    body, status = await run_sync(api.manual_transaction_result)(current_user, data)
+    return jsonify(body), status
+
+@app.route('/dashboard_stats', methods=['GET'])
+@token_required
+async def dashboard_stats(current_user):
+    """Get summary statistics for the user dashboard"""
+    return await conditional_response('dashboard_stats', current_user, api.dashboard_stats_result, daily=True)
+
+if __name__ == '__main__':
+    app.run(debug=True)
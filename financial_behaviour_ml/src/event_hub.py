@@ -0,0 +1,113 @@
+import asyncio
+import json
+import queue
+import threading
+
+
+def format_event(event, data, event_id=None):
+    """Serialize one Server-Sent Events message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One connection's queue of events, read by a blocking thread.
+
+    Holds at most maxsize undelivered events; a client that falls further
+    behind loses the oldest ones rather than making publishers wait.
+    """
+
+    def __init__(self, user_id, maxsize=16):
+        self.user_id = user_id
+        self._queue = queue.Queue(maxsize)
+
+    def deliver(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """One connection's queue of events, read from an asyncio event loop"""
+
+    def __init__(self, user_id, maxsize=16):
+        self.user_id = user_id
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        # Publishers run on other threads; hand the event to the loop's thread
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None if none arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """Fans events out to the open connections subscribed to each user.
+
+    Nothing is computed or queued for users without subscribers, and an
+    idle subscriber is just a blocked reader on its own queue.
+    """
+
+    def __init__(self):
+        self.reset_after_fork()
+
+    def reset_after_fork(self):
+        """Start a forked worker with no subscribers (connections are per process)"""
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscribers.setdefault(subscription.user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id, event):
+        """Deliver event to every subscriber of user_id; returns how many there were"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                self.unsubscribe(subscription)
+        return len(subscribers)
@@ -1,3 +1,5 @@
+import numpy as np
+import pandas as pd
 from config import *
 
 class ExpenseCategorizer:
@@ -41,4 +43,70 @@ class ExpenseCategorizer:
                 )
             })
         
-        return analysis
\ No newline at end of file
+        return analysis
+    
+    @staticmethod
+    def classify_batch(categories, amounts):
+        """Vectorized categorize(): a boolean array that is True where a transaction is a need"""
+        amounts = np.asarray(amounts, dtype=float)
+        
+        # Lowercase and look up each distinct category once, then broadcast by code
+        codes, uniques = pd.factorize(np.asarray(categories, dtype=object), use_na_sentinel=False)
+        lowered = np.array([str(category).lower() for category in uniques], dtype=object)
+        is_need = np.isin(lowered, NEEDS)[codes]
+        is_want = np.isin(lowered, WANTS)[codes]
+        
+        # Unknown categories fall back to the amount, as in categorize()
+        return is_need | (~is_want & (amounts > 500))
+    
+    @staticmethod
+    def _to_frame(transactions):
+        if isinstance(transactions, pd.DataFrame):
+            return transactions
+        return pd.DataFrame(transactions)
+    
+    @staticmethod
+    def analyze_spending_batch(user_data, transactions):
+        """analyze_spending() for a DataFrame, list of dicts or dict of columns.
+
+        Returns the same totals, with the transactions as a DataFrame that
+        has 'type' and 'high_risk' columns added.
+        """
+        df = ExpenseCategorizer._to_frame(transactions)
+        if df.empty:
+            return {'needs_total': 0, 'wants_total': 0, 'transactions': df.assign(type=[], high_risk=[])}
+        
+        amounts = df['amount'].to_numpy(dtype=float)
+        is_need = ExpenseCategorizer.classify_batch(df['category'], amounts)
+        high_risk = ~is_need & (amounts > HIGH_RISK_THRESHOLD * user_data['disposable_income'])
+        
+        return {
+            'needs_total': float(amounts[is_need].sum()),
+            'wants_total': float(amounts[~is_need].sum()),
+            'transactions': df.assign(type=np.where(is_need, 'need', 'want'), high_risk=high_risk)
+        }
+    
+    @staticmethod
+    def analyze_spending_by_user(transactions, disposable_income, user_column='user_id'):
+        """Score many users' transactions in one pass.
+
+        transactions holds user_column, 'category' and 'amount' columns;
+        disposable_income maps user id to disposable income (dict or Series).
+        Returns a DataFrame indexed by user with needs_total, wants_total and
+        high_risk_count.
+        """
+        df = ExpenseCategorizer._to_frame(transactions)
+        amounts = df['amount'].to_numpy(dtype=float)
+        is_need = ExpenseCategorizer.classify_batch(df['category'], amounts)
+        
+        codes, users = pd.factorize(df[user_column])
+        income = pd.Series(disposable_income, dtype=float).reindex(users).to_numpy()
+        
+        # Users without a known income are never flagged (NaN comparisons are False)
+        high_risk = ~is_need & (amounts > HIGH_RISK_THRESHOLD * income[codes])
+        
+        return pd.DataFrame({
+            'needs_total': np.bincount(codes, weights=np.where(is_need, amounts, 0.0), minlength=len(users)),
+            'wants_total': np.bincount(codes, weights=np.where(is_need, 0.0, amounts), minlength=len(users)),
+            'high_risk_count': np.bincount(codes, weights=high_risk, minlength=len(users)).astype(int)
+        }, index=pd.Index(users, name=user_column))
@@ -0,0 +1,118 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class HttpClient:
+    """Outbound HTTP client with pooled keep-alive connections.
+
+    Every call gets a timeout, transient failures are retried with
+    jittered exponential backoff, and per-host latency is recorded.
+    """
+
+    def __init__(self, timeout=(3.05, 10.0), max_connections_per_host=10, retries=2,
+                 backoff=0.25, max_backoff=4.0, latency_window=1000):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.latency_window = latency_window
+        self.max_connections_per_host = max_connections_per_host
+
+        self._metrics = {}
+        self.reset_after_fork()
+
+    def reset_after_fork(self):
+        """Open a new connection pool (a forked worker must not reuse its parent's sockets)"""
+        # pool_block makes pool_maxsize a hard per-host connection limit
+        adapter = HTTPAdapter(pool_maxsize=self.max_connections_per_host, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """Send a request, retrying connection errors, timeouts and RETRY_STATUSES"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.record(host, time.perf_counter() - start, error=True)
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"{method} {host} failed ({e}), retrying")
+            else:
+                self.record(host, time.perf_counter() - start, error=response.status_code >= 500)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                logger.warning(f"{method} {host} returned {response.status_code}, retrying")
+
+            time.sleep(self.backoff_delay(attempt))
+
+    def backoff_delay(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def record(self, host, seconds, error=False):
+        """Record one call's latency (also used by the async client in asgi_api)"""
+        with self._lock:
+            metrics = self._metrics.get(host)
+            if metrics is None:
+                metrics = {'calls': 0, 'errors': 0, 'latencies': deque(maxlen=self.latency_window)}
+                self._metrics[host] = metrics
+            metrics['calls'] += 1
+            metrics['errors'] += int(error)
+            metrics['latencies'].append(seconds)
+
+    def stats(self):
+        """Per-host call counts and latency percentiles (seconds) over recent calls"""
+        with self._lock:
+            snapshot = {host: (m['calls'], m['errors'], sorted(m['latencies'])) for host, m in self._metrics.items()}
+
+        stats = {}
+        for host, (calls, errors, latencies) in snapshot.items():
+            stats[host] = {
+                'calls': calls,
+                'errors': errors,
+                'p50': latencies[len(latencies) // 2] if latencies else None,
+                'p95': latencies[int(len(latencies) * 0.95)] if latencies else None,
+                'max': latencies[-1] if latencies else None
+            }
+        return stats
+
+
+# Process-wide client shared by api.py and the financial_behavior_ml2 helpers
+_shared_client = None
+
+
+def configure_shared_client(**kwargs):
+    """Replace the shared client, e.g. with settings from config"""
+    global _shared_client
+    _shared_client = HttpClient(**kwargs)
+    return _shared_client
+
+
+def get_shared_client():
+    """Get the shared client, creating one with default settings if needed"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = HttpClient()
+    return _shared_client
@@ -0,0 +1,165 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) for latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds (bytes) for payload size histograms
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_format(value)}'
+
+
+class Histogram:
+    """Bucketed observations per label set.
+
+    Recording is a bisect and three increments; cumulative bucket counts
+    and quantile estimates are only worked out when metrics are rendered.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, quantiles=(0.5, 0.95, 0.99)):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.quantiles = tuple(quantiles)
+        self._series = {}  # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[labels] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def quantile(self, q, *labels):
+        """Estimate a quantile by interpolating within buckets (like PromQL histogram_quantile)"""
+        series = self._series.get(labels)
+        if not series or not series[2]:
+            return None
+        return self._estimate(q, series[0], series[2])
+
+    def _estimate(self, q, counts, total):
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Beyond the last finite bucket
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total_sum, total) for labels, (counts, total_sum, total)
+                      in self._series.items()]
+
+        quantile_lines = []
+        for labels, counts, total_sum, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                label_text = _labels(self.labelnames, labels, [('le', _format(bound))])
+                yield f'{self.name}_bucket{label_text} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_format(total_sum)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {total}'
+
+            for q in self.quantiles:
+                label_text = _labels(self.labelnames, labels, [('quantile', q)])
+                quantile_lines.append(f'{self.name}_quantile{label_text} {_format(self._estimate(q, counts, total))}')
+
+        if quantile_lines:
+            yield f'# HELP {self.name}_quantile Quantiles of {self.name} estimated from its buckets'
+            yield f'# TYPE {self.name}_quantile gauge'
+            yield from quantile_lines
+
+
+class Registry:
+    """A set of metrics rendered together in Prometheus text exposition format"""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), **kwargs):
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
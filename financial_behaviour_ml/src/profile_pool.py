@@ -0,0 +1,149 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+OCCUPATIONS = ['Professional', 'Self_Employed', 'Student', 'Retired']
+CITY_TIERS = ['Tier_1', 'Tier_2', 'Tier_3']
+
+
+def generate_synthetic_profile(rng=random):
+    """Generate a raw profile record shaped like a Mockaroo one, without the network"""
+    income = round(rng.uniform(20000, 150000), 2)
+
+    def share(low, high):
+        return round(income * rng.uniform(low, high), 2)
+
+    return {
+        'Income': income,
+        'Age': rng.randint(18, 65),
+        'Dependents': rng.randint(0, 4),
+        'Occupation': rng.choice(OCCUPATIONS),
+        'City_Tier': rng.choice(CITY_TIERS),
+        'Rent': share(0.10, 0.25),
+        'Loan_Repayment': share(0.0, 0.08),
+        'Insurance': share(0.01, 0.05),
+        'Groceries': share(0.05, 0.15),
+        'Transport': share(0.02, 0.08),
+        'Eating_Out': share(0.02, 0.08),
+        'Entertainment': share(0.01, 0.06),
+        'Utilities': share(0.03, 0.08),
+        'Healthcare': share(0.01, 0.05),
+        'Education': share(0.0, 0.05),
+        'Miscellaneous': share(0.01, 0.05),
+        'Desired_Savings_Percentage': round(rng.uniform(5, 25), 2)
+    }
+
+
+class ProfilePool:
+    """Raw profile records fetched from the profile service in batches.
+
+    take() hands out a pre-fetched record and starts a background refill
+    once the pool drops below the low-water mark, so a burst of sign-ups
+    costs one round trip per batch instead of one per user. When the
+    service is unreachable, records come from the synthetic generator.
+    """
+
+    def __init__(self, fetch_batch, batch_size=50, low_water=10, retry_interval=30.0,
+                 synthetic=generate_synthetic_profile):
+        self.fetch_batch = fetch_batch
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.retry_interval = retry_interval
+        self.synthetic = synthetic
+        self._profiles = deque()
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refilling = False
+        self._last_failure = None
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def reset_after_fork(self):
+        """Start a forked worker with fresh locks and an empty pool.
+
+        Profiles pre-fetched by the parent would otherwise be handed out
+        by every worker, giving different users the same profile.
+        """
+        self._profiles = deque()
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refilling = False
+
+    def add(self, profiles):
+        """Add records fetched by someone else (e.g. an async caller)"""
+        self._last_failure = None
+        with self._lock:
+            self._profiles.extend(profiles)
+
+    def record_failure(self):
+        """Note a failed fetch by someone else, so nobody retries before retry_interval"""
+        self._last_failure = time.monotonic()
+
+    def take(self, block=True):
+        """Take one raw profile record.
+
+        With block=False an empty pool returns None instead of fetching
+        on the caller's thread (for callers running on an event loop).
+        """
+        with self._lock:
+            profile = self._profiles.popleft() if self._profiles else None
+            remaining = len(self._profiles)
+
+        if remaining < self.low_water:
+            self.refill_async()
+
+        if profile is not None or not block:
+            return profile
+
+        # Empty pool: fetch a batch on this thread, since it serves the next logins too
+        if self.refill():
+            with self._lock:
+                if self._profiles:
+                    return self._profiles.popleft()
+
+        return self.synthetic()
+
+    def recently_failed(self):
+        return self._last_failure is not None and time.monotonic() - self._last_failure < self.retry_interval
+
+    def refill(self):
+        """Fetch one batch into the pool; returns False if the service failed"""
+        with self._fetch_lock:
+            # Another thread may have refilled the pool while we waited
+            if self._profiles and len(self._profiles) >= self.low_water:
+                return True
+            if self.recently_failed():
+                return False
+
+            try:
+                profiles = self.fetch_batch(self.batch_size)
+            except Exception as e:
+                logger.warning(f"Profile service unavailable, using synthetic profiles: {e}")
+                self._last_failure = time.monotonic()
+                return False
+
+            self._last_failure = None
+            with self._lock:
+                self._profiles.extend(profiles)
+            return True
+
+    def refill_async(self):
+        """Start a background refill unless one is already running"""
+        with self._lock:
+            if self._refilling or self.recently_failed():
+                return
+            self._refilling = True
+
+        def run():
+            try:
+                self.refill()
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        threading.Thread(target=run, name='profile-pool-refill', daemon=True).start()
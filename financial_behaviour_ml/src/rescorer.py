@@ -0,0 +1,73 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Rescorer:
+    """Debounced background re-scoring of users whose data changed.
+
+    mark() only records the user. A scheduler thread wakes every interval
+    seconds, takes every user marked since its last run and hands them to
+    score_batch in batches of at most max_batch, so a user marked a
+    hundred times within one interval is scored once, together with
+    everyone else marked in that interval.
+    """
+
+    def __init__(self, score_batch, interval=5.0, max_batch=500):
+        self.score_batch = score_batch
+        self.interval = interval
+        self.max_batch = max_batch
+        self._start()
+
+    def _start(self):
+        self._cond = threading.Condition()
+        self._dirty = {}  # user_id -> None, in the order users were first marked
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='rescorer', daemon=True)
+        self._thread.start()
+
+    def reset_after_fork(self):
+        """Start a forked worker with no marked users and its own scheduler thread"""
+        self._start()
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, user_id):
+        """Schedule user_id for the next run"""
+        with self._cond:
+            self._dirty[user_id] = None
+
+    def _take(self):
+        with self._cond:
+            users = list(self._dirty)
+            self._dirty.clear()
+        return users
+
+    def _score(self, users):
+        for i in range(0, len(users), self.max_batch):
+            batch = users[i:i + self.max_batch]
+            try:
+                self.score_batch(batch)
+            except Exception:
+                logger.exception(f"Error re-scoring {len(batch)} user(s)")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                closed = self._cond.wait_for(lambda: self._closed, self.interval)
+            self._score(self._take())
+            if closed:
+                return
+
+    def flush(self):
+        """Score every marked user now, on the calling thread"""
+        self._score(self._take())
+
+    def close(self, timeout=None):
+        """Stop the scheduler after one last run over the users still marked"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
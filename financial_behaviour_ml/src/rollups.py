@@ -0,0 +1,90 @@
+import bisect
+import threading
+from datetime import date
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def bucket_of(day, granularity):
+    """Bucket number of a day ordinal: the day itself, its week's Monday, or year * 12 + month - 1"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - (day - 1) % 7  # Ordinal 1 (0001-01-01) is a Monday
+    if granularity == 'month':
+        d = date.fromordinal(day)
+        return d.year * 12 + d.month - 1
+    raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+
+def bucket_start(bucket, granularity):
+    """First calendar day of a bucket"""
+    if granularity == 'month':
+        return date(bucket // 12, bucket % 12 + 1, 1)
+    return date.fromordinal(bucket)
+
+
+def rollup_amount(transaction):
+    """Amount counted in rollups (0 for anything that is not a number)"""
+    try:
+        return float(transaction.get('amount', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def aggregate(transactions):
+    """{(granularity, bucket, category): [amount, count]} for a batch of normalized transactions"""
+    totals = {}
+    for tx in transactions:
+        amount = rollup_amount(tx)
+        category = str(tx.get('category', 'other'))
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_of(tx['day'], granularity), category)
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [amount, 1]
+            else:
+                entry[0] += amount
+                entry[1] += 1
+    return totals
+
+
+class UserRollups:
+    """One user's spending per category in day, week and month buckets.
+
+    Updated incrementally as transactions are added; a range query
+    touches only the buckets it returns, however many transactions the
+    user has.
+    """
+
+    def __init__(self):
+        self._buckets = {granularity: {} for granularity in GRANULARITIES}  # bucket -> {category: [amount, count]}
+        self._keys = {granularity: [] for granularity in GRANULARITIES}  # Sorted bucket numbers
+        self._lock = threading.Lock()
+
+    def add_all(self, transactions):
+        self.merge(aggregate(transactions))
+
+    def merge(self, totals):
+        """Fold in the output of aggregate()"""
+        with self._lock:
+            for (granularity, bucket, category), (amount, count) in totals.items():
+                buckets = self._buckets[granularity]
+                categories = buckets.get(bucket)
+                if categories is None:
+                    categories = buckets[bucket] = {}
+                    bisect.insort(self._keys[granularity], bucket)
+                entry = categories.setdefault(category, [0.0, 0])
+                entry[0] += amount
+                entry[1] += count
+
+    def query(self, granularity, start=None, end=None):
+        """[(bucket, category, amount, count)] for start <= bucket <= end, in bucket order"""
+        with self._lock:
+            keys = self._keys[granularity]
+            lo = 0 if start is None else bisect.bisect_left(keys, start)
+            hi = len(keys) if end is None else bisect.bisect_right(keys, end)
+            buckets = self._buckets[granularity]
+            return [(bucket, category, amount, count)
+                    for bucket in keys[lo:hi]
+                    for category, (amount, count) in sorted(buckets[bucket].items())]
@@ -0,0 +1,126 @@
+import importlib.util
+import logging
+import os
+import sys
+
+import joblib
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Feature layout of the financial_behavior_ml2 savings models (see its DataProcessor)
+EXPENSE_CATEGORIES = ['rent', 'loan_repayment', 'insurance', 'groceries', 'transport', 'eating_out',
+                      'entertainment', 'utilities', 'healthcare', 'education', 'miscellaneous']
+SAVINGS_CATEGORIES = ['groceries', 'transport', 'eating_out', 'entertainment', 'utilities', 'healthcare',
+                      'education', 'miscellaneous']
+NEEDS = ['rent', 'loan_repayment', 'insurance', 'groceries', 'transport', 'utilities', 'healthcare', 'education']
+WANTS = ['eating_out', 'entertainment', 'miscellaneous']
+NUMERIC_INPUTS = ['income', 'age', 'dependents'] + EXPENSE_CATEGORIES
+CATEGORICAL_INPUTS = ['occupation', 'city_tier']
+
+
+def _field(profile, name, default):
+    """A profile field by its API name (Eating_Out) or its ml2 name (eating_out)"""
+    value = profile.get(name.title(), profile.get(name))
+    return default if value is None else value
+
+
+def _ratio(numerator, denominator):
+    return (numerator / denominator.where(denominator != 0)).fillna(0)
+
+
+def feature_frame(profiles):
+    """Model input rows for API profiles; raises ValueError for a non-numeric amount.
+
+    Derives the same totals and ratios as DataProcessor.analyze_user_data,
+    column-wise for the whole batch.
+    """
+    rows = []
+    for profile in profiles:
+        row = {}
+        for name in NUMERIC_INPUTS:
+            try:
+                row[name] = float(_field(profile, name, 0))
+            except (TypeError, ValueError):
+                raise ValueError(f"{name.title()} must be a number")
+        for name in CATEGORICAL_INPUTS:
+            row[name] = str(_field(profile, name, ''))
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=NUMERIC_INPUTS + CATEGORICAL_INPUTS)
+    df['total_expenses'] = df[EXPENSE_CATEGORIES].sum(axis=1)
+    df['total_needs'] = df[NEEDS].sum(axis=1)
+    df['total_wants'] = df[WANTS].sum(axis=1)
+    for category in EXPENSE_CATEGORIES:
+        df[f'{category}_ratio'] = _ratio(df[category], df['total_expenses'])
+    df['savings_amount'] = df['income'] - df['total_expenses']
+    df['savings_rate'] = _ratio(df['savings_amount'], df['income'])
+    df['expense_to_income_ratio'] = _ratio(df['total_expenses'], df['income'])
+    df['needs_to_income_ratio'] = _ratio(df['total_needs'], df['income'])
+    df['wants_to_income_ratio'] = _ratio(df['total_wants'], df['income'])
+    return df
+
+
+def _import_feature_engineer(code_dir):
+    """Make ml2's data_processor importable under the name its pickled pipelines reference"""
+    if 'data_processor' in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location('data_processor', os.path.join(code_dir, 'data_processor.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules['data_processor'] = module
+
+
+class SavingsModel:
+    """The per-category potential-savings regressors trained by financial_behavior_ml2.
+
+    Models are loaded once; predict() scores a whole batch of profiles with
+    one predict call per category model.
+    """
+
+    def __init__(self, models):
+        self.models = models  # savings category -> fitted pipeline
+
+    @classmethod
+    def load(cls, folder, code_dir):
+        """Load every category model that can be loaded, logging the ones that can't"""
+        models = {}
+        failures = []
+        try:
+            _import_feature_engineer(code_dir)
+        except Exception as e:
+            failures.append(f"data_processor ({e})")
+
+        for category in SAVINGS_CATEGORIES:
+            path = os.path.join(folder, f'{category}_savings_model.joblib')
+            try:
+                models[category] = joblib.load(path)
+            except Exception as e:
+                failures.append(f"{category} ({type(e).__name__}: {e})")
+
+        if failures:
+            logger.warning("Savings models not loaded from %s: %s", folder, '; '.join(failures))
+
+        model = cls(models)
+        # Score one empty profile so the first request doesn't pay for lazy initialization
+        try:
+            model.predict([{}])
+        except Exception as e:
+            logger.warning("Savings models failed a warm-up prediction, not using them: %s", e)
+            model.models = {}
+        return model
+
+    @property
+    def ready(self):
+        return bool(self.models)
+
+    def predict(self, profiles):
+        """[{category: predicted savings}] for each profile; negative predictions count as 0"""
+        if not profiles:
+            return []
+        features = feature_frame(profiles)
+        predictions = [{} for _ in profiles]
+        for category, model in self.models.items():
+            for prediction, value in zip(predictions, model.predict(features)):
+                prediction[category] = round(max(float(value), 0.0), 2)
+        return predictions
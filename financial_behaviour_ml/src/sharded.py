@@ -0,0 +1,61 @@
+import threading
+import zlib
+
+
+def shard_of(key, shards):
+    """Stable shard index for a key (the same in every process, unlike hash())"""
+    return zlib.crc32(str(key).encode()) % shards
+
+
+class ShardedDict:
+    """A dict split into shards by a hash of the key, with one lock per shard.
+
+    Reads are plain dict lookups and never take a lock. Writes, and
+    read-modify-write updates through update(), lock only the shard that
+    holds the key, so threads working on different users rarely contend.
+    """
+
+    def __init__(self, shards=64):
+        self._shards = [{} for _ in range(shards)]
+        self.reset_after_fork()
+
+    def reset_after_fork(self):
+        """Recreate the shard locks (a forked child may inherit them held)"""
+        self._locks = [threading.Lock() for _ in self._shards]
+
+    def _shard(self, key):
+        index = shard_of(key, len(self._shards))
+        return self._shards[index], self._locks[index]
+
+    def __contains__(self, key):
+        return key in self._shard(key)[0]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def values(self):
+        return [value for shard in self._shards for value in list(shard.values())]
+
+    def get(self, key, default=None):
+        return self._shard(key)[0].get(key, default)
+
+    def set(self, key, value):
+        shard, lock = self._shard(key)
+        with lock:
+            shard[key] = value
+
+    def setdefault(self, key, default):
+        shard, lock = self._shard(key)
+        try:
+            return shard[key]
+        except KeyError:
+            with lock:
+                return shard.setdefault(key, default)
+
+    def update(self, key, fn, default=None):
+        """Atomically replace the value for key with fn(current value or default) and return it"""
+        shard, lock = self._shard(key)
+        with lock:
+            value = fn(shard.get(key, default))
+            shard[key] = value
+        return value
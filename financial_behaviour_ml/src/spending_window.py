@@ -0,0 +1,76 @@
+import threading
+from datetime import datetime, timedelta
+
+
+class SpendingWindow:
+    """Rolling per-category spending totals over the last few days.
+
+    Amounts are bucketed by calendar day, so the window always holds at
+    most `days` buckets (plus any future-dated ones). Expiring a day drops
+    its bucket, and reads sum a bounded number of buckets regardless of
+    how many transactions the user has. A cached window is read by
+    requests while writers fold new transactions into it, so every update
+    and read holds the window's lock.
+    """
+
+    def __init__(self, days=7):
+        self.days = days
+        self._buckets = {}  # day ordinal -> {category: amount}
+        self._lock = threading.Lock()
+
+    def _cutoff(self, today=None):
+        today = today or datetime.now().date()
+        return today.toordinal() - self.days + 1
+
+    def start(self, today=None):
+        """Start of the earliest day covered by the window"""
+        today = today or datetime.now().date()
+        return datetime.combine(today - timedelta(days=self.days - 1), datetime.min.time())
+
+    def add(self, transaction, today=None):
+        """Add a transaction's amount to its day bucket"""
+        with self._lock:
+            self._add(transaction, self._cutoff(today))
+
+    def _add(self, transaction, cutoff):
+        # Callers hold self._lock
+        day = transaction.get('day')
+        if day is None:
+            day = datetime.fromisoformat(transaction['timestamp']).date().toordinal()
+        if day < cutoff:
+            return
+
+        category = transaction.get('category', 'other')
+        bucket = self._buckets.setdefault(day, {})
+        bucket[category] = bucket.get(category, 0) + float(transaction.get('amount', 0))
+
+    def add_all(self, transactions, today=None):
+        cutoff = self._cutoff(today)
+        with self._lock:
+            for tx in transactions:
+                self._add(tx, cutoff)
+
+    def expire(self, today=None):
+        """Drop buckets for days that have left the window"""
+        with self._lock:
+            self._expire(self._cutoff(today))
+
+    def _expire(self, cutoff):
+        # Callers hold self._lock
+        for day in [d for d in self._buckets if d < cutoff]:
+            del self._buckets[day]
+
+    def category_totals(self, today=None):
+        """Spending per category over the window"""
+        cutoff = self._cutoff(today)
+        totals = {}
+        with self._lock:
+            self._expire(cutoff)
+            for bucket in self._buckets.values():
+                for category, amount in bucket.items():
+                    totals[category] = totals.get(category, 0) + amount
+        return totals
+
+    def total(self, today=None):
+        """Total spending over the window"""
+        return sum(self.category_totals(today).values())
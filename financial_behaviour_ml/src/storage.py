@@ -0,0 +1,454 @@
+import json
+import os
+import sqlite3
+import threading
+
+from src.rollups import UserRollups, aggregate
+from src.sharded import ShardedDict
+from src.timestamps import ensure_normalized, to_epoch_us
+from src.transaction_store import TransactionStore
+from src.user_locks import UserLocks
+
+
+class StorageBackend:
+    """Interface for persisting users, profiles, transactions and preferences"""
+
+    # Whether data survives a restart without replaying the transaction log
+    durable = False
+
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def add_user(self, username, user):
+        raise NotImplementedError
+
+    def count_users(self):
+        raise NotImplementedError
+
+    def get_profile(self, user_id):
+        raise NotImplementedError
+
+    def save_profile(self, user_id, profile):
+        raise NotImplementedError
+
+    def add_transactions(self, user_id, transactions):
+        """Add transactions, raising ValueError if any timestamp is invalid"""
+        raise NotImplementedError
+
+    def get_transactions(self, user_id, start=None, end=None):
+        """Get a user's transactions with start <= timestamp <= end, oldest first"""
+        raise NotImplementedError
+
+    def page_transactions(self, user_id, start=None, end=None, after=None, limit=100):
+        """Get up to limit transactions ordered by (timestamp, transaction_id).
+
+        after is the (timestamp, transaction_id) of the last transaction on
+        the previous page; only transactions strictly after it are returned.
+        """
+        raise NotImplementedError
+
+    def existing_transaction_ids(self, user_id, transaction_ids):
+        """Subset of transaction_ids (as strings) already stored for the user"""
+        raise NotImplementedError
+
+    def get_rollups(self, user_id, granularity, start=None, end=None):
+        """[(bucket, category, amount, count)] for start <= bucket <= end, in bucket order.
+
+        Buckets are maintained as transactions are added (see src.rollups),
+        so this costs O(buckets returned), not O(transactions).
+        """
+        raise NotImplementedError
+
+    def get_preferences(self, user_id):
+        raise NotImplementedError
+
+    def set_preference(self, user_id, key, value):
+        raise NotImplementedError
+
+    def get_data_version(self, user_id):
+        """Counter bumped whenever the user's transactions, profile or preferences change"""
+        raise NotImplementedError
+
+    def bump_data_version(self, user_id):
+        """Increment the user's data version and return the new value"""
+        raise NotImplementedError
+
+    def user_lock(self, user_id):
+        """Context manager serializing read-modify-write updates for one user"""
+        return self.locks.lock(user_id)
+
+    def reset_after_fork(self):
+        """Drop per-process resources inherited by a forked worker"""
+        self.locks.reset_after_fork()
+
+
+class MemoryStorage(StorageBackend):
+    """Process-local storage in sharded dicts (used for tests and development).
+
+    Profiles and preferences are copied on the way in and out, so a reader
+    never sees a writer's half-applied update and readers never lock.
+    """
+
+    def __init__(self):
+        self.users = ShardedDict()
+        self.user_profiles = ShardedDict()
+        self.transactions = TransactionStore()
+        self.rollups = ShardedDict()
+        self.user_preferences = ShardedDict()
+        self.data_versions = ShardedDict()
+        self.locks = UserLocks()
+
+    def reset_after_fork(self):
+        for store in (self.users, self.user_profiles, self.rollups, self.user_preferences, self.data_versions):
+            store.reset_after_fork()
+        self.transactions.reset_after_fork()
+        for user_rollups in self.rollups.values():
+            user_rollups._lock = threading.Lock()
+        super().reset_after_fork()
+
+    def get_user(self, username):
+        return self.users.get(username)
+
+    def add_user(self, username, user):
+        self.users.set(username, user)
+
+    def count_users(self):
+        return len(self.users)
+
+    def get_profile(self, user_id):
+        profile = self.user_profiles.get(user_id)
+        return None if profile is None else dict(profile)
+
+    def save_profile(self, user_id, profile):
+        self.user_profiles.set(user_id, dict(profile))
+
+    def add_transactions(self, user_id, transactions):
+        self.transactions.add(user_id, transactions)
+        user_rollups = self.rollups.get(user_id)
+        if user_rollups is None:
+            user_rollups = self.rollups.setdefault(user_id, UserRollups())
+        user_rollups.add_all(transactions)
+
+    def get_transactions(self, user_id, start=None, end=None):
+        return self.transactions.range(user_id, start, end)
+
+    def page_transactions(self, user_id, start=None, end=None, after=None, limit=100):
+        return self.transactions.page(user_id, start, end, after, limit)
+
+    def existing_transaction_ids(self, user_id, transaction_ids):
+        return self.transactions.existing_ids(user_id, transaction_ids)
+
+    def get_rollups(self, user_id, granularity, start=None, end=None):
+        user_rollups = self.rollups.get(user_id)
+        return [] if user_rollups is None else user_rollups.query(granularity, start, end)
+
+    def get_preferences(self, user_id):
+        return dict(self.user_preferences.get(user_id, {}))
+
+    def set_preference(self, user_id, key, value):
+        self.user_preferences.update(user_id, lambda preferences: {**preferences, key: value}, {})
+
+    def get_data_version(self, user_id):
+        return self.data_versions.get(user_id, 0)
+
+    def bump_data_version(self, user_id):
+        return self.data_versions.update(user_id, lambda version: version + 1, 0)
+
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared statement on every call
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    epoch_us INTEGER NOT NULL,
+    tx_id TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    user_id TEXT NOT NULL,
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, granularity, bucket, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# Databases created before tx_id existed get the column added and backfilled
+MIGRATE_TX_ID = """
+ALTER TABLE transactions ADD COLUMN tx_id TEXT NOT NULL DEFAULT '';
+UPDATE transactions SET tx_id = COALESCE(json_extract(data, '$.transaction_id'), '');
+"""
+
+# Databases that stored REAL epoch seconds in ts get the table rebuilt with
+# integer epoch_us, taken from the stored row where it was normalized at ingest
+MIGRATE_EPOCH_US = (
+    """CREATE TABLE transactions_epoch_us (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        epoch_us INTEGER NOT NULL,
+        tx_id TEXT NOT NULL DEFAULT '',
+        data TEXT NOT NULL
+    )""",
+    """INSERT INTO transactions_epoch_us (seq, user_id, epoch_us, tx_id, data)
+    SELECT seq, user_id, COALESCE(json_extract(data, '$.epoch_us'), CAST(round(ts * 1000000) AS INTEGER)), tx_id, data
+    FROM transactions""",
+    "DROP TABLE transactions",
+    "ALTER TABLE transactions_epoch_us RENAME TO transactions",
+)
+
+INDEXES = """
+DROP INDEX IF EXISTS idx_transactions_user_ts;
+DROP INDEX IF EXISTS idx_transactions_user_ts_id;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_epoch_id ON transactions (user_id, epoch_us, tx_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_tx ON transactions (user_id, tx_id);
+"""
+
+# Ids checked per query, well under SQLite's bound-parameter limit
+EXISTING_IDS_CHUNK = 500
+
+SELECT_USER = "SELECT data FROM users WHERE username = ?"
+INSERT_USER = "INSERT OR REPLACE INTO users (username, data) VALUES (?, ?)"
+COUNT_USERS = "SELECT COUNT(*) FROM users"
+SELECT_PROFILE = "SELECT data FROM profiles WHERE user_id = ?"
+UPSERT_PROFILE = "INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)"
+INSERT_TRANSACTION = "INSERT INTO transactions (user_id, epoch_us, tx_id, data) VALUES (?, ?, ?, ?)"
+SELECT_TRANSACTIONS = (
+    "SELECT data FROM transactions WHERE user_id = ? AND epoch_us >= ? AND epoch_us <= ? "
+    "ORDER BY epoch_us, tx_id"
+)
+PAGE_TRANSACTIONS = (
+    "SELECT data FROM transactions WHERE user_id = ? AND epoch_us >= ? AND epoch_us <= ? "
+    "AND (epoch_us, tx_id) > (?, ?) ORDER BY epoch_us, tx_id LIMIT ?"
+)
+UPSERT_ROLLUP = (
+    "INSERT INTO rollups (user_id, granularity, bucket, category, amount, count) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id, granularity, bucket, category) "
+    "DO UPDATE SET amount = amount + excluded.amount, count = count + excluded.count"
+)
+SELECT_ROLLUPS = (
+    "SELECT bucket, category, amount, count FROM rollups "
+    "WHERE user_id = ? AND granularity = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket, category"
+)
+SELECT_PREFERENCES = "SELECT data FROM preferences WHERE user_id = ?"
+UPSERT_PREFERENCES = "INSERT OR REPLACE INTO preferences (user_id, data) VALUES (?, ?)"
+SELECT_DATA_VERSION = "SELECT version FROM data_versions WHERE user_id = ?"
+BUMP_DATA_VERSION = (
+    "INSERT INTO data_versions (user_id, version) VALUES (?, 1) "
+    "ON CONFLICT (user_id) DO UPDATE SET version = version + 1"
+)
+
+
+# Bounds for an open-ended range over an INTEGER column
+MIN_INTEGER = -(2 ** 63)
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def _epoch_bounds(start, end):
+    """Integer epoch_us bounds for an optional timestamp range"""
+    return (MIN_INTEGER if start is None else to_epoch_us(start),
+            MAX_INTEGER if end is None else to_epoch_us(end))
+
+
+def _rollup_rows(user_id, transactions):
+    return [(user_id, granularity, bucket, category, amount, count)
+            for (granularity, bucket, category), (amount, count) in aggregate(transactions).items()]
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite storage that can be shared by several worker processes.
+
+    Runs in WAL mode so readers never block the writer, and keeps one
+    connection per thread since sqlite3 connections must not be shared
+    across threads. Per-user locks live in a lock file next to the
+    database, so they hold across every process using it.
+    """
+
+    durable = True
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._inherited = []
+        self.locks = UserLocks(path + '.locks')
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(transactions)")]
+        if 'tx_id' not in columns:
+            try:
+                conn.executescript(MIGRATE_TX_ID)
+            except sqlite3.OperationalError:
+                # Another worker added the column first
+                conn.rollback()
+        if 'epoch_us' not in columns:
+            self._migrate_epoch_us(conn)
+        conn.executescript(INDEXES)
+        self._backfill_rollups(conn)
+
+    def _migrate_epoch_us(self, conn):
+        """Replace the REAL ts column of an older database with integer epoch_us"""
+        with conn:
+            # BEGIN IMMEDIATE so a second worker starting up waits, then finds the work done
+            conn.execute("BEGIN IMMEDIATE")
+            if 'ts' not in [row[1] for row in conn.execute("PRAGMA table_info(transactions)")]:
+                return
+            for statement in MIGRATE_EPOCH_US:
+                conn.execute(statement)
+
+    def _backfill_rollups(self, conn):
+        """Build rollups for a database whose transactions predate the rollups table"""
+        if conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+            return
+        with conn:
+            # BEGIN IMMEDIATE so a second worker starting up waits, then finds the work done
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone():
+                return
+            users = [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM transactions")]
+            for user_id in users:
+                cursor = conn.execute("SELECT data FROM transactions WHERE user_id = ?", (user_id,))
+                transactions = ensure_normalized([json.loads(row[0]) for row in cursor])
+                conn.executemany(UPSERT_ROLLUP, _rollup_rows(user_id, transactions))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, cached_statements=256)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _fetch_json(self, sql, params):
+        row = self._connection().execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def reset_after_fork(self):
+        # Keep inherited connections referenced but unused: closing them in
+        # the child could release the parent's locks on the database file
+        self._inherited.append(self._local)
+        self._local = threading.local()
+        super().reset_after_fork()
+
+    def close(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def get_user(self, username):
+        return self._fetch_json(SELECT_USER, (username,))
+
+    def add_user(self, username, user):
+        conn = self._connection()
+        with conn:
+            conn.execute(INSERT_USER, (username, json.dumps(user)))
+
+    def count_users(self):
+        return self._connection().execute(COUNT_USERS).fetchone()[0]
+
+    def get_profile(self, user_id):
+        return self._fetch_json(SELECT_PROFILE, (user_id,))
+
+    def save_profile(self, user_id, profile):
+        conn = self._connection()
+        with conn:
+            conn.execute(UPSERT_PROFILE, (user_id, json.dumps(profile, default=str)))
+
+    def add_transactions(self, user_id, transactions):
+        # Normalize every timestamp before writing so a bad row rejects the whole batch
+        ensure_normalized(transactions)
+        rows = [
+            (user_id, tx['epoch_us'], str(tx.get('transaction_id', '')),
+             json.dumps(tx, default=str))
+            for tx in transactions
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(INSERT_TRANSACTION, rows)
+            conn.executemany(UPSERT_ROLLUP, _rollup_rows(user_id, transactions))
+
+    def get_transactions(self, user_id, start=None, end=None):
+        lo, hi = _epoch_bounds(start, end)
+        cursor = self._connection().execute(SELECT_TRANSACTIONS, (user_id, lo, hi))
+        return [json.loads(row[0]) for row in cursor]
+
+    def page_transactions(self, user_id, start=None, end=None, after=None, limit=100):
+        lo, hi = _epoch_bounds(start, end)
+        after_us, after_id = (MIN_INTEGER, '') if after is None else (to_epoch_us(after[0]), str(after[1]))
+        cursor = self._connection().execute(PAGE_TRANSACTIONS, (user_id, lo, hi, after_us, after_id, limit))
+        return [json.loads(row[0]) for row in cursor]
+
+    def existing_transaction_ids(self, user_id, transaction_ids):
+        ids = list(dict.fromkeys(str(tx_id) for tx_id in transaction_ids))
+        conn = self._connection()
+        found = set()
+        for i in range(0, len(ids), EXISTING_IDS_CHUNK):
+            chunk = ids[i:i + EXISTING_IDS_CHUNK]
+            sql = ("SELECT DISTINCT tx_id FROM transactions WHERE user_id = ? AND tx_id IN "
+                   f"({', '.join('?' * len(chunk))})")
+            found.update(row[0] for row in conn.execute(sql, [user_id, *chunk]))
+        return found
+
+    def get_rollups(self, user_id, granularity, start=None, end=None):
+        lo = MIN_INTEGER if start is None else start
+        hi = MAX_INTEGER if end is None else end
+        return [tuple(row) for row in self._connection().execute(SELECT_ROLLUPS, (user_id, granularity, lo, hi))]
+
+    def get_preferences(self, user_id):
+        return self._fetch_json(SELECT_PREFERENCES, (user_id,)) or {}
+
+    def set_preference(self, user_id, key, value):
+        conn = self._connection()
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent
+            # read-modify-write updates from other workers cannot interleave
+            conn.execute("BEGIN IMMEDIATE")
+            preferences = self._fetch_json(SELECT_PREFERENCES, (user_id,)) or {}
+            preferences[key] = value
+            conn.execute(UPSERT_PREFERENCES, (user_id, json.dumps(preferences)))
+
+    def get_data_version(self, user_id):
+        row = self._connection().execute(SELECT_DATA_VERSION, (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_data_version(self, user_id):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(BUMP_DATA_VERSION, (user_id,))
+            return conn.execute(SELECT_DATA_VERSION, (user_id,)).fetchone()[0]
+
+
+def create_storage(backend, sqlite_path=None):
+    """Create the storage backend named in config"""
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'sqlite':
+        return SQLiteStorage(sqlite_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
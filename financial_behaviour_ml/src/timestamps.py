@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value):
+    """Integer microseconds since the Unix epoch for an ISO timestamp or datetime.
+
+    Naive values are local time, as datetime.timestamp() treats them.
+    Raises TypeError or ValueError for anything that is not a timestamp.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return (value - EPOCH) // MICROSECOND
+
+
+def normalize_transaction(tx):
+    """Parse a transaction's ISO timestamp once and store it as integers.
+
+    Adds 'epoch_us' (microseconds since the Unix epoch, for ordering and
+    range filters) and 'day' (the calendar day's ordinal, for day buckets).
+    Raises TypeError or ValueError if the timestamp is invalid.
+    """
+    timestamp = datetime.fromisoformat(tx['timestamp'])
+    tx['epoch_us'] = to_epoch_us(timestamp)
+    tx['day'] = timestamp.date().toordinal()
+    return tx
+
+
+def ensure_normalized(transactions):
+    """Normalize every transaction that has not been normalized yet"""
+    for tx in transactions:
+        if 'epoch_us' not in tx or 'day' not in tx:
+            normalize_transaction(tx)
+    return transactions
@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """Bounded LRU cache of verified tokens.
+
+    Maps the exact token string to the user_id it was verified for, until
+    the token's own exp. A tampered token is a different string, so it
+    misses and goes through full verification.
+    """
+
+    def __init__(self, maxsize=10000, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token):
+        """Return the cached user_id for token, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+
+            user_id, exp = entry
+            if exp <= self.clock():
+                del self._entries[token]
+                return None
+
+            self._entries.move_to_end(token)
+            return user_id
+
+    def put(self, token, user_id, exp):
+        """Cache a verified token until exp (seconds since the epoch)"""
+        if self.maxsize <= 0 or exp is None or exp <= self.clock():
+            return
+
+        with self._lock:
+            self._entries[token] = (user_id, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
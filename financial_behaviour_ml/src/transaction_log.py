@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; compaction is then only guarded per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Columns stored natively in compacted segments; anything else goes in 'extra'
+CORE_COLUMNS = ['transaction_id', 'timestamp', 'category', 'amount']
+
+
+class TransactionLog:
+    """Append-only on-disk transaction log, segmented per user and month.
+
+    Layout: <root>/<quoted user_id>/<YYYY-MM>.jsonl
+
+    New transactions are appended to the segment for the month they were
+    written in, so a submit only writes its own batch. Segments from
+    earlier months are closed and get compacted into Parquet files by a
+    background thread; when several workers share the log, a lock file
+    lets only one of them compact at a time. replay() reads everything
+    back for startup recovery.
+    """
+
+    def __init__(self, root, compact_interval=300):
+        self.root = root
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _user_dir(self, user_id):
+        return os.path.join(self.root, quote(str(user_id), safe=''))
+
+    @staticmethod
+    def _current_segment():
+        return datetime.now().strftime('%Y-%m')
+
+    def append(self, user_id, transactions):
+        """Append a batch of transactions to the user's current segment"""
+        if not transactions:
+            return
+
+        user_dir = self._user_dir(user_id)
+        path = os.path.join(user_dir, f'{self._current_segment()}.jsonl')
+        lines = ''.join(json.dumps(tx, default=str) + '\n' for tx in transactions)
+
+        with self._lock:
+            os.makedirs(user_dir, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+    def replay(self):
+        """Yield (user_id, transactions) for every user in the log"""
+        if not os.path.isdir(self.root):
+            return
+
+        for entry in sorted(os.listdir(self.root)):
+            user_dir = os.path.join(self.root, entry)
+            if not os.path.isdir(user_dir):
+                continue
+
+            user_txs = []
+            for segment in self._segments(user_dir):
+                user_txs.extend(self._read_segment(user_dir, segment))
+
+            if user_txs:
+                yield unquote(entry), user_txs
+
+    @staticmethod
+    def _segments(user_dir):
+        """Segment names for a user, oldest first"""
+        names = set()
+        for filename in os.listdir(user_dir):
+            name, ext = os.path.splitext(filename)
+            if ext in ('.jsonl', '.parquet'):
+                names.add(name)
+        return sorted(names)
+
+    def _read_segment(self, user_dir, segment):
+        jsonl_path = os.path.join(user_dir, f'{segment}.jsonl')
+        parquet_path = os.path.join(user_dir, f'{segment}.parquet')
+
+        # A leftover .jsonl next to its .parquet means compaction was interrupted
+        # after the Parquet file was written, so the Parquet copy is complete
+        if os.path.exists(parquet_path):
+            return self._read_parquet(parquet_path)
+
+        user_txs = []
+        with open(jsonl_path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    user_txs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final write from a crash; skip it rather than fail recovery
+                    logger.warning(f"Skipping corrupt log line {line_no} in {jsonl_path}")
+        return user_txs
+
+    @staticmethod
+    def _read_parquet(path):
+        df = pd.read_parquet(path)
+        user_txs = []
+        for row in df.to_dict('records'):
+            extra = row.pop('extra', None)
+            tx = {k: v for k, v in row.items() if not pd.isna(v)}
+            if isinstance(extra, str):
+                tx.update(json.loads(extra))
+            user_txs.append(tx)
+        return user_txs
+
+    def compact(self):
+        """Compact closed (non-current) JSONL segments into Parquet"""
+        if not os.path.isdir(self.root):
+            return 0
+
+        if fcntl is None:
+            return self._compact_all()
+
+        with open(os.path.join(self.root, '.compaction.lock'), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0  # Another worker is compacting
+            return self._compact_all()
+
+    def _compact_all(self):
+        current = self._current_segment()
+        compacted = 0
+
+        for entry in os.listdir(self.root):
+            user_dir = os.path.join(self.root, entry)
+            if not os.path.isdir(user_dir):
+                continue
+
+            for segment in self._segments(user_dir):
+                jsonl_path = os.path.join(user_dir, f'{segment}.jsonl')
+                if segment >= current or not os.path.exists(jsonl_path):
+                    continue
+                try:
+                    with self._lock:
+                        self._compact_segment(user_dir, segment)
+                    compacted += 1
+                except Exception as e:
+                    logger.error(f"Error compacting {jsonl_path}: {e}")
+
+        return compacted
+
+    def _compact_segment(self, user_dir, segment):
+        jsonl_path = os.path.join(user_dir, f'{segment}.jsonl')
+        parquet_path = os.path.join(user_dir, f'{segment}.parquet')
+
+        if not os.path.exists(parquet_path):
+            rows = []
+            for tx in self._read_segment(user_dir, segment):
+                extra = {k: v for k, v in tx.items() if k not in CORE_COLUMNS}
+                rows.append({
+                    'transaction_id': str(tx.get('transaction_id')),
+                    'timestamp': str(tx.get('timestamp')),
+                    'category': tx.get('category'),
+                    'amount': float(tx['amount']) if 'amount' in tx else None,
+                    'extra': json.dumps(extra, default=str) if extra else None
+                })
+
+            tmp_path = parquet_path + '.tmp'
+            pd.DataFrame(rows, columns=CORE_COLUMNS + ['extra']).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, parquet_path)
+
+        os.remove(jsonl_path)
+
+    def start_compaction(self):
+        """Start the background compaction thread"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.compact_interval):
+                self.compact()
+
+        self._thread = threading.Thread(target=run, name='transaction-log-compaction', daemon=True)
+        self._thread.start()
+
+    def reset_after_fork(self):
+        """Recreate the lock and compaction thread state in a forked worker"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stop_compaction(self):
+        """Stop the background compaction thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,354 @@
+import bisect
+import math
+import threading
+import uuid
+from array import array
+from datetime import datetime
+from operator import itemgetter
+
+from src.sharded import ShardedDict
+from src.timestamps import ensure_normalized, to_epoch_us
+
+# Rows a user's append buffer holds before it is merged into the columns
+BUFFER_SIZE = 256
+
+# Marks a field that was absent from the submitted transaction
+_MISSING = object()
+
+NO_ID = bytes(16)
+
+# Slots in a new user's id index; it doubles whenever it would pass two thirds full
+ID_INDEX_MIN_SLOTS = 8
+
+
+def _sort_key(transaction):
+    """(epoch_us, transaction_id) key, which also orders transactions with equal timestamps"""
+    return transaction['epoch_us'], str(transaction.get('transaction_id', ''))
+
+
+def _bound(value):
+    return None if value is None else to_epoch_us(value)
+
+
+def _id_string(tx_id):
+    """Canonical UUID string for 16 id bytes (str(uuid.UUID(bytes=...)), without the object)"""
+    h = tx_id.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+def _index_key(value):
+    """Key for a transaction id in the id index: UUID bytes, or the id as a string"""
+    return _id_bytes(value) or str(value)
+
+
+def _id_hash(key):
+    """Non-zero int64 hash of an index key (0 marks an empty slot)"""
+    return hash(key) or 1
+
+
+def _id_bytes(value):
+    """16-byte form of a canonical UUID string, or None for any other id"""
+    if isinstance(value, str) and len(value) == 36:
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return None
+        if str(parsed) == value:
+            return parsed.bytes
+    return None
+
+
+class Categories:
+    """Category values interned once and shared by every user's columns"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def code(self, value):
+        """Code for a category value; raises TypeError if it is unhashable"""
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.values.append(value)
+                    self._codes[value] = code
+        return code
+
+
+class _IdIndex:
+    """Open-addressing set of int64 transaction id hashes, 8 bytes a slot.
+
+    Holds hashes only, so a hit means the id is probably stored; the owner
+    confirms it against its id column.
+    """
+
+    def __init__(self):
+        self._slots = array('q', bytes(8 * ID_INDEX_MIN_SLOTS))
+        self._used = 0
+
+    def _find(self, slots, h):
+        """Slot holding h, or the empty slot where it would go (linear probing)"""
+        mask = len(slots) - 1
+        i = h & mask
+        while slots[i] and slots[i] != h:
+            i = (i + 1) & mask
+        return i
+
+    def __contains__(self, h):
+        return self._slots[self._find(self._slots, h)] == h
+
+    def add(self, h):
+        if 3 * (self._used + 1) > 2 * len(self._slots):
+            self._grow()
+        i = self._find(self._slots, h)
+        if not self._slots[i]:
+            self._slots[i] = h
+            self._used += 1
+
+    def _grow(self):
+        slots = array('q', bytes(16 * len(self._slots)))
+        for h in self._slots:
+            if h:
+                slots[self._find(slots, h)] = h
+        self._slots = slots
+
+
+class _Keys:
+    """Read-only sequence view of a user's (epoch_us, transaction_id) keys, for bisect"""
+
+    def __init__(self, user_txs):
+        self.user_txs = user_txs
+
+    def __len__(self):
+        return len(self.user_txs._epochs)
+
+    def __getitem__(self, index):
+        return self.user_txs._key(index)
+
+
+class UserTransactions:
+    """A single user's transactions as typed columns sorted by (epoch_us, transaction_id).
+
+    Each row costs an int64 epoch, a float64 amount, a uint32 category
+    code and a 16-byte transaction id, instead of a dict of strings. A
+    field the columns cannot reproduce exactly (a non-UUID id, a timestamp
+    written with an offset, a string amount, extra keys) is kept in a
+    small per-row dict of overrides, so decoded rows match what was
+    submitted. New rows land in an append buffer that is merged into the
+    columns once it fills up or a read needs it. An index of 64-bit id
+    hashes answers "seen before?" in O(1); the rare hit is confirmed
+    against the stored ids, so a hash collision never drops a new row.
+    """
+
+    def __init__(self, categories):
+        self.categories = categories
+        self._epochs = array('q')
+        self._amounts = array('d')
+        self._codes = array('I')
+        self._ids = bytearray()
+        self._overrides = []  # None, or {field: value} for rows the columns don't reproduce
+        self._buffer = []  # (key, row) pairs not yet merged
+        self._id_index = _IdIndex()  # _id_hash() of every stored transaction id
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._epochs) + len(self._buffer)
+
+    def __iter__(self):
+        return iter(self.range())
+
+    def encode(self, transaction):
+        """Columnar row for a normalized transaction"""
+        try:
+            amount = float(transaction['amount'])
+        except (KeyError, TypeError, ValueError):
+            amount = math.nan
+        try:
+            code = self.categories.code(transaction.get('category'))
+        except TypeError:
+            code = self.categories.code(None)
+        tx_id = _id_bytes(transaction.get('transaction_id')) or NO_ID
+
+        row = (transaction['epoch_us'], amount, code, tx_id, None)
+        decoded = self._decode(row)
+        overrides = {k: v for k, v in transaction.items() if k not in decoded or decoded[k] != v}
+        overrides.update((k, _MISSING) for k in decoded if k not in transaction)
+        return row[:4] + (overrides or None,)
+
+    def _decode(self, row):
+        epoch, amount, code, tx_id, overrides = row
+        seconds, micros = divmod(epoch, 1000000)
+        local = datetime.fromtimestamp(seconds).replace(microsecond=micros)
+        transaction = {
+            'transaction_id': _id_string(tx_id),
+            'timestamp': local.isoformat(),
+            'category': self.categories.values[code],
+            'amount': amount,
+            'epoch_us': epoch,
+            'day': local.toordinal()
+        }
+        if overrides:
+            for field, value in overrides.items():
+                if value is _MISSING:
+                    del transaction[field]
+                else:
+                    transaction[field] = value
+        return transaction
+
+    def _row(self, index):
+        return (self._epochs[index], self._amounts[index], self._codes[index],
+                self._ids[index * 16:index * 16 + 16], self._overrides[index])
+
+    def _key(self, index):
+        overrides = self._overrides[index]
+        if overrides and 'transaction_id' in overrides:
+            tx_id = overrides['transaction_id']
+            return self._epochs[index], '' if tx_id is _MISSING else str(tx_id)
+        return self._epochs[index], _id_string(self._ids[index * 16:index * 16 + 16])
+
+    def add(self, rows):
+        """Queue (key, row) pairs, merging them into the columns once the buffer is full"""
+        with self._lock:
+            self._buffer.extend(rows)
+            for (_, tx_id), _ in rows:
+                if tx_id:
+                    self._id_index.add(_id_hash(_index_key(tx_id)))
+            if len(self._buffer) >= BUFFER_SIZE:
+                self._merge()
+
+    def _merge(self):
+        # Callers hold self._lock
+        if not self._buffer:
+            return
+        buffer = sorted(self._buffer, key=itemgetter(0))
+        self._buffer = []
+
+        # Transactions usually arrive in time order, so appending is the common case
+        if not self._epochs or buffer[0][0] >= self._key(len(self._epochs) - 1):
+            for _, (epoch, amount, code, tx_id, overrides) in buffer:
+                self._epochs.append(epoch)
+                self._amounts.append(amount)
+                self._codes.append(code)
+                self._ids += tx_id
+                self._overrides.append(overrides)
+            return
+
+        keys = _Keys(self)
+        for key, (epoch, amount, code, tx_id, overrides) in buffer:
+            index = bisect.bisect_right(keys, key)
+            self._epochs.insert(index, epoch)
+            self._amounts.insert(index, amount)
+            self._codes.insert(index, code)
+            self._ids[index * 16:index * 16] = tx_id
+            self._overrides.insert(index, overrides)
+
+    def existing_ids(self, transaction_ids):
+        """Subset of transaction_ids (compared as strings) already stored"""
+        with self._lock:
+            return {tx_id for tx_id in map(str, transaction_ids) if self._has_id(tx_id)}
+
+    def _has_id(self, tx_id):
+        # Callers hold self._lock
+        key = _index_key(tx_id)
+        if _id_hash(key) not in self._id_index:
+            return False
+
+        # Confirm the hit against the stored ids
+        if any(buffered_id == tx_id for (_, buffered_id), _ in self._buffer):
+            return True
+        if isinstance(key, bytes):
+            at = self._ids.find(key)
+            while at != -1:
+                if at % 16 == 0:
+                    return True
+                at = self._ids.find(key, at + 1)
+            return False
+        return any(overrides and 'transaction_id' in overrides and str(overrides['transaction_id']) == tx_id
+                   for overrides in self._overrides)
+
+    def _bounds(self, start, end):
+        # start and end are integer epoch_us bounds
+        lo = 0 if start is None else bisect.bisect_left(self._epochs, start)
+        hi = len(self._epochs) if end is None else bisect.bisect_right(self._epochs, end)
+        return lo, hi
+
+    def range(self, start=None, end=None):
+        """Get transactions with start <= epoch_us <= end in O(log n + k)"""
+        with self._lock:
+            self._merge()
+            lo, hi = self._bounds(start, end)
+            return [self._decode(self._row(i)) for i in range(lo, hi)]
+
+    def page(self, start=None, end=None, after=None, limit=100):
+        """Get up to limit transactions in the range that sort after the key `after`"""
+        with self._lock:
+            self._merge()
+            lo, hi = self._bounds(start, end)
+            if after is not None:
+                lo = max(lo, bisect.bisect_right(_Keys(self), after))
+            return [self._decode(self._row(i)) for i in range(lo, min(hi, lo + limit))]
+
+
+class TransactionStore:
+    """Per-user transaction history indexed by timestamp, stored column-wise"""
+
+    def __init__(self):
+        self._users = ShardedDict()
+        self.categories = Categories()
+
+    def reset_after_fork(self):
+        """Recreate every lock a forked child may have inherited held"""
+        self._users.reset_after_fork()
+        self.categories._lock = threading.Lock()
+        for user_txs in self._users.values():
+            user_txs._lock = threading.Lock()
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def add(self, user_id, transactions):
+        """Add transactions for a user, normalizing any that carry no epoch_us yet.
+
+        All timestamps are checked before anything is inserted, so a bad
+        timestamp raises ValueError without leaving a partial batch behind.
+        """
+        ensure_normalized(transactions)
+
+        user_txs = self._users.get(user_id)
+        if user_txs is None:
+            user_txs = self._users.setdefault(user_id, UserTransactions(self.categories))
+
+        user_txs.add([(_sort_key(tx), user_txs.encode(tx)) for tx in transactions])
+
+    def all(self, user_id):
+        """Get all transactions for a user in time order"""
+        user_txs = self._users.get(user_id)
+        return [] if user_txs is None else user_txs.range()
+
+    def range(self, user_id, start=None, end=None):
+        """Get a user's transactions between start and end (inclusive)"""
+        user_txs = self._users.get(user_id)
+        return [] if user_txs is None else user_txs.range(_bound(start), _bound(end))
+
+    def page(self, user_id, start=None, end=None, after=None, limit=100):
+        """Get one page of a user's transactions; after is (timestamp, transaction_id)"""
+        user_txs = self._users.get(user_id)
+        if user_txs is None:
+            return []
+        if after is not None:
+            after = (to_epoch_us(after[0]), str(after[1]))
+        return user_txs.page(_bound(start), _bound(end), after, limit)
+
+    def existing_ids(self, user_id, transaction_ids):
+        """Subset of transaction_ids (as strings) already stored for a user"""
+        user_txs = self._users.get(user_id)
+        return set() if user_txs is None else user_txs.existing_ids(transaction_ids)
+
+    def count(self, user_id):
+        """Get the number of transactions stored for a user"""
+        user_txs = self._users.get(user_id)
+        return 0 if user_txs is None else len(user_txs)
@@ -0,0 +1,59 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from src.sharded import shard_of
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; locks are then per process only
+    fcntl = None
+
+
+class UserLocks:
+    """Per-user locks, optionally shared by every process on the host.
+
+    Users are hashed onto a fixed number of stripes. Each stripe is a
+    thread lock plus, when a lock file is given, an fcntl byte-range lock
+    on that stripe's byte of the file, so workers sharing a database also
+    serialize their read-modify-write updates for the same user.
+    """
+
+    def __init__(self, path=None, stripes=1024):
+        self.path = path
+        self.stripes = stripes
+        self._fd = None
+        self.reset_after_fork()
+
+    def reset_after_fork(self):
+        """Recreate the thread locks (a forked child may inherit them held)"""
+        self._thread_locks = [threading.Lock() for _ in range(self.stripes)]
+
+        if self.path is not None and fcntl is not None and self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _stripe(self, user_id):
+        return shard_of(user_id, self.stripes)
+
+    @contextmanager
+    def lock(self, user_id):
+        """Hold the lock for user_id across threads and (if file-backed) processes"""
+        stripe = self._stripe(user_id)
+        with self._thread_locks[stripe]:
+            if self._fd is None:
+                yield
+                return
+
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
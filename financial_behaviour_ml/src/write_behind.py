@@ -0,0 +1,118 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the write-behind queue stays full for longer than the submit timeout"""
+
+
+class WriteBehind:
+    """Queue that applies writes on background threads after the caller returns.
+
+    submit() queues items for a user and returns at once. Worker threads
+    take every item pending for one user and hand them to apply_batch as
+    a single batch, so bursts from the same user coalesce into one write,
+    and a user's batches are applied in order, never concurrently. Once
+    max_pending items are queued, submit() blocks (back-pressure). close()
+    stops intake and drains the queue.
+    """
+
+    def __init__(self, apply_batch, max_pending=10000, workers=2):
+        self.apply_batch = apply_batch
+        self.max_pending = max_pending
+        self.workers = workers
+        self._start()
+
+    def _start(self):
+        self._cond = threading.Condition()
+        self._pending = {}  # user_id -> items queued and not yet taken by a worker
+        self._ready = deque()  # users with pending items and no batch in progress
+        self._active = {}  # user_id -> items of the batch being applied
+        self._count = 0  # items queued or in progress
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f'write-behind-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def reset_after_fork(self):
+        """Start a forked worker with an empty queue and its own threads.
+
+        Items queued in the parent stay the parent's to apply; keeping
+        copies here would apply them twice.
+        """
+        self._start()
+
+    def __len__(self):
+        return self._count
+
+    def submit(self, user_id, items, timeout=None):
+        """Queue items for user_id, waiting up to timeout seconds while the queue is full"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            if not self._cond.wait_for(lambda: self._count < self.max_pending or self._closed, timeout):
+                raise QueueFull(f"{self._count} writes pending")
+
+            pending = self._pending.get(user_id)
+            if pending is None:
+                self._pending[user_id] = list(items)
+                if user_id not in self._active:
+                    self._ready.append(user_id)
+            else:
+                pending.extend(items)
+
+            self._count += len(items)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or (self._closed and not self._count))
+                if not self._ready:
+                    return  # Closed and drained
+                user_id = self._ready.popleft()
+                items = self._pending.pop(user_id)
+                self._active[user_id] = items
+
+            try:
+                self.apply_batch(user_id, items)
+            except Exception:
+                logger.exception(f"Error applying {len(items)} queued write(s) for {user_id}")
+            finally:
+                with self._cond:
+                    del self._active[user_id]
+                    self._count -= len(items)
+                    # Items that arrived while this batch was applied form the next one
+                    if user_id in self._pending:
+                        self._ready.append(user_id)
+                    self._cond.notify_all()
+
+    def queued(self, user_id):
+        """Items for user_id that are queued or being applied"""
+        with self._cond:
+            return self._active.get(user_id, []) + self._pending.get(user_id, [])
+
+    def wait_for_user(self, user_id, timeout=None):
+        """Wait until everything queued for user_id has been applied"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: user_id not in self._pending and user_id not in self._active, timeout)
+
+    def flush(self, timeout=None):
+        """Wait until every queued write has been applied"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._count, timeout)
+
+    def close(self, timeout=None):
+        """Stop accepting writes, apply everything still queued and stop the workers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,641 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+# Keep the transaction log out of the working tree and the profile service
+# offline; must be set before importing the API
+os.environ['TRANSACTION_LOG_DIR'] = tempfile.mkdtemp()
+os.environ['MOCKAROO_ENDPOINT'] = 'http://127.0.0.1:9/profiles.json'
+
+import jwt
+from src import api
+from src.savings_model import SavingsModel
+from src.rescorer import Rescorer
+from src.profile_pool import ProfilePool
+from src.lru_cache import LRUCache
+
+TEST_PROFILE = {
+    'Income': 40000,
+    'Groceries': 4000,
+    'Transport': 1000,
+    'Eating_Out': 1000,
+    'Entertainment': 500,
+    'Utilities': 1000,
+    'Healthcare': 500,
+    'Education': 0,
+    'Miscellaneous': 300,
+    'Disposable_Income': 20000,
+    'Desired_Savings_Percentage': 10,
+    'Desired_Savings': 4000
+}
+
+class ApiTestCase(unittest.TestCase):
+    """Base class that logs in a fresh user with a known profile"""
+
+    username = 'test_user'
+
+    def setUp(self):
+        self.client = api.app.test_client()
+        self.username = f'{self.username}_{self.id()}'
+        response = self.client.post('/auth/login', json={'username': self.username, 'password': 'secret'})
+        self.headers = {'Authorization': f"Bearer {response.json['token']}"}
+        api.storage.save_profile(self.username, dict(TEST_PROFILE))
+        api.bump_data_version(self.username)
+
+        # Run without savings models unless a test installs its own
+        saved_model = api.savings_model
+        api.savings_model = SavingsModel({})
+        self.addCleanup(setattr, api, 'savings_model', saved_model)
+
+class TestWeeklySnapshot(ApiTestCase):
+    def test_dashboard_and_alerts_agree(self):
+        self.client.post('/submit_transaction', json=[
+            {'category': 'groceries', 'amount': 6000},
+            {'category': 'transport', 'amount': 500}
+        ], headers=self.headers)
+
+        alerts = self.client.get('/get_alerts', headers=self.headers).json
+        stats = self.client.get('/dashboard_stats', headers=self.headers).json
+
+        self.assertEqual([a['category'] for a in alerts], ['groceries'])
+        self.assertEqual(stats['alert_count'], 1)
+        self.assertEqual(stats['recent_spending'], 6500)
+        self.assertEqual(stats['category_breakdown'], {'groceries': 6000, 'transport': 500})
+
+    def test_snapshot_is_memoized_until_data_changes(self):
+        first = api.get_weekly_snapshot(self.username)
+        self.assertIs(api.get_weekly_snapshot(self.username), first)
+
+        self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 100}, headers=self.headers)
+        second = api.get_weekly_snapshot(self.username)
+        self.assertIsNot(second, first)
+        self.assertEqual(second['recent_spending'], 100)
+
+    def test_opted_out_user_has_no_alerts(self):
+        self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 6000}, headers=self.headers)
+        self.client.post('/opt_out', json={'opted_out': True}, headers=self.headers)
+
+        self.assertEqual(self.client.get('/get_alerts', headers=self.headers).status_code, 403)
+        self.assertEqual(self.client.get('/dashboard_stats', headers=self.headers).json['alert_count'], 0)
+
+class TestBulkTransactions(ApiTestCase):
+    def test_ndjson_ingest_reports_rejects(self):
+        body = '\n'.join([
+            '{"category": "groceries", "amount": 100, "timestamp": "2023-07-01T10:00:00"}',
+            '{"category": "transport", "amount": "50"}',
+            'not json',
+            '{"category": "groceries", "amount": 10, "timestamp": "someday"}',
+            '',
+            '{"category": "eating_out"}',
+            '{"category": "groceries", "amount": "nan"}',
+            '{"category": "groceries", "amount": "-inf"}'
+        ])
+
+        response = self.client.post('/bulk_transactions', data=body, headers=self.headers,
+                                    content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['accepted'], 2)
+        self.assertEqual(response.json['rejected'], 5)
+        self.assertEqual([row['line'] for row in response.json['rejected_rows']], [3, 4, 6, 7, 8])
+
+        self.assertEqual(len(api.storage.get_transactions(self.username)), 2)
+        profile = api.storage.get_profile(self.username)
+        self.assertEqual(profile['Groceries'], 4100)
+        self.assertEqual(profile['Disposable_Income'], 19850)
+        self.assertEqual(profile['Potential_Savings_Groceries'], 410)
+
+    def test_body_split_across_chunks(self):
+        rows = [{'category': 'groceries', 'amount': 1, 'transaction_id': str(i)} for i in range(25)]
+        body = '\n'.join(json.dumps(row) for row in rows)
+
+        original_chunk_size = api.BULK_CHUNK_SIZE
+        api.BULK_CHUNK_SIZE = 10
+        try:
+            response = self.client.post('/bulk_transactions', data=body, headers=self.headers)
+        finally:
+            api.BULK_CHUNK_SIZE = original_chunk_size
+
+        self.assertEqual(response.json['accepted'], 25)
+        self.assertEqual(api.storage.get_profile(self.username)['Groceries'], 4025)
+
+    def test_replayed_rows_are_skipped_and_reported(self):
+        rows = [{'category': 'groceries', 'amount': 1, 'transaction_id': f'bulk-{i}'} for i in range(3)]
+        body = '\n'.join(json.dumps(row) for row in rows + rows[:1])
+        self.client.post('/bulk_transactions', data=body, headers=self.headers)
+
+        response = self.client.post('/bulk_transactions', data=json.dumps(rows[2]), headers=self.headers)
+        self.assertEqual(response.json['accepted'], 0)
+        self.assertEqual(response.json['duplicate_rows'], [{'line': 1, 'transaction_id': 'bulk-2'}])
+        self.assertEqual(api.storage.get_profile(self.username)['Groceries'], 4003)
+
+class TestSubmitValidation(ApiTestCase):
+    def test_bad_rows_reject_the_batch_before_it_is_queued(self):
+        for body in ({'category': 'groceries', 'amount': 'abc'}, {'category': 5, 'amount': 10},
+                     {'category': 'groceries'}, {'category': 'groceries', 'amount': 'inf'},
+                     [{'category': 'groceries', 'amount': 10}, 'not a transaction']):
+            response = self.client.post('/submit_transaction', json=body, headers=self.headers)
+            self.assertEqual(response.status_code, 400, body)
+
+        api.write_behind.wait_for_user(self.username)
+        self.assertEqual(api.storage.get_transactions(self.username), [])
+        self.assertEqual(self.client.get('/dashboard_stats', headers=self.headers).status_code, 200)
+
+    def test_bad_batch_is_not_half_applied(self):
+        version = api.storage.get_data_version(self.username)
+        with self.assertRaises(ValueError):
+            api.apply_transactions(self.username, [
+                {'transaction_id': 'ok', 'category': 'groceries', 'amount': 10, 'timestamp': '2023-07-01T10:00:00'},
+                {'transaction_id': 'bad', 'category': 'groceries', 'amount': 'abc', 'timestamp': '2023-07-01T10:00:00'}
+            ])
+
+        self.assertEqual(api.storage.get_transactions(self.username), [])
+        self.assertEqual(api.storage.get_data_version(self.username), version)
+
+class TestIdempotentSubmit(ApiTestCase):
+    def test_retried_submit_is_not_double_counted(self):
+        tx = {'category': 'groceries', 'amount': 100, 'transaction_id': 'retry-1'}
+        first = self.client.post('/submit_transaction', json=dict(tx), headers=self.headers)
+        retry = self.client.post('/submit_transaction', json=dict(tx), headers=self.headers)
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json['duplicates'], ['retry-1'])
+        self.assertEqual(retry.json['transactions'], [])
+
+        api.write_behind.wait_for_user(self.username)
+        self.assertEqual(len(api.storage.get_transactions(self.username)), 1)
+        self.assertEqual(api.storage.get_profile(self.username)['Groceries'], 4100)
+
+    def test_partially_replayed_batch(self):
+        self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 100, 'transaction_id': 'a'},
+                         headers=self.headers)
+        response = self.client.post('/submit_transaction', json=[
+            {'category': 'groceries', 'amount': 100, 'transaction_id': 'a'},
+            {'category': 'groceries', 'amount': 50, 'transaction_id': 'b'},
+            {'category': 'groceries', 'amount': 50, 'transaction_id': 'b'}
+        ], headers=self.headers)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json['duplicates'], ['a', 'b'])
+        self.assertEqual([tx['transaction_id'] for tx in response.json['transactions']], ['b'])
+        api.write_behind.wait_for_user(self.username)
+        self.assertEqual(api.storage.get_profile(self.username)['Groceries'], 4150)
+
+    def test_replay_of_a_queued_write_is_caught_before_it_lands(self):
+        tx = {'category': 'groceries', 'amount': 100, 'transaction_id': 'queued-1'}
+        with api.storage.user_lock(self.username):
+            # The write-behind worker blocks on the lock, so the first submit stays queued
+            self.client.post('/submit_transaction', json=dict(tx), headers=self.headers)
+            retry = self.client.post('/submit_transaction', json=dict(tx), headers=self.headers)
+        self.assertEqual(retry.json['duplicates'], ['queued-1'])
+
+        api.write_behind.wait_for_user(self.username)
+        self.assertEqual(api.storage.get_profile(self.username)['Groceries'], 4100)
+
+class TestConcurrentSubmits(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # Switch threads far more often than the default 5ms so races surface
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+    def run_threads(self, target, count):
+        errors = []
+
+        def run(index):
+            try:
+                target(index)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_totals_after_concurrent_submits(self):
+        users = [f'{self.username}_{i}' for i in range(3)] + [self.username]
+        for user_id in users:
+            api.storage.save_profile(user_id, dict(TEST_PROFILE))
+        threads, per_thread = 8, 150
+        done = threading.Event()
+
+        def submit(index):
+            for i in range(per_thread):
+                api.apply_transactions(users[(index + i) % len(users)], [
+                    {'category': 'groceries', 'amount': 1, 'transaction_id': f'{index}-{i}',
+                     'timestamp': '2023-07-01T10:00:00'}
+                ])
+
+        def read(_):
+            # Readers never block and never see an update half-applied
+            while not done.is_set():
+                for user_id in users:
+                    profile = api.storage.get_profile(user_id)
+                    self.assertEqual(profile['Groceries'] + profile['Disposable_Income'], 24000)
+
+        readers = threading.Thread(target=self.run_threads, args=(read, 2))
+        readers.start()
+        self.run_threads(submit, threads)
+        done.set()
+        readers.join()
+
+        total = threads * per_thread
+        self.assertEqual(sum(api.storage.get_profile(u)['Groceries'] - 4000 for u in users), total)
+        self.assertEqual(sum(len(api.storage.get_transactions(u)) for u in users), total)
+        for user_id in users:
+            profile = api.storage.get_profile(user_id)
+            self.assertEqual(profile['Disposable_Income'], 20000 - (profile['Groceries'] - 4000))
+
+    def test_spending_window_reads_during_writes(self):
+        api.get_spending_window(self.username)  # Cached, so writes update it in place
+        writes = 600
+        done = threading.Event()
+
+        def write():
+            try:
+                for i in range(writes):
+                    timestamp = (datetime.now() - timedelta(days=i % 7)).isoformat()
+                    api.apply_transactions(self.username, [
+                        {'category': f'category_{i % 50}', 'amount': 1, 'transaction_id': f'window-{i}',
+                         'timestamp': timestamp}
+                    ])
+            finally:
+                done.set()
+
+        def read():
+            while not done.is_set():
+                totals = api.get_spending_window(self.username).category_totals()
+                self.assertLessEqual(sum(totals.values()), writes)
+
+        # One writer and three readers of the same cached window
+        self.run_threads(lambda index: write() if index == 0 else read(), 4)
+
+        self.assertEqual(api.get_spending_window(self.username).total(), writes)
+
+    def test_concurrent_submits_through_the_api(self):
+        threads, per_thread = 6, 40
+
+        def submit(index):
+            client = api.app.test_client()
+            for i in range(per_thread):
+                response = client.post('/submit_transaction', json={'category': 'groceries', 'amount': 2},
+                                       headers=self.headers)
+                self.assertEqual(response.status_code, 202)
+
+        self.run_threads(submit, threads)
+        api.write_behind.wait_for_user(self.username)
+
+        profile = api.storage.get_profile(self.username)
+        self.assertEqual(profile['Groceries'], 4000 + 2 * threads * per_thread)
+        self.assertEqual(profile['Disposable_Income'], 20000 - 2 * threads * per_thread)
+        self.assertGreater(api.storage.get_data_version(self.username), 1)
+
+class TestAlertStream(ApiTestCase):
+    def read_event(self, events):
+        lines = next(events).decode().strip().splitlines()
+        fields = dict(line.split(': ', 1) for line in lines)
+        return fields['event'], json.loads(fields['data'])
+
+    def test_threshold_crossings_are_pushed(self):
+        response = self.client.get('/stream_alerts', headers=self.headers, buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = iter(response.response)
+        try:
+            name, opening = self.read_event(events)
+            self.assertEqual((name, opening['alerts']), ('snapshot', []))
+
+            # Staying under every threshold pushes nothing
+            self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 1000}, headers=self.headers)
+            api.write_behind.wait_for_user(self.username)
+            self.assertTrue(api.alert_hub.has_subscribers(self.username))
+
+            self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 4500}, headers=self.headers)
+            name, event = self.read_event(events)
+            self.assertEqual(name, 'alerts')
+            self.assertEqual([alert['category'] for alert in event['alerts']], ['groceries'])
+            self.assertEqual(event['resolved'], [])
+            self.assertEqual(event['dashboard']['recent_spending'], 5500)
+            self.assertEqual(event['dashboard']['alert_count'], 1)
+
+            # Opting out clears the alerts
+            self.client.post('/opt_out', json={'opted_out': True}, headers=self.headers)
+            name, event = self.read_event(events)
+            self.assertEqual(event['resolved'], ['groceries'])
+        finally:
+            response.close()
+
+        self.assertFalse(api.alert_hub.has_subscribers(self.username))
+        self.assertNotIn(self.username, api.alert_states)
+
+    def test_open_streams_are_capped_per_process(self):
+        saved = api.sync_streams
+        api.sync_streams = threading.BoundedSemaphore(1)
+        try:
+            first = self.client.get('/stream_alerts', headers=self.headers, buffered=False)
+            second = self.client.get('/stream_alerts', headers=self.headers, buffered=False)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(second.status_code, 503)
+
+            first.close()
+            third = self.client.get('/stream_alerts', headers=self.headers, buffered=False)
+            self.assertEqual(third.status_code, 200)
+            third.close()
+        finally:
+            api.sync_streams = saved
+
+    def test_no_work_without_subscribers(self):
+        calls = []
+        original = api.compute_weekly_snapshot
+        api.compute_weekly_snapshot = lambda user_id: calls.append(user_id) or original(user_id)
+        try:
+            api.apply_transactions(self.username, [{'category': 'groceries', 'amount': 6000, 'transaction_id': 'x',
+                                                    'timestamp': datetime.now().isoformat()}])
+        finally:
+            api.compute_weekly_snapshot = original
+        self.assertEqual(calls, [])
+
+class TestConditionalGet(ApiTestCase):
+    def test_matching_etag_returns_304(self):
+        for route in ('/get_profile', '/dashboard_stats', '/get_alerts', '/get_suggestions'):
+            first = self.client.get(route, headers=self.headers)
+            etag = first.headers['ETag']
+
+            second = self.client.get(route, headers={**self.headers, 'If-None-Match': etag})
+            self.assertEqual(second.status_code, 304, route)
+            self.assertEqual(second.get_data(), b'')
+
+    def test_not_modified_skips_computation(self):
+        etag = self.client.get('/dashboard_stats', headers=self.headers).headers['ETag']
+
+        original = api.get_weekly_snapshot
+        api.get_weekly_snapshot = None  # Any recomputation would raise
+        try:
+            response = self.client.get('/dashboard_stats', headers={**self.headers, 'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+
+            # Without a validator the cached body is served, still without recomputing
+            response = self.client.get('/dashboard_stats', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+        finally:
+            api.get_weekly_snapshot = original
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/dashboard_stats', headers=self.headers).headers['ETag']
+
+        self.client.post('/submit_transaction', json={'category': 'transport', 'amount': 50}, headers=self.headers)
+        response = self.client.get('/dashboard_stats', headers={**self.headers, 'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.json['recent_spending'], 50)
+
+        etag = response.headers['ETag']
+        self.client.post('/opt_out', json={'opted_out': True}, headers=self.headers)
+        response = self.client.get('/get_alerts', headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 403)
+
+    def test_cached_bodies_are_bounded(self):
+        saved = api.response_cache
+        api.response_cache = LRUCache(maxsize=1)
+        try:
+            alerts = self.client.get('/get_alerts', headers=self.headers)
+            stats = self.client.get('/dashboard_stats', headers=self.headers)
+            self.assertEqual(len(api.response_cache), 1)
+
+            # The evicted body is recomputed, under the same ETag
+            again = self.client.get('/get_alerts', headers=self.headers)
+            self.assertEqual(again.json, alerts.json)
+            self.assertEqual(again.headers['ETag'], alerts.headers['ETag'])
+            self.assertEqual(stats.status_code, 200)
+        finally:
+            api.response_cache = saved
+
+class TestTransactionPages(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        api.storage.add_transactions(self.username, [
+            {'transaction_id': f'tx{i:02d}', 'timestamp': f'2023-07-{1 + i % 5:02d}T10:00:00',
+             'category': 'groceries', 'amount': i, 'description': 'shop'}
+            for i in range(25)
+        ])
+
+    def test_cursor_walks_every_transaction_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 10, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/get_transactions', query_string=params, headers=self.headers)
+            self.assertTrue(response.is_streamed)
+
+            page = json.loads(response.get_data())
+            self.assertLessEqual(len(page['transactions']), 10)
+            seen.extend(tx['transaction_id'] for tx in page['transactions'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(seen, sorted(seen, key=lambda tx_id: (int(tx_id[2:]) % 5, tx_id)))
+
+    def test_field_projection(self):
+        response = self.client.get('/get_transactions', query_string={'fields': 'amount,category,timestamp'},
+                                   headers=self.headers)
+        tx = json.loads(response.get_data())['transactions'][0]
+        self.assertEqual(set(tx), {'amount', 'category', 'timestamp'})
+
+    def test_invalid_parameters(self):
+        for params in ({'limit': 0}, {'limit': 'ten'}, {'cursor': 'not-a-cursor'}, {'start_date': 'yesterday'}):
+            response = self.client.get('/get_transactions', query_string=params, headers=self.headers)
+            self.assertEqual(response.status_code, 400, params)
+
+class TestSpendingRollups(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        api.storage.add_transactions(self.username, [
+            {'transaction_id': 'r1', 'timestamp': '2023-07-03T10:00:00', 'category': 'groceries', 'amount': 100},
+            {'transaction_id': 'r2', 'timestamp': '2023-07-05T10:00:00', 'category': 'transport', 'amount': 40},
+            {'transaction_id': 'r3', 'timestamp': '2023-07-12T10:00:00', 'category': 'groceries', 'amount': 25.5}
+        ])
+
+    def rollups(self, **params):
+        return self.client.get('/spending_rollups', query_string=params, headers=self.headers)
+
+    def test_weekly_buckets(self):
+        response = self.rollups(granularity='week', start_date='2023-07-01', end_date='2023-07-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['start_date'], '2023-06-26')
+        self.assertEqual(response.json['buckets'], [
+            {'start': '2023-07-03', 'total': 140.0, 'count': 2, 'categories': {'groceries': 100.0, 'transport': 40.0}},
+            {'start': '2023-07-10', 'total': 25.5, 'count': 1, 'categories': {'groceries': 25.5}}
+        ])
+
+    def test_category_filter_and_range(self):
+        response = self.rollups(granularity='day', start_date='2023-07-04', end_date='2023-07-31',
+                                categories='groceries')
+        self.assertEqual(response.json['buckets'],
+                         [{'start': '2023-07-12', 'total': 25.5, 'count': 1, 'categories': {'groceries': 25.5}}])
+
+    def test_submitted_transactions_are_counted(self):
+        self.client.post('/submit_transaction', headers=self.headers, json=[
+            {'transaction_id': 'r4', 'timestamp': '2023-07-20T10:00:00', 'category': 'groceries', 'amount': 10}
+        ])
+        response = self.rollups(granularity='month', start_date='2023-07-01', end_date='2023-07-31')
+        self.assertEqual(response.json['buckets'][0]['total'], 175.5)
+        self.assertEqual(response.json['buckets'][0]['count'], 4)
+
+    def test_invalid_parameters(self):
+        for params in ({'granularity': 'year'}, {'start_date': 'yesterday'},
+                       {'start_date': '2023-08-01', 'end_date': '2023-07-01'},
+                       {'start_date': '2000-01-01', 'end_date': '2023-07-01'}):
+            self.assertEqual(self.rollups(**params).status_code, 400, params)
+
+class TestPredictSavings(ApiTestCase):
+    class HalfOfSpend:
+        def predict(self, features):
+            return (features['groceries'] * 0.5).to_numpy()
+
+    def setUp(self):
+        super().setUp()
+        api.savings_model = SavingsModel({'groceries': self.HalfOfSpend()})
+
+    def test_scores_stored_profile(self):
+        response = self.client.post('/predict_savings', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'predicted_savings': {'groceries': 2000.0}, 'total_potential_savings': 2000.0})
+
+    def test_scores_batch(self):
+        response = self.client.post('/predict_savings', headers=self.headers,
+                                    json=[{'Groceries': 100}, {'Groceries': 300}])
+        self.assertEqual([p['predicted_savings']['groceries'] for p in response.json['predictions']], [50.0, 150.0])
+
+    def test_invalid_profiles(self):
+        for body in ([1, 2], {'Income': 'high'}, [{}] * (api.SAVINGS_MAX_BATCH + 1)):
+            response = self.client.post('/predict_savings', headers=self.headers, json=body)
+            self.assertEqual(response.status_code, 400)
+
+    def test_unavailable_without_models(self):
+        api.savings_model = SavingsModel({})
+        response = self.client.post('/predict_savings', headers=self.headers, json={'Groceries': 100})
+        self.assertEqual(response.status_code, 503)
+
+class TestBackgroundRescoring(ApiTestCase):
+    class HalfOfSpend:
+        def __init__(self):
+            self.rows_scored = []
+
+        def predict(self, features):
+            self.rows_scored.append(len(features))
+            return (features['groceries'] * 0.5).to_numpy()
+
+    def setUp(self):
+        super().setUp()
+        self.model = self.HalfOfSpend()
+        api.savings_model = SavingsModel({'groceries': self.model})
+
+        # A scheduler that never fires on its own, so the test decides when scoring runs
+        saved_rescorer = api.rescorer
+        api.rescorer = Rescorer(api.rescore_users, interval=3600)
+        self.addCleanup(setattr, api, 'rescorer', saved_rescorer)
+        self.addCleanup(api.rescorer.close)
+
+    def submit(self, amount):
+        response = self.client.post('/submit_transaction', headers=self.headers,
+                                    json={'category': 'groceries', 'amount': amount})
+        self.assertEqual(response.status_code, 202)
+
+    def test_submits_are_rescored_once(self):
+        for _ in range(20):
+            self.submit(10)
+        api.write_behind.wait_for_user(self.username)
+
+        # Spending is updated at once; the model's estimate waits for the rescorer
+        profile = api.storage.get_profile(self.username)
+        self.assertEqual(profile['Groceries'], 4200)
+        self.assertNotIn('Potential_Savings_Groceries', profile)
+        self.assertEqual(self.model.rows_scored, [])
+
+        version = api.storage.get_data_version(self.username)
+        api.rescorer.flush()
+        self.assertEqual(self.model.rows_scored, [1])
+        self.assertEqual(api.storage.get_profile(self.username)['Potential_Savings_Groceries'], 2100.0)
+        self.assertEqual(api.storage.get_data_version(self.username), version + 1)
+
+        suggestions = self.client.get('/get_suggestions', headers=self.headers).json
+        self.assertEqual(suggestions[0]['potential_savings'], 2100.0)
+
+    def test_malformed_profile_does_not_block_others(self):
+        other = f'{self.username}_other'
+        api.storage.save_profile(other, dict(TEST_PROFILE, Income='unknown'))
+        api.rescore_users([other, self.username])
+        self.assertEqual(api.storage.get_profile(self.username)['Potential_Savings_Groceries'], 2000.0)
+        self.assertNotIn('Potential_Savings_Groceries', api.storage.get_profile(other))
+
+class TestMetricsEndpoint(ApiTestCase):
+    def test_routes_and_jwt_are_instrumented(self):
+        before = api.request_count.value('/get_profile', 'GET', '200')
+        self.client.get('/get_profile', headers=self.headers)
+        self.client.get('/get_profile', headers={'Authorization': 'Bearer nope'})
+
+        self.assertEqual(api.request_count.value('/get_profile', 'GET', '200'), before + 1)
+        self.assertGreater(api.jwt_verify_latency.count('invalid'), 0)
+
+        response = self.client.get('/metrics')
+        text = response.get_data(as_text=True)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn('api_request_duration_seconds_bucket{route="/get_profile",le="+Inf"}', text)
+        self.assertIn('api_request_duration_seconds_quantile{route="/get_profile",quantile="0.99"}', text)
+        self.assertIn('api_response_size_bytes_count{route="/get_profile"}', text)
+        self.assertIn('jwt_verify_duration_seconds_count{result="valid"}', text)
+
+class TestProfileServiceLogging(unittest.TestCase):
+    def test_api_key_stays_out_of_failure_logs(self):
+        # The test endpoint refuses connections, so this logs the retries and the fallback
+        pool = ProfilePool(api.fetch_profile_batch, batch_size=5, low_water=0)
+        with self.assertLogs('src', level='WARNING') as logs:
+            pool.take()
+
+        self.assertTrue(logs.output)
+        for line in logs.output:
+            self.assertNotIn(api.MOCKAROO_API_KEY, line)
+
+class TestTokenCache(ApiTestCase):
+    def test_cached_token_skips_verification(self):
+        self.client.get('/get_profile', headers=self.headers)
+
+        original_decode = api.jwt.decode
+        api.jwt.decode = None  # Any verification attempt would raise
+        try:
+            response = self.client.get('/get_profile', headers=self.headers)
+        finally:
+            api.jwt.decode = original_decode
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_tampered_token_is_rejected_after_cache_hit(self):
+        self.client.get('/get_profile', headers=self.headers)
+        token = self.headers['Authorization'][7:]
+        tampered = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+
+        response = self.client.get('/get_profile', headers={'Authorization': f'Bearer {tampered}'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_token_is_not_served_from_cache(self):
+        token = jwt.encode({'user_id': self.username, 'exp': time.time() + 1}, api.JWT_SECRET, algorithm='HS256')
+        headers = {'Authorization': f'Bearer {token}'}
+        self.assertEqual(self.client.get('/get_profile', headers=headers).status_code, 200)
+
+        time.sleep(1.1)
+        self.assertEqual(self.client.get('/get_profile', headers=headers).status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
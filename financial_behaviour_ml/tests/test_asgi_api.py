@@ -0,0 +1,210 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault('TRANSACTION_LOG_DIR', tempfile.mkdtemp())
+os.environ.setdefault('MOCKAROO_ENDPOINT', 'http://127.0.0.1:9/profiles.json')
+
+import httpx
+from src import api, asgi_api
+from src.profile_pool import ProfilePool
+
+STUB_PROFILE = {
+    'Income': 40000, 'Rent': 10000, 'Groceries': 4000, 'Transport': 1000,
+    'Eating_Out': 1000, 'Entertainment': 500, 'Utilities': 1000, 'Healthcare': 500,
+    'Education': 0, 'Miscellaneous': 300, 'Desired_Savings_Percentage': 10
+}
+
+class TestAsgiApi(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.app_context = asgi_api.app.test_app()
+        await self.app_context.startup()
+
+        # Answer profile requests locally instead of calling Mockaroo
+        await asgi_api.http_client.aclose()
+        asgi_api.http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[dict(STUB_PROFILE)]))
+        )
+        self.client = asgi_api.app.test_client()
+
+        # An empty pool that doesn't refill itself, so profiles come through http_client
+        self.profile_pool = api.profile_pool
+        api.profile_pool = ProfilePool(lambda count: [], low_water=0, retry_interval=60)
+
+    async def asyncTearDown(self):
+        api.profile_pool = self.profile_pool
+        await self.app_context.shutdown()
+
+    async def serve_profiles(self, handler):
+        await asgi_api.http_client.aclose()
+        asgi_api.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def login(self, username):
+        response = await self.client.post('/auth/login', json={'username': username, 'password': 'secret'})
+        body = await response.get_json()
+        return body, {'Authorization': f"Bearer {body['token']}"}
+
+    async def test_login_generates_profile(self):
+        body, _ = await self.login('asgi_new_user')
+        self.assertEqual(body['profile']['Disposable_Income'], 21700)
+
+    async def test_concurrent_logins_share_one_batch_fetch(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=[dict(STUB_PROFILE, Age=age) for age in range(20)])
+        await self.serve_profiles(handler)
+
+        profiles = await asyncio.gather(*(asgi_api.fetch_profile_data() for _ in range(10)))
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(sorted(p['Age'] for p in profiles), list(range(10)))
+
+    async def test_recent_failure_skips_the_profile_service(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.05)
+            raise httpx.ConnectError("service down")
+        await self.serve_profiles(handler)
+
+        profiles = await asyncio.gather(*(asgi_api.fetch_profile_data() for _ in range(10)))
+        self.assertEqual(len(requests), 1)
+        self.assertTrue(all('Income' in p for p in profiles))
+
+        # Later logins go straight to the synthetic generator
+        await asgi_api.fetch_profile_data()
+        self.assertEqual(len(requests), 1)
+
+    async def test_routes_share_state_with_flask_app(self):
+        _, headers = await self.login('asgi_shared_user')
+
+        response = await self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 6000},
+                                          headers=headers)
+        self.assertEqual(response.status_code, 202)
+
+        response = await self.client.get('/get_alerts', headers=headers)
+        alerts = await response.get_json()
+        self.assertIn('groceries', [a['category'] for a in alerts])
+
+        flask_client = api.app.test_client()
+        stats = flask_client.get('/dashboard_stats', headers=headers).json
+        self.assertEqual(stats['recent_spending'], 6000)
+
+    async def test_bulk_ingest(self):
+        _, headers = await self.login('asgi_bulk_user')
+        body = b'{"category": "transport", "amount": 10}\n{"category": "transport", "amount": 20}\nbad'
+
+        response = await self.client.post('/bulk_transactions', data=body, headers=headers)
+        result = await response.get_json()
+
+        self.assertEqual(result['accepted'], 2)
+        self.assertEqual(result['rejected'], 1)
+
+    async def test_bulk_body_over_quart_default_limit(self):
+        _, headers = await self.login('asgi_large_bulk_user')
+        # Rows padded with whitespace so the body passes 16 MB without 270k rows to apply
+        row = b'{"category": "transport", "amount": 10}' + b' ' * (1 << 20) + b'\n'
+        body = row * 17
+        self.assertGreater(len(body), asgi_api.app.config['MAX_CONTENT_LENGTH'])
+
+        response = await self.client.post('/bulk_transactions', data=body, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await response.get_json())['accepted'], 17)
+
+        # Other routes keep the default limit
+        response = await self.client.post('/submit_transaction', data=body,
+                                          headers=dict(headers, **{'Content-Type': 'application/json'}))
+        self.assertEqual(response.status_code, 413)
+
+    async def test_transactions_are_paginated(self):
+        _, headers = await self.login('asgi_page_user')
+        for amount in (10, 20, 30):
+            await self.client.post('/submit_transaction', json={'category': 'transport', 'amount': amount},
+                                   headers=headers)
+
+        response = await self.client.get('/get_transactions', query_string={'limit': 2, 'fields': 'amount'},
+                                         headers=headers)
+        page = await response.get_json()
+        self.assertEqual(len(page['transactions']), 2)
+        self.assertEqual(set(page['transactions'][0]), {'amount'})
+
+        response = await self.client.get('/get_transactions', query_string={'cursor': page['next_cursor']},
+                                         headers=headers)
+        page = await response.get_json()
+        self.assertEqual(len(page['transactions']), 1)
+        self.assertIsNone(page['next_cursor'])
+
+    async def test_conditional_get(self):
+        _, headers = await self.login('asgi_etag_user')
+
+        response = await self.client.get('/dashboard_stats', headers=headers)
+        etag = response.headers['ETag']
+
+        response = await self.client.get('/dashboard_stats', headers={**headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_blocked_write_does_not_stall_the_loop(self):
+        _, headers = await self.login('asgi_blocked_user')
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_user_lock():
+            with api.storage.user_lock('asgi_blocked_user'):
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_user_lock)
+        holder.start()
+        locked.wait(5)
+        try:
+            write = asyncio.ensure_future(self.client.post('/opt_out', json={'opted_out': True}, headers=headers))
+            start = time.perf_counter()
+            await asyncio.sleep(0.05)
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertFalse(write.done())
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual((await write).status_code, 200)
+
+    async def test_waiting_for_queued_writes_does_not_stall_other_users(self):
+        _, slow_headers = await self.login('asgi_slow_writer')
+        _, headers = await self.login('asgi_bystander')
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_user_lock():
+            with api.storage.user_lock('asgi_slow_writer'):
+                locked.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_user_lock)
+        holder.start()
+        locked.wait(5)
+        try:
+            # The queued write can't apply until the lock is released, so this read waits for it
+            await self.client.post('/submit_transaction', json={'category': 'groceries', 'amount': 10},
+                                   headers=slow_headers)
+            slow_read = asyncio.ensure_future(self.client.get('/dashboard_stats', headers=slow_headers))
+            await asyncio.sleep(0.05)
+
+            start = time.perf_counter()
+            response = await self.client.get('/dashboard_stats', headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertLess(time.perf_counter() - start, 1)
+            self.assertFalse(slow_read.done())
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual((await slow_read).status_code, 200)
+
+    async def test_invalid_token(self):
+        response = await self.client.get('/get_profile', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(response.status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import pandas as pd
 from src.expense_categorizer import ExpenseCategorizer
 
 class TestExpenseCategorizer(unittest.TestCase):
@@ -32,5 +33,39 @@ class TestExpenseCategorizer(unittest.TestCase):
         self.assertEqual(analysis['wants_total'], 5500)
         self.assertTrue(analysis['transactions'][2]['high_risk'])  # 3000 > 10% of 20000
 
+    def test_batch_matches_per_transaction_analysis(self):
+        user_data = {'disposable_income': 20000}
+        transactions = [
+            {'category': 'Rent', 'amount': 10000},
+            {'category': 'eating_out', 'amount': 2500},
+            {'category': 'entertainment', 'amount': 1500},
+            {'category': 'unknown', 'amount': 600},
+            {'category': 'unknown', 'amount': 100}
+        ]
+
+        expected = ExpenseCategorizer.analyze_spending(user_data, transactions)
+        batch = ExpenseCategorizer.analyze_spending_batch(user_data, pd.DataFrame(transactions))
+
+        self.assertEqual(batch['needs_total'], expected['needs_total'])
+        self.assertEqual(batch['wants_total'], expected['wants_total'])
+        self.assertEqual(list(batch['transactions']['type']), [tx['type'] for tx in expected['transactions']])
+        self.assertEqual(list(batch['transactions']['high_risk']),
+                         [tx['high_risk'] for tx in expected['transactions']])
+
+    def test_analysis_by_user(self):
+        transactions = {
+            'user_id': ['a', 'b', 'a', 'b', 'c'],
+            'category': ['rent', 'eating_out', 'entertainment', 'groceries', 'eating_out'],
+            'amount': [10000, 3000, 500, 2000, 100]
+        }
+
+        summary = ExpenseCategorizer.analyze_spending_by_user(transactions, {'a': 20000, 'b': 10000})
+
+        self.assertEqual(summary.loc['a', 'needs_total'], 10000)
+        self.assertEqual(summary.loc['a', 'wants_total'], 500)
+        self.assertEqual(summary.loc['a', 'high_risk_count'], 0)
+        self.assertEqual(summary.loc['b', 'high_risk_count'], 1)  # 3000 > 10% of 10000
+        self.assertEqual(summary.loc['c', 'high_risk_count'], 0)  # No known income
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
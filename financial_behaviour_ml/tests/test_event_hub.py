@@ -0,0 +1,42 @@
+import asyncio
+import json
+import threading
+import unittest
+from src.event_hub import AsyncSubscription, EventHub, Subscription, format_event
+
+class TestEventHub(unittest.TestCase):
+    def test_publish_reaches_only_that_users_subscribers(self):
+        hub = EventHub()
+        alice, bob = hub.subscribe(Subscription('alice')), hub.subscribe(Subscription('bob'))
+
+        self.assertEqual(hub.publish('alice', {'n': 1}), 1)
+        self.assertEqual(alice.get(timeout=1), {'n': 1})
+        self.assertIsNone(bob.get(timeout=0.01))
+
+        hub.unsubscribe(alice)
+        self.assertFalse(hub.has_subscribers('alice'))
+        self.assertEqual(hub.publish('alice', {'n': 2}), 0)
+
+    def test_slow_subscriber_drops_oldest_events(self):
+        subscription = Subscription('alice', maxsize=2)
+        for n in range(5):
+            subscription.deliver(n)
+        self.assertEqual([subscription.get(timeout=1), subscription.get(timeout=1)], [3, 4])
+
+    def test_async_subscription_receives_events_from_other_threads(self):
+        hub = EventHub()
+
+        async def run():
+            subscription = hub.subscribe(AsyncSubscription('alice'))
+            threading.Thread(target=hub.publish, args=('alice', {'n': 1})).start()
+            return await subscription.get(timeout=5), await subscription.get(timeout=0.01)
+
+        self.assertEqual(asyncio.run(run()), ({'n': 1}, None))
+
+    def test_format_event(self):
+        text = format_event('alerts', {'a': 1}, 7)
+        self.assertEqual(text, 'event: alerts\nid: 7\ndata: {"a": 1}\n\n')
+        self.assertEqual(json.loads(text.splitlines()[2][len('data: '):]), {'a': 1})
+
+if __name__ == '__main__':
+    unittest.main()
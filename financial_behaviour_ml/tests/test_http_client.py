@@ -0,0 +1,84 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from src.http_client import HttpClient
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    connections = set()
+
+    def do_GET(self):
+        StubHandler.connections.add(self.client_address)
+        status = StubHandler.statuses.pop(0) if StubHandler.statuses else 200
+        body = b'[]'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestHttpClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/profiles.json"
+        cls.host = f"127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubHandler.statuses = []
+        StubHandler.connections = set()
+        self.client = HttpClient(retries=2, backoff=0.01)
+
+    def test_reuses_connection(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertEqual(len(StubHandler.connections), 1)
+        self.assertEqual(self.client.stats()[self.host]['calls'], 5)
+
+    def test_retries_transient_status(self):
+        StubHandler.statuses = [503, 503]
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        stats = self.client.stats()[self.host]
+        self.assertEqual(stats['calls'], 3)
+        self.assertEqual(stats['errors'], 2)
+
+    def test_returns_last_response_when_retries_run_out(self):
+        StubHandler.statuses = [503, 503, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 503)
+
+    def test_does_not_retry_client_errors(self):
+        StubHandler.statuses = [404]
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.stats()[self.host]['calls'], 1)
+
+    def test_connection_error_raised_after_retries(self):
+        client = HttpClient(timeout=0.5, retries=1, backoff=0.01)
+        with self.assertRaises(requests.ConnectionError):
+            client.get('http://127.0.0.1:9/profiles.json')
+        self.assertEqual(client.stats()['127.0.0.1:9']['errors'], 2)
+
+    def test_backoff_is_jittered_and_capped(self):
+        client = HttpClient(backoff=1.0, max_backoff=3.0)
+        delays = [client.backoff_delay(5) for _ in range(100)]
+
+        self.assertTrue(all(0 <= d <= 3.0 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
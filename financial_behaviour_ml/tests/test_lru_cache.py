@@ -0,0 +1,38 @@
+import unittest
+from src.lru_cache import LRUCache
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        cache['c'] = 3
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_replacing_an_entry_does_not_grow_the_cache(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        cache['a'] = 2
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get('a'), 2)
+
+    def test_pop_and_default(self):
+        cache = LRUCache(maxsize=2)
+        cache['a'] = 1
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.get('a', 'missing'), 'missing')
+        self.assertIsNone(cache.pop('a'))
+
+    def test_zero_size_disables(self):
+        cache = LRUCache(maxsize=0)
+        cache['a'] = 1
+        self.assertEqual(len(cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
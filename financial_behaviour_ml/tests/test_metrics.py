@@ -0,0 +1,44 @@
+import unittest
+from src.metrics import Registry
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_exposition(self):
+        requests = self.registry.counter('requests_total', 'Requests', ('route',))
+        requests.inc('/a')
+        requests.inc('/a')
+        requests.inc('/b "quoted"')
+
+        text = self.registry.render()
+        self.assertIn('# TYPE requests_total counter', text)
+        self.assertIn('requests_total{route="/a"} 2', text)
+        self.assertIn('requests_total{route="/b \\"quoted\\""} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.observe(value, '/a')
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{route="/a"} 6.05', text)
+        self.assertIn('latency_seconds_count{route="/a"} 4', text)
+        self.assertIn('latency_seconds_quantile{route="/a",quantile="0.5"}', text)
+
+    def test_quantile_estimates(self):
+        latency = self.registry.histogram('latency_seconds', 'Latency', buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            latency.observe(0.005)
+        for _ in range(10):
+            latency.observe(0.5)
+
+        self.assertLessEqual(latency.quantile(0.5), 0.01)
+        self.assertGreater(latency.quantile(0.99), 0.1)
+        self.assertIsNone(latency.quantile(0.5, 'unknown'))
+
+if __name__ == '__main__':
+    unittest.main()
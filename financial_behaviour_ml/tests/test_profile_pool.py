@@ -0,0 +1,60 @@
+import threading
+import unittest
+from src.profile_pool import ProfilePool, generate_synthetic_profile
+
+class TestProfilePool(unittest.TestCase):
+    def test_one_round_trip_serves_a_batch(self):
+        calls = []
+
+        def fetch_batch(count):
+            calls.append(count)
+            return [{'Income': i} for i in range(count)]
+
+        pool = ProfilePool(fetch_batch, batch_size=20, low_water=0)
+        incomes = [pool.take()['Income'] for _ in range(20)]
+
+        self.assertEqual(incomes, list(range(20)))
+        self.assertEqual(calls, [20])
+
+    def test_background_refill_below_low_water(self):
+        refilled = threading.Event()
+
+        def fetch_batch(count):
+            refilled.set()
+            return [{'Income': 1}] * count
+
+        pool = ProfilePool(fetch_batch, batch_size=5, low_water=3)
+        pool.add([{'Income': 0}] * 3)
+
+        pool.take()  # Leaves 2, below the low-water mark
+        self.assertTrue(refilled.wait(timeout=5))
+
+    def test_falls_back_to_synthetic_profiles(self):
+        calls = []
+
+        def fetch_batch(count):
+            calls.append(count)
+            raise ConnectionError("service down")
+
+        pool = ProfilePool(fetch_batch, batch_size=5, low_water=0, retry_interval=60)
+        first = pool.take()
+        second = pool.take()
+
+        self.assertIn('Income', first)
+        self.assertIn('Desired_Savings_Percentage', second)
+        self.assertEqual(len(calls), 1)  # No retry until retry_interval passes
+
+    def test_non_blocking_take_on_empty_pool(self):
+        pool = ProfilePool(lambda count: [], low_water=0)
+        self.assertIsNone(pool.take(block=False))
+
+    def test_synthetic_profile_expenses_below_income(self):
+        for _ in range(50):
+            profile = generate_synthetic_profile()
+            expenses = sum(v for k, v in profile.items()
+                           if k not in ('Income', 'Age', 'Dependents', 'Occupation', 'City_Tier',
+                                        'Desired_Savings_Percentage'))
+            self.assertLess(expenses, profile['Income'])
+
+if __name__ == '__main__':
+    unittest.main()
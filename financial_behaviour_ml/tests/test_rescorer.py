@@ -0,0 +1,54 @@
+import threading
+import unittest
+from src.rescorer import Rescorer
+
+class TestRescorer(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.rescorer = Rescorer(self.batches.append, interval=60, max_batch=2)
+
+    def tearDown(self):
+        self.rescorer.close()
+
+    def test_hot_user_scored_once_per_run(self):
+        for _ in range(100):
+            self.rescorer.mark('alice')
+        self.rescorer.mark('bob')
+        self.rescorer.flush()
+        self.assertEqual(self.batches, [['alice', 'bob']])
+
+        self.rescorer.flush()
+        self.assertEqual(len(self.batches), 1)
+
+    def test_batches_are_capped(self):
+        for user_id in ['a', 'b', 'c']:
+            self.rescorer.mark(user_id)
+        self.rescorer.flush()
+        self.assertEqual(self.batches, [['a', 'b'], ['c']])
+
+    def test_failing_batch_does_not_stop_the_rest(self):
+        def score(batch):
+            if 'bad' in batch:
+                raise RuntimeError("model failed")
+            self.batches.append(batch)
+
+        self.rescorer.score_batch = score
+        for user_id in ['bad', 'x', 'alice']:
+            self.rescorer.mark(user_id)
+        self.rescorer.flush()
+        self.assertEqual(self.batches, [['alice']])
+
+    def test_close_scores_remaining_users(self):
+        self.rescorer.mark('alice')
+        self.rescorer.close()
+        self.assertEqual(self.batches, [['alice']])
+
+    def test_scheduler_runs_every_interval(self):
+        scored = threading.Event()
+        rescorer = Rescorer(lambda batch: scored.set(), interval=0.05)
+        rescorer.mark('alice')
+        self.assertTrue(scored.wait(5))
+        rescorer.close()
+
+if __name__ == '__main__':
+    unittest.main()
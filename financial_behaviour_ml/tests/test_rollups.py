@@ -0,0 +1,59 @@
+import unittest
+from datetime import date
+from src.rollups import UserRollups, bucket_of, bucket_start
+from src.timestamps import normalize_transaction
+
+def tx(timestamp, category, amount):
+    return normalize_transaction({'timestamp': timestamp, 'category': category, 'amount': amount})
+
+class TestBuckets(unittest.TestCase):
+    def test_bucket_starts(self):
+        day = date(2023, 7, 5).toordinal()  # A Wednesday
+        self.assertEqual(bucket_start(bucket_of(day, 'day'), 'day'), date(2023, 7, 5))
+        self.assertEqual(bucket_start(bucket_of(day, 'week'), 'week'), date(2023, 7, 3))
+        self.assertEqual(bucket_start(bucket_of(day, 'month'), 'month'), date(2023, 7, 1))
+
+    def test_weeks_start_on_monday(self):
+        for offset in range(7):
+            monday = date(2023, 7, 3).toordinal()
+            self.assertEqual(bucket_of(monday + offset, 'week'), monday)
+
+    def test_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            bucket_of(1, 'year')
+
+class TestUserRollups(unittest.TestCase):
+    def setUp(self):
+        self.rollups = UserRollups()
+        self.rollups.add_all([
+            tx('2023-07-31T09:00:00', 'groceries', 100),
+            tx('2023-08-01T09:00:00', 'groceries', 50),
+            tx('2023-08-01T18:00:00', 'transport', 20)
+        ])
+
+    def test_incremental_totals(self):
+        self.rollups.add_all([tx('2023-08-01T20:00:00', 'groceries', 5)])
+        day = date(2023, 8, 1).toordinal()
+        self.assertEqual(self.rollups.query('day', day, day),
+                         [(day, 'groceries', 55.0, 2), (day, 'transport', 20.0, 1)])
+
+    def test_buckets_by_granularity(self):
+        week = self.rollups.query('week')
+        self.assertEqual({row[0] for row in week}, {date(2023, 7, 31).toordinal()})
+        self.assertIn((date(2023, 7, 31).toordinal(), 'groceries', 150.0, 2), week)
+
+        months = self.rollups.query('month')
+        self.assertEqual([(bucket_start(row[0], 'month'), row[1], row[2]) for row in months], [
+            (date(2023, 7, 1), 'groceries', 100.0),
+            (date(2023, 8, 1), 'groceries', 50.0),
+            (date(2023, 8, 1), 'transport', 20.0)
+        ])
+
+    def test_range_is_inclusive(self):
+        july_31, aug_1 = date(2023, 7, 31).toordinal(), date(2023, 8, 1).toordinal()
+        self.assertEqual([row[0] for row in self.rollups.query('day', july_31, july_31)], [july_31])
+        self.assertEqual(len(self.rollups.query('day', aug_1)), 2)
+        self.assertEqual(self.rollups.query('day', aug_1 + 1), [])
+
+if __name__ == '__main__':
+    unittest.main()
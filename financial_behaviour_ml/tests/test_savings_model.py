@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import sklearn
+
+import config
+from src.savings_model import SavingsModel, SAVINGS_CATEGORIES, feature_frame
+
+PROFILE = {
+    'Income': 40000, 'Age': 30, 'Dependents': 1, 'Occupation': 'Professional', 'City_Tier': 'Tier_1',
+    'Rent': 10000, 'Loan_Repayment': 0, 'Insurance': 500, 'Groceries': 4000, 'Transport': 1000,
+    'Eating_Out': 1000, 'Entertainment': 500, 'Utilities': 1000, 'Healthcare': 500, 'Education': 0,
+    'Miscellaneous': 300
+}
+
+class ShareOfSpend:
+    """Stands in for a trained pipeline: predicts a fixed share of one category's spend"""
+
+    def __init__(self, category, share):
+        self.category = category
+        self.share = share
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        return (features[self.category] * self.share).to_numpy()
+
+class TestFeatureFrame(unittest.TestCase):
+    def test_derived_features(self):
+        df = feature_frame([PROFILE])
+        self.assertEqual(df['total_expenses'][0], 18800)
+        self.assertEqual(df['total_wants'][0], 1800)
+        self.assertEqual(df['savings_amount'][0], 21200)
+        self.assertAlmostEqual(df['groceries_ratio'][0], 4000 / 18800)
+        self.assertEqual(df['occupation'][0], 'Professional')
+
+    def test_zero_income_and_spend(self):
+        df = feature_frame([{'Income': 0}])
+        self.assertEqual(df['savings_rate'][0], 0)
+        self.assertEqual(df['groceries_ratio'][0], 0)
+
+    def test_non_numeric_amount(self):
+        with self.assertRaises(ValueError):
+            feature_frame([dict(PROFILE, Groceries='lots')])
+
+class TestSavingsModel(unittest.TestCase):
+    def test_batch_is_one_predict_per_model(self):
+        groceries = ShareOfSpend('groceries', 0.25)
+        model = SavingsModel({'groceries': groceries, 'transport': ShareOfSpend('transport', -0.1)})
+
+        predictions = model.predict([PROFILE, dict(PROFILE, Groceries=2000)])
+        self.assertEqual(predictions, [{'groceries': 1000.0, 'transport': 0.0},
+                                       {'groceries': 500.0, 'transport': 0.0}])
+        self.assertEqual(groceries.calls, 1)
+
+    def test_missing_models_are_not_ready(self):
+        model = SavingsModel.load(tempfile.mkdtemp(), os.path.join(os.path.dirname(__file__), '..', '..',
+                                                                  'financial_behavior_ml2'))
+        self.assertFalse(model.ready)
+
+# The ml2 pipelines are pickles; they only load with the release they were saved with
+@unittest.skipUnless(sklearn.__version__.startswith('1.6.'),
+                     f"models were saved with scikit-learn 1.6 (requirements.txt pin), found {sklearn.__version__}")
+class TestTrainedModels(unittest.TestCase):
+    def test_load_and_score_one_profile(self):
+        model = SavingsModel.load(config.SAVINGS_MODEL_DIR, config.ML2_DIR)
+        self.assertTrue(model.ready)
+        self.assertEqual(sorted(model.models), sorted(SAVINGS_CATEGORIES))
+
+        [prediction] = model.predict([PROFILE])
+        self.assertEqual(sorted(prediction), sorted(SAVINGS_CATEGORIES))
+        for value in prediction.values():
+            self.assertIsInstance(value, float)
+            self.assertGreaterEqual(value, 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import threading
+import unittest
+from src.sharded import ShardedDict, shard_of
+
+class TestShardedDict(unittest.TestCase):
+    def test_dict_operations(self):
+        store = ShardedDict(shards=4)
+        store.set('alice', 1)
+        self.assertEqual(store.get('alice'), 1)
+        self.assertIsNone(store.get('bob'))
+        self.assertEqual(store.setdefault('bob', []), [])
+        self.assertEqual(store.setdefault('alice', 5), 1)
+        self.assertIn('bob', store)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(sorted(map(str, store.values())), ['1', '[]'])
+
+    def test_shards_are_stable(self):
+        self.assertEqual(shard_of('alice', 64), shard_of('alice', 64))
+        self.assertLess(shard_of(12345, 7), 7)
+
+    def test_concurrent_updates_are_not_lost(self):
+        store = ShardedDict(shards=8)
+        keys = [f'user_{i}' for i in range(5)]
+
+        def work():
+            for _ in range(2000):
+                for key in keys:
+                    store.update(key, lambda value: value + 1, 0)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([store.get(key) for key in keys], [16000] * 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+from src.storage import SQLiteStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import the app once (like gunicorn --preload),
+# then fork workers that all log in as the same new user and submit
+# transactions against it concurrently
+PREFORKED_WORKERS = textwrap.dedent("""
+    import json, multiprocessing, os, sys, time
+    from src import api
+
+    workers, per_worker = int(sys.argv[1]), int(sys.argv[2])
+    api.profile_pool.synthetic = lambda: {'Income': 40000, 'Groceries': 4000, 'Desired_Savings_Percentage': 10}
+    ctx = multiprocessing.get_context('fork')
+    barrier = ctx.Barrier(workers + 1)
+
+    def work():
+        client = api.app.test_client()
+        login = {'username': 'shared_user', 'password': 'secret'}
+        response = client.post('/auth/login', json=login)
+        ok = response.status_code == 200
+        headers = {'Authorization': f"Bearer {response.json.get('token')}"}
+        barrier.wait()
+        for _ in range(per_worker):
+            response = client.post('/submit_transaction', json={'category': 'groceries', 'amount': 1},
+                                   headers=headers)
+            ok = ok and response.status_code == 202
+        api.write_behind.flush()
+        barrier.wait()
+        os._exit(0 if ok else 1)
+
+    processes = [ctx.Process(target=work) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    barrier.wait()  # Everyone has logged in
+    start = time.perf_counter()
+    barrier.wait()  # Everyone has finished submitting
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+    print(json.dumps({'elapsed': elapsed, 'exit_codes': [p.exitcode for p in processes]}))
+""")
+
+class TestMultiProcessSharedState(unittest.TestCase):
+    def run_workers(self, workers, per_worker):
+        directory = tempfile.mkdtemp()
+        db_path = os.path.join(directory, 'financial.db')
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            STORAGE_BACKEND='sqlite',
+            SQLITE_PATH=db_path,
+            TRANSACTION_LOG_DIR=os.path.join(directory, 'log'),
+            MOCKAROO_ENDPOINT='http://127.0.0.1:9/profiles.json'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', PREFORKED_WORKERS, str(workers), str(per_worker)],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(report['exit_codes'], [0] * workers)
+        return SQLiteStorage(db_path), report['elapsed']
+
+    def test_workers_agree_and_lose_no_updates(self):
+        workers, per_worker = 4, 50
+        storage, _ = self.run_workers(workers, per_worker)
+        total = workers * per_worker
+
+        # Exactly one worker created the user and its profile
+        self.assertEqual(storage.count_users(), 1)
+        self.assertEqual(len(storage.get_transactions('shared_user')), total)
+
+        # Every profile read-modify-write was applied; queued submits coalesce,
+        # so there is one version bump per applied batch rather than per submit
+        profile = storage.get_profile('shared_user')
+        self.assertEqual(profile['Groceries'], 4000 + total)
+        self.assertEqual(profile['Disposable_Income'], 36000 - total)
+        self.assertGreater(storage.get_data_version('shared_user'), 1)
+        self.assertLessEqual(storage.get_data_version('shared_user'), 1 + total)
+
+    def test_throughput_across_workers(self):
+        per_worker = 50
+        for workers in (1, 4):
+            _, elapsed = self.run_workers(workers, per_worker)
+            print(f"\n{workers} worker(s): {workers * per_worker / elapsed:.0f} submits/s")
+
+if __name__ == '__main__':
+    unittest.main()
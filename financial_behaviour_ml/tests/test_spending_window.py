@@ -0,0 +1,29 @@
+import unittest
+from datetime import date
+from src.spending_window import SpendingWindow
+
+class TestSpendingWindow(unittest.TestCase):
+    def setUp(self):
+        self.today = date(2023, 7, 10)
+        self.window = SpendingWindow(days=7)
+        self.window.add_all([
+            {'category': 'groceries', 'amount': 100, 'timestamp': '2023-07-04T09:00:00'},
+            {'category': 'groceries', 'amount': 50, 'timestamp': '2023-07-10T09:00:00'},
+            {'category': 'transport', 'amount': '20', 'timestamp': '2023-07-08T09:00:00'},
+            {'category': 'eating_out', 'amount': 999, 'timestamp': '2023-07-01T09:00:00'}  # Already outside the window
+        ], today=self.today)
+
+    def test_category_totals(self):
+        totals = self.window.category_totals(today=self.today)
+        self.assertEqual(totals, {'groceries': 150, 'transport': 20})
+        self.assertEqual(self.window.total(today=self.today), 170)
+
+    def test_old_days_expire(self):
+        totals = self.window.category_totals(today=date(2023, 7, 11))
+        self.assertEqual(totals, {'groceries': 50, 'transport': 20})
+
+        totals = self.window.category_totals(today=date(2023, 7, 20))
+        self.assertEqual(totals, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime
+from src.storage import MemoryStorage, SQLiteStorage
+
+class StorageContract:
+    """Tests every storage backend must pass"""
+
+    def create_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.create_storage()
+
+    def test_users(self):
+        self.assertIsNone(self.storage.get_user('alice'))
+        self.storage.add_user('alice', {'password': 'x', 'user_id': '1'})
+        self.assertEqual(self.storage.get_user('alice')['user_id'], '1')
+        self.assertEqual(self.storage.count_users(), 1)
+
+    def test_profiles(self):
+        self.assertIsNone(self.storage.get_profile('alice'))
+        self.storage.save_profile('alice', {'Income': 50000})
+        profile = self.storage.get_profile('alice')
+        profile['Income'] = 60000
+        self.storage.save_profile('alice', profile)
+        self.assertEqual(self.storage.get_profile('alice')['Income'], 60000)
+
+    def test_transactions_range(self):
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'b', 'timestamp': '2023-07-03T10:00:00', 'amount': 200},
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 100}
+        ])
+        self.storage.add_transactions('bob', [
+            {'transaction_id': 'c', 'timestamp': '2023-07-02T10:00:00', 'amount': 300}
+        ])
+
+        all_txs = self.storage.get_transactions('alice')
+        self.assertEqual([tx['transaction_id'] for tx in all_txs], ['a', 'b'])
+
+        recent = self.storage.get_transactions('alice', start=datetime(2023, 7, 2))
+        self.assertEqual([tx['transaction_id'] for tx in recent], ['b'])
+        self.assertEqual(self.storage.get_transactions('carol'), [])
+
+    def test_page_transactions_with_cursor(self):
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'c', 'timestamp': '2023-07-01T10:00:00', 'amount': 3},
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 1},
+            {'transaction_id': 'b', 'timestamp': '2023-07-01T10:00:00', 'amount': 2},
+            {'transaction_id': 'd', 'timestamp': '2023-07-02T10:00:00', 'amount': 4}
+        ])
+
+        first = self.storage.page_transactions('alice', limit=2)
+        self.assertEqual([tx['transaction_id'] for tx in first], ['a', 'b'])
+
+        rest = self.storage.page_transactions('alice', after=('2023-07-01T10:00:00', 'b'), limit=5)
+        self.assertEqual([tx['transaction_id'] for tx in rest], ['c', 'd'])
+
+        bounded = self.storage.page_transactions('alice', end=datetime(2023, 7, 1, 12), limit=5)
+        self.assertEqual(len(bounded), 3)
+
+    def test_bad_timestamp_rejects_batch(self):
+        with self.assertRaises(ValueError):
+            self.storage.add_transactions('alice', [
+                {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 100},
+                {'transaction_id': 'b', 'timestamp': 'yesterday', 'amount': 100}
+            ])
+        self.assertEqual(self.storage.get_transactions('alice'), [])
+
+    def test_existing_transaction_ids(self):
+        tx_id = '6f1c2b8e-3d4a-4f5b-9c6d-7e8f9a0b1c2d'
+        self.storage.add_transactions('alice', [
+            {'transaction_id': tx_id, 'timestamp': '2023-07-01T10:00:00', 'amount': 100},
+            {'transaction_id': 7, 'timestamp': '2023-07-01T11:00:00', 'amount': 100}
+        ])
+
+        found = self.storage.existing_transaction_ids('alice', [tx_id, '7', 'new', tx_id.upper()])
+        self.assertEqual(found, {tx_id, '7'})
+        self.assertEqual(self.storage.existing_transaction_ids('bob', [tx_id]), set())
+
+    def test_rollups(self):
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'category': 'groceries', 'amount': 100},
+            {'transaction_id': 'b', 'timestamp': '2023-07-01T18:00:00', 'category': 'groceries', 'amount': 50}
+        ])
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'c', 'timestamp': '2023-07-20T10:00:00', 'category': 'transport', 'amount': 30}
+        ])
+
+        july_1 = date(2023, 7, 1).toordinal()
+        self.assertEqual(self.storage.get_rollups('alice', 'day', july_1, july_1),
+                         [(july_1, 'groceries', 150.0, 2)])
+        self.assertEqual(self.storage.get_rollups('alice', 'month'),
+                         [(2023 * 12 + 6, 'groceries', 150.0, 2), (2023 * 12 + 6, 'transport', 30.0, 1)])
+        self.assertEqual(len(self.storage.get_rollups('alice', 'week')), 2)
+        self.assertEqual(self.storage.get_rollups('bob', 'day'), [])
+
+    def test_data_versions(self):
+        self.assertEqual(self.storage.get_data_version('alice'), 0)
+        self.assertEqual(self.storage.bump_data_version('alice'), 1)
+        self.assertEqual(self.storage.bump_data_version('alice'), 2)
+        self.assertEqual(self.storage.get_data_version('bob'), 0)
+
+    def test_preferences(self):
+        self.assertEqual(self.storage.get_preferences('alice'), {})
+        self.storage.set_preference('alice', 'opted_out', True)
+        self.assertTrue(self.storage.get_preferences('alice')['opted_out'])
+
+class TestMemoryStorage(StorageContract, unittest.TestCase):
+    def create_storage(self):
+        return MemoryStorage()
+
+class TestSQLiteStorage(StorageContract, unittest.TestCase):
+    def create_storage(self):
+        self.tmpdir = tempfile.mkdtemp()
+        return SQLiteStorage(os.path.join(self.tmpdir, 'test.db'))
+
+    def tearDown(self):
+        self.storage.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_data_survives_reopen(self):
+        self.storage.save_profile('alice', {'Income': 50000})
+        reopened = SQLiteStorage(self.storage.path)
+        self.assertEqual(reopened.get_profile('alice')['Income'], 50000)
+        reopened.close()
+
+    def test_rollups_backfilled_for_existing_transactions(self):
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'category': 'groceries', 'amount': 100}
+        ])
+        conn = self.storage._connection()
+        with conn:
+            conn.execute("DELETE FROM rollups")
+
+        reopened = SQLiteStorage(self.storage.path)
+        self.assertEqual(reopened.get_rollups('alice', 'month'), [(2023 * 12 + 6, 'groceries', 100.0, 1)])
+        reopened.close()
+
+    def test_real_ts_column_migrated_to_integer_epoch_us(self):
+        self.storage.close()
+        path = os.path.join(self.tmpdir, 'old.db')
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE transactions (seq INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                                       ts REAL NOT NULL, tx_id TEXT NOT NULL DEFAULT '', data TEXT NOT NULL);
+            CREATE INDEX idx_transactions_user_ts_id ON transactions (user_id, ts, tx_id);
+        """)
+        old = [
+            # Normalized at ingest, so the row carries its exact epoch_us
+            {'transaction_id': 'b', 'timestamp': '2023-07-02T10:00:00.000001', 'amount': 20,
+             'epoch_us': 1688292000000001, 'day': 738703},
+            # Stored before normalization; only the REAL seconds are known
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 10},
+        ]
+        with conn:
+            conn.executemany("INSERT INTO transactions (user_id, ts, tx_id, data) VALUES ('alice', ?, ?, ?)",
+                             [(1688292000.000001, 'b', json.dumps(old[0])), (1688205600.0, 'a', json.dumps(old[1]))])
+        conn.close()
+
+        self.storage = SQLiteStorage(path)
+        conn = self.storage._connection()
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(transactions)")}
+        self.assertNotIn('ts', columns)
+        self.assertEqual(columns['epoch_us'], 'INTEGER')
+        self.assertEqual(conn.execute("SELECT epoch_us FROM transactions WHERE tx_id = 'b'").fetchone()[0],
+                         1688292000000001)
+        self.assertEqual(conn.execute("SELECT typeof(epoch_us) FROM transactions WHERE tx_id = 'a'").fetchone()[0],
+                         'integer')
+        plan = ' '.join(str(row) for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT data FROM transactions WHERE user_id = 'alice' AND epoch_us >= 0 "
+            "ORDER BY epoch_us, tx_id"))
+        self.assertIn('idx_transactions_user_epoch_id', plan)
+
+        self.storage.add_transactions('alice', [{'transaction_id': 'c', 'timestamp': '2023-07-03T10:00:00',
+                                                 'amount': 30}])
+        self.assertEqual([tx['transaction_id'] for tx in self.storage.get_transactions('alice')], ['a', 'b', 'c'])
+        self.assertEqual(conn.execute("SELECT MAX(seq) FROM transactions").fetchone()[0], 3)
+
+    def test_connection_per_thread(self):
+        self.storage.add_transactions('alice', [
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 100}
+        ])
+        results = []
+
+        def read():
+            results.append(len(self.storage.get_transactions('alice')))
+            self.storage.close()
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, [1, 1, 1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
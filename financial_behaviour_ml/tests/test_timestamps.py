@@ -0,0 +1,37 @@
+import unittest
+from datetime import date, datetime, timezone
+from src.timestamps import ensure_normalized, normalize_transaction, to_epoch_us
+
+class TestTimestamps(unittest.TestCase):
+    def test_epoch_matches_datetime_timestamp(self):
+        for value in ['2023-07-03T10:00:00.123456', '2023-07-03T10:00:00+02:00']:
+            with self.subTest(value=value):
+                expected = datetime.fromisoformat(value).timestamp()
+                self.assertAlmostEqual(to_epoch_us(value) / 1e6, expected, places=6)
+
+        self.assertEqual(to_epoch_us(datetime(1970, 1, 1, 0, 0, 1, tzinfo=timezone.utc)), 1_000_000)
+
+    def test_normalize_adds_integer_epoch_and_day(self):
+        tx = normalize_transaction({'timestamp': '2023-07-03T23:59:59', 'amount': 1})
+        self.assertIsInstance(tx['epoch_us'], int)
+        self.assertEqual(tx['day'], date(2023, 7, 3).toordinal())
+
+    def test_order_follows_timestamps(self):
+        earlier = normalize_transaction({'timestamp': '2023-07-03T10:00:00.000001'})
+        later = normalize_transaction({'timestamp': '2023-07-03T10:00:00.000002'})
+        self.assertLess(earlier['epoch_us'], later['epoch_us'])
+
+    def test_invalid_timestamps_raise(self):
+        for value in ['not a date', None, 1688378400]:
+            with self.subTest(value=value):
+                with self.assertRaises((TypeError, ValueError)):
+                    normalize_transaction({'timestamp': value})
+
+    def test_ensure_normalized_keeps_existing_fields(self):
+        txs = ensure_normalized([{'timestamp': '2023-07-03T10:00:00', 'epoch_us': 5, 'day': 7},
+                                 {'timestamp': '2023-07-03T10:00:00'}])
+        self.assertEqual((txs[0]['epoch_us'], txs[0]['day']), (5, 7))
+        self.assertIn('epoch_us', txs[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from src.token_cache import TokenCache
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TokenCache(maxsize=2, clock=self.clock)
+
+    def test_hit_until_exp(self):
+        self.cache.put('token', 'alice', exp=1010)
+        self.assertEqual(self.cache.get('token'), 'alice')
+
+        self.clock.now = 1010
+        self.assertIsNone(self.cache.get('token'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put('a', 'alice', exp=2000)
+        self.cache.put('b', 'bob', exp=2000)
+        self.cache.get('a')
+        self.cache.put('c', 'carol', exp=2000)
+
+        self.assertEqual(self.cache.get('a'), 'alice')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 'carol')
+
+    def test_skips_tokens_without_future_exp(self):
+        self.cache.put('no_exp', 'alice', exp=None)
+        self.cache.put('expired', 'bob', exp=999)
+
+        self.assertEqual(len(self.cache), 0)
+
+    def test_disabled_with_zero_size(self):
+        cache = TokenCache(maxsize=0, clock=self.clock)
+        cache.put('token', 'alice', exp=2000)
+        self.assertIsNone(cache.get('token'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.transaction_log import TransactionLog
+
+class TestTransactionLog(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.log = TransactionLog(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_append_and_replay(self):
+        self.log.append('alice', [{'transaction_id': '1', 'timestamp': '2023-07-01T10:00:00', 'amount': 100}])
+        self.log.append('alice', [{'transaction_id': '2', 'timestamp': '2023-07-02T10:00:00', 'amount': 200}])
+        self.log.append('bob/smith', [{'transaction_id': '3', 'timestamp': '2023-07-03T10:00:00', 'amount': 300}])
+
+        replayed = dict(self.log.replay())
+        self.assertEqual([tx['transaction_id'] for tx in replayed['alice']], ['1', '2'])
+        self.assertEqual(replayed['bob/smith'][0]['amount'], 300)
+
+    def test_compaction_preserves_transactions(self):
+        # Write into a closed segment by pretending it is an earlier month
+        self.log._current_segment = lambda: '2023-07'
+        self.log.append('alice', [
+            {'transaction_id': '1', 'timestamp': '2023-07-01T10:00:00', 'category': 'groceries', 'amount': 100, 'note': 'weekly shop'},
+            {'transaction_id': '2', 'timestamp': '2023-07-02T10:00:00', 'category': 'transport', 'amount': '25.5'}
+        ])
+        self.log._current_segment = lambda: '2023-08'
+        self.log.append('alice', [{'transaction_id': '3', 'timestamp': '2023-08-01T10:00:00', 'category': 'utilities', 'amount': 900}])
+
+        self.assertEqual(self.log.compact(), 1)
+
+        user_dir = os.path.join(self.root, 'alice')
+        self.assertEqual(sorted(os.listdir(user_dir)), ['2023-07.parquet', '2023-08.jsonl'])
+
+        txs = dict(self.log.replay())['alice']
+        self.assertEqual([tx['transaction_id'] for tx in txs], ['1', '2', '3'])
+        self.assertEqual(txs[0]['note'], 'weekly shop')
+        self.assertEqual(txs[1]['amount'], 25.5)
+
+    def test_replay_skips_torn_write(self):
+        self.log.append('alice', [{'transaction_id': '1', 'timestamp': '2023-07-01T10:00:00', 'amount': 100}])
+        segment = os.listdir(os.path.join(self.root, 'alice'))[0]
+        with open(os.path.join(self.root, 'alice', segment), 'a') as f:
+            f.write('{"transaction_id": "2", "times')
+
+        self.assertEqual(len(dict(self.log.replay())['alice']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from src import transaction_store
+from src.transaction_store import TransactionStore
+
+class TestTransactionStore(unittest.TestCase):
+    def setUp(self):
+        self.store = TransactionStore()
+        self.store.add('alice', [
+            {'transaction_id': 'b', 'timestamp': '2023-07-03T10:00:00', 'amount': 200},
+            {'transaction_id': 'a', 'timestamp': '2023-07-01T10:00:00', 'amount': 100},
+            {'transaction_id': 'c', 'timestamp': '2023-07-05T10:00:00', 'amount': 300}
+        ])
+
+    def test_out_of_order_inserts_are_sorted(self):
+        ids = [tx['transaction_id'] for tx in self.store.all('alice')]
+        self.assertEqual(ids, ['a', 'b', 'c'])
+
+    def test_range_is_inclusive(self):
+        txs = self.store.range(
+            'alice',
+            start=datetime(2023, 7, 3, 10),
+            end=datetime(2023, 7, 5, 10)
+        )
+        self.assertEqual([tx['transaction_id'] for tx in txs], ['b', 'c'])
+
+    def test_open_ended_ranges(self):
+        self.assertEqual(len(self.store.range('alice', start=datetime(2023, 7, 2))), 2)
+        self.assertEqual(len(self.store.range('alice', end=datetime(2023, 7, 2))), 1)
+        self.assertEqual(len(self.store.range('alice')), 3)
+
+    def test_page_after_cursor(self):
+        page = self.store.page('alice', after=('2023-07-01T10:00:00', 'a'), limit=1)
+        self.assertEqual([tx['transaction_id'] for tx in page], ['b'])
+
+        page = self.store.page('alice', start=datetime(2023, 7, 2), after=('2023-07-03T10:00:00', 'b'))
+        self.assertEqual([tx['transaction_id'] for tx in page], ['c'])
+
+    def test_unknown_user(self):
+        self.assertNotIn('bob', self.store)
+        self.assertEqual(self.store.all('bob'), [])
+        self.assertEqual(self.store.range('bob', start=datetime(2023, 1, 1)), [])
+
+    def test_bad_timestamp_rejects_whole_batch(self):
+        with self.assertRaises(ValueError):
+            self.store.add('alice', [
+                {'transaction_id': 'd', 'timestamp': '2023-07-06T10:00:00', 'amount': 1},
+                {'transaction_id': 'e', 'timestamp': 'not a date', 'amount': 1}
+            ])
+        self.assertEqual(self.store.count('alice'), 3)
+
+    def test_rows_decode_to_what_was_submitted(self):
+        submitted = [
+            {'transaction_id': str(uuid.uuid4()), 'timestamp': '2023-07-06T10:00:00.250000',
+             'category': 'groceries', 'amount': 12.5},
+            {'transaction_id': 42, 'timestamp': '2023-07-07T10:00:00+05:30', 'category': 'rent',
+             'amount': '900', 'note': 'split with flatmate'},
+            {'timestamp': '2023-07-08T10:00', 'amount': 3.0}
+        ]
+        self.store.add('carol', [dict(tx) for tx in submitted])
+
+        for expected, stored in zip(submitted, self.store.all('carol')):
+            with self.subTest(tx=expected):
+                self.assertEqual({k: v for k, v in stored.items() if k not in ('epoch_us', 'day')}, expected)
+
+    def test_uuid_rows_need_no_overrides(self):
+        self.store.add('dave', [{'transaction_id': str(uuid.uuid4()), 'timestamp': '2023-07-06T10:00:00',
+                                 'category': 'groceries', 'amount': 5}])
+        self.store.all('dave')
+        self.assertEqual(self.store._users.get('dave')._overrides, [None])
+        self.assertEqual(self.store.all('dave')[0]['amount'], 5.0)
+
+    def test_append_buffer_merges_out_of_order_rows(self):
+        start = datetime(2023, 8, 1)
+        rows = [{'transaction_id': f'{i:04d}', 'timestamp': (start + timedelta(minutes=i)).isoformat(), 'amount': i}
+                for i in range(transaction_store.BUFFER_SIZE * 3)]
+        for i in range(0, len(rows), 7):
+            self.store.add('erin', list(reversed(rows[i:i + 7])))
+
+        self.assertEqual([tx['transaction_id'] for tx in self.store.all('erin')], [tx['transaction_id'] for tx in rows])
+        self.assertEqual(self.store.count('erin'), len(rows))
+
+    def test_existing_ids_in_columns_and_buffer(self):
+        ids = [str(uuid.uuid4()) for _ in range(transaction_store.BUFFER_SIZE + 10)]
+        start = datetime(2023, 8, 1)
+        self.store.add('frank', [{'transaction_id': tx_id, 'timestamp': (start + timedelta(minutes=i)).isoformat(),
+                                  'amount': 1} for i, tx_id in enumerate(ids)])
+        self.store.add('frank', [{'transaction_id': 7, 'timestamp': '2023-08-02T10:00:00', 'amount': 1}])
+
+        unseen = str(uuid.uuid4())
+        self.assertEqual(self.store.existing_ids('frank', [ids[0], ids[-1], '7', unseen, 'a']),
+                         {ids[0], ids[-1], '7'})
+        self.assertEqual(self.store.existing_ids('alice', ['a', 'A', 'd']), {'a'})
+
+    def test_hash_collisions_are_confirmed_against_stored_ids(self):
+        original = transaction_store._id_hash
+        transaction_store._id_hash = lambda key: 1  # Every id collides
+        try:
+            store = TransactionStore()
+            stored = str(uuid.uuid4())
+            store.add('gina', [{'transaction_id': stored, 'timestamp': '2023-07-01T10:00:00', 'amount': 1},
+                               {'transaction_id': 'x', 'timestamp': '2023-07-01T11:00:00', 'amount': 1}])
+            candidates = [stored, str(uuid.uuid4()), 'x', 'y']
+
+            self.assertEqual(store.existing_ids('gina', candidates), {stored, 'x'})  # Still in the buffer
+            store.all('gina')
+            self.assertEqual(store.existing_ids('gina', candidates), {stored, 'x'})  # Merged into the columns
+        finally:
+            transaction_store._id_hash = original
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import unittest
+from src.write_behind import WriteBehind, QueueFull
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def apply(self, user_id, items):
+        self.gate.wait()
+        self.applied.append((user_id, list(items)))
+
+    def test_pending_writes_for_a_user_coalesce_in_order(self):
+        queue = WriteBehind(self.apply, workers=1)
+        self.gate.clear()
+        queue.submit('u1', [1])
+        queue.submit('u1', [2])
+        queue.submit('u1', [3, 4])
+        self.gate.set()
+        queue.close()
+
+        # The first item may be taken alone before the rest arrive; order is kept either way
+        self.assertLessEqual(len(self.applied), 2)
+        self.assertEqual([item for _, items in self.applied for item in items], [1, 2, 3, 4])
+
+    def test_wait_for_user_sees_applied_writes(self):
+        queue = WriteBehind(self.apply)
+        queue.submit('u1', ['a'])
+        self.assertTrue(queue.wait_for_user('u1', timeout=5))
+        self.assertEqual(self.applied, [('u1', ['a'])])
+        queue.close()
+
+    def test_full_queue_applies_back_pressure(self):
+        queue = WriteBehind(self.apply, max_pending=2, workers=1)
+        self.gate.clear()
+        queue.submit('u1', [1, 2])
+        with self.assertRaises(QueueFull):
+            queue.submit('u2', [3], timeout=0.05)
+        self.gate.set()
+        queue.submit('u2', [3], timeout=5)
+        queue.close()
+        self.assertEqual(sorted(user for user, _ in self.applied), ['u1', 'u2'])
+
+    def test_close_flushes_everything_queued(self):
+        queue = WriteBehind(self.apply, workers=2)
+        self.gate.clear()
+        for i in range(20):
+            queue.submit(f'user{i % 5}', [i])
+        self.gate.set()
+        queue.close()
+
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(sorted(item for _, items in self.applied for item in items), list(range(20)))
+        with self.assertRaises(RuntimeError):
+            queue.submit('u1', [1])
+
+    def test_failed_batch_does_not_stall_the_queue(self):
+        def apply(user_id, items):
+            if user_id == 'bad':
+                raise ValueError("boom")
+            self.applied.append((user_id, items))
+
+        queue = WriteBehind(apply, workers=1)
+        queue.submit('bad', [1])
+        queue.submit('good', [2])
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(self.applied, [('good', [2])])
+        queue.close()
+
+if __name__ == '__main__':
+    unittest.main()